@@ -1,11 +1,18 @@
-from flask import Flask, render_template, request, jsonify
-from buscador_semantico import BuscadorSemantico, VG
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+from buscador_semantico import BuscadorSemantico
 from hybrid_search import HybridSearch
+from sync_scheduler import SyncScheduler, SYNC_INTERVALO
+from jobs import cola_trabajos, ColaLlenaError
+from importacion_ndjson import ImportadorNDJSON, IMPORTACION_LOTE
+from motor_consultas import MotorConsultas
 from multilingual import traductor_global
-from rdflib import RDF
+from deadline import Deadline
+from retry_policy import politica_reintentos_global
+import json
 import os
 import socket
-from pln import run_nlp, SUPPORTED_INTENTS  
+import time
+from pln import run_nlp, run_nlp_batch, analyze, memo_pln, tiempos_pln, SUPPORTED_INTENTS  
 
 app = Flask(__name__)
 
@@ -16,8 +23,35 @@ compress.init_app(app)
 # Configuración
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OWL_PATH = os.path.join(BASE_DIR, "videojuegos.owl")
+# Presupuesto total (segundos) de una búsqueda, incluidas las consultas a DBpedia
+PRESUPUESTO_BUSQUEDA = float(os.environ.get('PRESUPUESTO_BUSQUEDA', 12))
+# Consultas máximas por llamada a /api/pln/analizar-lote
+PLN_LOTE_MAX = int(os.environ.get('PLN_LOTE_MAX', 100000))
+# Procesos para repartir los lotes grandes de PLN (1 = en el proceso del servidor)
+PLN_PROCESOS = int(os.environ.get('PLN_PROCESOS', 1))
+# Modo especulativo: consultar DBpedia en paralelo con la ontología local
+BUSQUEDA_ESPECULATIVA = os.environ.get('BUSQUEDA_ESPECULATIVA', '0') == '1'
 buscador = BuscadorSemantico(OWL_PATH)
-hybrid_search = HybridSearch(buscador)
+hybrid_search = HybridSearch(buscador, especulativo=BUSQUEDA_ESPECULATIVA)
+# Ejecuta las specs del PLN como un único plan sobre la ontología local
+motor_consultas = MotorConsultas(buscador)
+# Sincronización incremental programada (SYNC_INTERVALO > 0 la activa)
+sincronizador = SyncScheduler(buscador)
+
+
+def iniciar_sincronizacion():
+    """
+    Arranca el sincronizador en el proceso que atiende peticiones: con el
+    recargador de debug el proceso padre solo vigila archivos, así que ahí
+    se omite (el hijo tiene WERKZEUG_RUN_MAIN)
+    """
+    if SYNC_INTERVALO > 0 and (not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        sincronizador.iniciar()
+
+
+# Servidores WSGI (gunicorn, flask run) importan el módulo sin pasar por __main__
+if __name__ != '__main__':
+    iniciar_sincronizacion()
 
 @app.route('/')
 def index():
@@ -26,16 +60,24 @@ def index():
 
 @app.route('/api/verificar-dbpedia', methods=['GET'])
 def verificar_dbpedia():
-    """Verificar conexión con DBpedia"""
+    """Verificar conexión con DBpedia (estado del circuito, sin tráfico de red)"""
     try:
         disponible = buscador.verificar_conexion_dbpedia()
         
-        count = sum(1 for _ in buscador.graph.triples((None, RDF.type, VG.Videojuego)))
+        count = len(buscador.indice_juegos)
         
         return jsonify({
             'success': True,
             'dbpedia_disponible': disponible,
+            'circuito': buscador.estado_conexion_dbpedia(),
+            'espejo': buscador.estado_espejo_dbpedia(),
+            'reintentos': politica_reintentos_global.presupuesto.obtener_estadisticas(),
             'videojuegos_locales': count,
+            'indice_existencia': buscador.indice_juegos.obtener_estadisticas(),
+            'resolucion_entidades': buscador.resolucion.obtener_estadisticas(),
+            'gazetteer': buscador.gazetteer.obtener_estadisticas(),
+            'motor_consultas': motor_consultas.obtener_estadisticas(),
+            'busqueda_especulativa': hybrid_search.obtener_estadisticas_especulativas(),
             'mensaje': 'DBpedia disponible' if disponible else 'DBpedia no disponible - usando datos locales'
         })
     except Exception as e:
@@ -48,54 +90,124 @@ def verificar_dbpedia():
 
 @app.route('/api/pln/analizar', methods=['GET'])
 def pln_analizar():
-    """Analiza una consulta NL y devuelve intent/slots detectados."""
+    """
+    Analiza una consulta NL y devuelve intent/slots detectados. Con
+    ?tiempos=1 se analiza sin memo y se devuelve el tiempo de cada etapa
+    """
     try:
         termino = request.args.get('q', '').strip()
         if not termino:
             return jsonify({'success': False, 'error': 'Término vacío'}), 400
+        if request.args.get('tiempos', '').lower() in ('1', 'true'):
+            tiempos = {}
+            spec = analyze(termino, tiempos=tiempos)
+            return jsonify({
+                'success': True,
+                'spec': spec,
+                'supported': list(SUPPORTED_INTENTS.keys()),
+                'tiempos_ms': {etapa: round(s * 1000, 3) for etapa, s in tiempos.items()}
+            })
         spec = run_nlp(termino)
         return jsonify({'success': True, 'spec': spec, 'supported': list(SUPPORTED_INTENTS.keys())})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/pln/analizar-lote', methods=['POST'])
+def pln_analizar_lote():
+    """
+    Analiza muchas consultas de una vez: JSON {"consultas": [...]} o texto
+    plano con una consulta por línea (p. ej. un log)
+    """
+    try:
+        if request.mimetype == 'text/plain':
+            consultas = request.get_data(as_text=True).splitlines()
+        else:
+            consultas = (request.get_json(silent=True) or {}).get('consultas')
+        if not isinstance(consultas, list) or not all(isinstance(c, str) for c in consultas):
+            return jsonify({'success': False, 'error': 'Se espera una lista de consultas'}), 400
+        if len(consultas) > PLN_LOTE_MAX:
+            return jsonify({'success': False, 'error': f'Máximo {PLN_LOTE_MAX} consultas por lote'}), 413
+
+        inicio = time.time()
+        specs = run_nlp_batch(consultas, processes=PLN_PROCESOS)
+        return jsonify({
+            'success': True,
+            'count': len(specs),
+            'specs': specs,
+            'segundos': round(time.time() - inicio, 3)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/pln/metricas', methods=['GET'])
+def pln_metricas():
+    """Aciertos del memo de análisis PLN y tiempos por etapa (PLN_TIEMPOS=1)"""
+    return jsonify({
+        'success': True,
+        'memo': memo_pln.obtener_estadisticas(),
+        'tiempos': tiempos_pln.obtener_estadisticas()
+    })
+
 @app.route('/api/poblar', methods=['POST'])
 def poblar():
-    """Endpoint para poblar la ontología"""
+    """Encola la población de la ontología; el progreso se consulta en /api/jobs/<id>"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         limite = int(data.get('limite', 10))
         
         print(f"\n{'='*60}")
         print(f"Solicitud de población recibida: {limite} videojuegos")
         print(f"{'='*60}\n")
         
-        count_antes = sum(1 for _ in buscador.graph.triples((None, RDF.type, VG.Videojuego)))
-        print(f"Videojuegos antes: {count_antes}")
-        
-        buscador.poblar_ontologia(limite)
-        
-        count_despues = sum(1 for _ in buscador.graph.triples((None, RDF.type, VG.Videojuego)))
-        print(f"Videojuegos después: {count_despues}")
-        
-        agregados = count_despues - count_antes
+        trabajo = cola_trabajos.enviar(
+            'poblar',
+            lambda trabajo: buscador.poblar_ontologia(limite, progreso=trabajo.actualizar),
+            {'limite': limite}
+        )
         
         return jsonify({
-            'success': True, 
-            'message': f'{agregados} videojuegos nuevos agregados. Total en ontología: {count_despues}',
-            'total': count_despues,
-            'agregados': agregados
-        })
+            'success': True,
+            'job_id': trabajo.id,
+            'estado': trabajo.estado,
+            'url': f'/api/jobs/{trabajo.id}'
+        }), 202
+    except ColaLlenaError as e:
+        print(f"\n⊙ Población rechazada: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'trabajos': [t.a_dict() for t in cola_trabajos.listar() if not t.finalizado()]
+        }), 429
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        print(f"\n✗ Error en población:")
-        print(error_detail)
+        print(f"\n✗ Error al encolar población: {str(e)}")
         return jsonify({
             'success': False, 
-            'error': str(e),
-            'detail': 'Ver consola del servidor para detalles'
+            'error': str(e)
         }), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def estado_trabajo(job_id):
+    """Progreso y resultado de un trabajo en segundo plano"""
+    trabajo = cola_trabajos.obtener(job_id)
+    if trabajo is None:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    return jsonify({'success': True, 'job': trabajo.a_dict()})
+
+@app.route('/api/sync/estado', methods=['GET'])
+def sync_estado():
+    """Marcas de agua y resultado de la última sincronización incremental"""
+    return jsonify({'success': True, 'sync': sincronizador.obtener_estado()})
+
+@app.route('/api/sync/ejecutar', methods=['POST'])
+def sync_ejecutar():
+    """Ejecuta una pasada de sincronización incremental ahora"""
+    try:
+        resumen = sincronizador.ejecutar_ciclo()
+        return jsonify({'success': True, 'resumen': resumen})
+    except Exception as e:
+        print(f"Error en sync_ejecutar: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/buscar/titulo', methods=['GET'])
 def buscar_titulo():
     """Buscar por título con búsqueda híbrida"""
@@ -104,10 +216,11 @@ def buscar_titulo():
         modo_hibrido = request.args.get('hybrid', 'true').lower() == 'true'
         
         if modo_hibrido:
-            resultado = hybrid_search.buscar_titulo_hibrido(termino)
+            deadline = Deadline(PRESUPUESTO_BUSQUEDA)
+            resultado = hybrid_search.buscar_titulo_hibrido(termino, deadline)
             
             if resultado['success']:
-                return jsonify(_formatear_resultados_hibridos(resultado))
+                return jsonify({**_formatear_resultados_hibridos(resultado), 'presupuesto': deadline.resumen()})
             else:
                 return jsonify({'success': False, 'data': [], 'count': 0, 'message': resultado['message']})
         else:
@@ -146,63 +259,42 @@ def buscar_general():
         spec = run_nlp(termino)
         print(f"\n🧠 PLN detectó: {spec['intent']} (confianza: {spec['confidence']:.2%})")
         
-        # PASO 2: Ejecutar búsqueda basada en slots del PLN
-        resultados_finales = []
-        
-        # 2.1: Buscar por desarrollador si fue detectado
-        if spec['filters'].get('developer'):
-            dev = spec['filters']['developer']
-            print(f"   → Buscando por desarrollador: {dev}")
-            res_dev = buscador.buscar_por_desarrollador(dev)
-            resultados_finales.extend(res_dev)
-        
-        # 2.2: Buscar por género si fue detectado
-        if spec['filters'].get('genres'):
-            for genero in spec['filters']['genres']:
-                genero_limpio = genero.replace('vg:', '')
-                print(f"   → Buscando por género: {genero_limpio}")
-                # Buscar en toda la ontología que contenga el género
-                res_gen = buscador.buscar_general(genero_limpio)
-                resultados_finales.extend(res_gen)
-        
-        # 2.3: Buscar por año si fue detectado
-        if spec['filters'].get('year_range'):
-            year_min, year_max = spec['filters']['year_range']
-            print(f"   → Buscando por años: {year_min}-{year_max}")
-            for year in range(year_min, year_max + 1):
-                res_year = buscador.buscar_por_anio(year)
-                resultados_finales.extend(res_year)
-        
-        # 2.4: Si no hay slots específicos, búsqueda general
+        # PASO 2: Ejecutar todos los filtros del PLN como un único plan conjuntivo
+        ejecucion = motor_consultas.ejecutar(spec)
+        resultados_finales = ejecucion['juegos']
+        if ejecucion['aplicados']:
+            pasos = ', '.join(f"{p['paso']}={p['candidatos']}" for p in ejecucion['plan'])
+            print(f"   → Plan {spec['template']}: {pasos} → {len(resultados_finales)} juego(s)")
+        
+        # 2.1: Si no hay slots específicos (o nada los cumple), búsqueda general
         if not resultados_finales:
             print(f"   → Búsqueda general con término original: {termino}")
             resultados_finales = buscador.buscar_general(termino)
         
         # PASO 3: Si hay resultados locales, retornar inmediatamente
         if resultados_finales:
-            # Eliminar duplicados
-            vistos = set()
-            unicos = []
-            for r in resultados_finales:
-                uri = str(r.game) if hasattr(r, 'game') else str(r)
-                if uri not in vistos:
-                    vistos.add(uri)
-                    unicos.append(r)
-            
-            print(f"✓ {len(unicos)} resultados locales encontrados con PLN")
-            resp = _formatear_resultados(unicos)
+            print(f"✓ {len(resultados_finales)} resultados locales encontrados con PLN")
+            resp = _formatear_resultados(resultados_finales)
             resp['nlp'] = spec
+            resp['plan'] = {k: ejecucion[k] for k in ('plan', 'omitidos', 'descartados', 'segundos')}
             resp['source'] = 'local_pln'
             return jsonify(resp)
         
         # PASO 4: Si no hay locales, usar búsqueda híbrida
         print("   → Sin resultados locales, consultando DBpedia...")
         if modo_hibrido:
-            resultado = hybrid_search.buscar_general_hibrido(termino)
+            deadline = Deadline(PRESUPUESTO_BUSQUEDA)
+            resultado = hybrid_search.buscar_general_hibrido(termino, deadline)
             
             if resultado['success']:
-                response = jsonify({**_formatear_resultados_hibridos(resultado), 'nlp': spec})
-                response.cache_control.max_age = 180
+                response = jsonify({
+                    **_formatear_resultados_hibridos(resultado),
+                    'nlp': spec,
+                    'presupuesto': deadline.resumen()
+                })
+                # Los resultados parciales no se cachean en el navegador
+                if not deadline.agotado:
+                    response.cache_control.max_age = 180
                 return response
             else:
                 return jsonify({'success': False, 'data': [], 'count': 0, 'message': resultado['message'], 'nlp': spec})
@@ -226,10 +318,11 @@ def buscar_desarrollador():
         modo_hibrido = request.args.get('hybrid', 'true').lower() == 'true'
         
         if modo_hibrido:
-            resultado = hybrid_search.buscar_desarrollador_hibrido(termino)
+            deadline = Deadline(PRESUPUESTO_BUSQUEDA)
+            resultado = hybrid_search.buscar_desarrollador_hibrido(termino, deadline)
             
             if resultado['success']:
-                return jsonify(_formatear_resultados_hibridos(resultado))
+                return jsonify({**_formatear_resultados_hibridos(resultado), 'presupuesto': deadline.resumen()})
             else:
                 return jsonify({'success': False, 'data': [], 'count': 0, 'message': resultado['message']})
         else:
@@ -243,6 +336,8 @@ def buscar_desarrollador():
 @app.route('/api/agregar-desde-dbpedia', methods=['POST'])
 def agregar_desde_dbpedia():
     """Agrega juegos encontrados en DBpedia a la ontología local - MEJORADO"""
+    if request.mimetype == 'application/x-ndjson':
+        return importar_ndjson()
     try:
         data = request.get_json()
         
@@ -268,7 +363,10 @@ def agregar_desde_dbpedia():
                     'titulo': juego.get('titulo', 'Sin título'),
                     'anios': juego.get('anios', []),
                     'desarrollador': juego.get('desarrollador'),
-                    'generos': juego.get('generos', [])
+                    'desarrolladores': juego.get('desarrolladores', []),
+                    'desarrolladores_uri': juego.get('desarrolladores_uri', []),
+                    'generos': juego.get('generos', []),
+                    'generos_uri': juego.get('generos_uri', [])
                 }
                 
                 if juego_normalizado['game']:
@@ -290,7 +388,7 @@ def agregar_desde_dbpedia():
         
         count = hybrid_search.agregar_juegos_dbpedia_a_ontologia(juegos_validos)
         
-        total = sum(1 for _ in buscador.graph.triples((None, RDF.type, VG.Videojuego)))
+        total = len(buscador.indice_juegos)
         
         if count > 0:
             return jsonify({
@@ -319,6 +417,28 @@ def agregar_desde_dbpedia():
             'detail': 'Ver consola del servidor para detalles completos'
         }), 500
 
+def importar_ndjson():
+    """
+    Importación en streaming: un juego JSON por línea (se admite subida
+    chunked). Responde una línea NDJSON de progreso por lote y el resumen
+    final; el cuerpo se lee lote a lote, al ritmo de la escritura
+    """
+    try:
+        tamano_lote = int(request.args.get('lote', IMPORTACION_LOTE))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Tamaño de lote inválido'}), 400
+    importador = ImportadorNDJSON(buscador, tamano_lote=max(1, min(tamano_lote, 10000)))
+
+    def generar():
+        try:
+            for progreso in importador.importar(importador.leer_lineas(request.stream)):
+                yield json.dumps(progreso, ensure_ascii=False) + '\n'
+        except Exception as e:
+            print(f"\n✗ ERROR EN IMPORTACIÓN NDJSON: {e}")
+            yield json.dumps({'fin': True, 'success': False, 'error': str(e)}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
 @app.route('/api/listar', methods=['GET'])
 def listar_todos():
     """Listar todos los videojuegos"""
@@ -337,8 +457,6 @@ def estadisticas():
         SELECT (COUNT(?game) as ?total) 
         WHERE { ?game rdf:type vg:Videojuego }
         """
-        total = list(buscador.graph.query(query))[0][0]
-        
         query_generos = """
         SELECT ?genero (COUNT(?game) as ?count)
         WHERE {
@@ -349,8 +467,10 @@ def estadisticas():
         ORDER BY DESC(?count)
         LIMIT 5
         """
-        generos = [{'nombre': str(row[0]), 'count': int(row[1])} 
-                   for row in buscador.graph.query(query_generos)]
+        with buscador.lock_grafo:
+            total = list(buscador.graph.query(query))[0][0]
+            generos = [{'nombre': str(row[0]), 'count': int(row[1])}
+                       for row in buscador.graph.query(query_generos)]
         
         return jsonify({
             'total': int(total),
@@ -478,7 +598,10 @@ def _formatear_resultados_hibridos(resultado):
                         'titulo': titulo,
                         'anios': juego.get('anios', []),
                         'desarrollador': juego.get('desarrollador'),
+                        'desarrolladores': juego.get('desarrolladores', []),
+                        'desarrolladores_uri': juego.get('desarrolladores_uri', []),
                         'generos': juego.get('generos', []),
+                        'generos_uri': juego.get('generos_uri', []),
                         'uri': juego.get('game', ''),
                         'source': 'dbpedia',
                         'idioma': juego.get('idioma_original', 'en')
@@ -508,7 +631,10 @@ def _formatear_resultados_hibridos(resultado):
                     'titulo': titulo,
                     'anios': juego.get('anios', []),
                     'desarrollador': juego.get('desarrollador'),
+                    'desarrolladores': juego.get('desarrolladores', []),
+                    'desarrolladores_uri': juego.get('desarrolladores_uri', []),
                     'generos': juego.get('generos', []),
+                    'generos_uri': juego.get('generos_uri', []),
                     'uri': juego.get('game', ''),
                     'source': 'dbpedia',
                     'idioma': juego.get('idioma_original', 'en')
@@ -557,10 +683,14 @@ if __name__ == '__main__':
         print(f"  Ontología: {OWL_PATH}")
         
         # Mostrar cantidad inicial de videojuegos
-        count_inicial = sum(1 for _ in buscador.graph.triples((None, RDF.type, VG.Videojuego)))
+        count_inicial = len(buscador.indice_juegos)
         print(f"  Videojuegos en ontología: {count_inicial}")
         print(f"{'='*60}\n")
         
+        # app.run(debug=True) usa el recargador: se marca antes para que el padre no sincronice
+        app.debug = True
+        iniciar_sincronizacion()
+        
         app.run(debug=True, port=puerto, host='127.0.0.1')
     else:
         print("✗ No se pudo encontrar un puerto disponible")
@@ -1,16 +1,26 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
 from rdflib import Graph, Namespace, RDF, RDFS, Literal, URIRef
 from rdflib.namespace import OWL, XSD
+import hashlib
+import json
 import sys
+import threading
 import time
-import requests
 from dbpedia_sync import DBpediaSync
+from dbpedia_client import consultar_sparql, circuito_dbpedia, espejo_dbpedia, ConsultaOmitidaError, DBPEDIA_ENDPOINT
+from dbpedia_queries import construir_consulta_juegos, parsear_juegos, crear_registro_juego
+from graph_writer import EscritorGrafo
+from indice_existencia import IndiceExistencia
+from resolucion_entidades import IndiceEntidades, clave_nombre
+from pln.gazetteer import gazetteer_global
 
 # Configuración de namespaces (exportables)
 VG = Namespace("http://www.semanticweb.org/videojuegos#")
 DBO = Namespace("http://dbpedia.org/ontology/")
 DBR = Namespace("http://dbpedia.org/resource/")
 
+# Propiedades de un juego que vienen de DBpedia y se refrescan al sincronizar
+PROPIEDADES_SINCRONIZADAS = (VG.titulo, VG.anioLanzamiento, VG.desarrolladoPor, VG.tieneGenero, VG.hashContenido)
+
 # Exportar para uso en otros módulos
 __all__ = ['BuscadorSemantico', 'VG', 'DBO', 'DBR']
 
@@ -21,6 +31,12 @@ class BuscadorSemantico:
         self.graph.bind("dbo", DBO)
         self.graph.bind("dbr", DBR)
         self.owl_file = owl_file
+        # Serializa las escrituras al grafo (población, sincronización)
+        self.lock_grafo = threading.RLock()
+        # Serializa las ingestas completas (resolver duplicados + escribir):
+        # con solo lock_grafo, dos ingestas podían aceptar el mismo juego con
+        # URIs distintas. Se toma siempre antes que lock_grafo
+        self.lock_ingesta = threading.RLock()
         
         # Inicializar sincronizador de DBpedia
         self.dbpedia_sync = DBpediaSync()
@@ -36,55 +52,42 @@ class BuscadorSemantico:
         except Exception as e:
             print(f"✓ Creando nueva ontología en {owl_file}")
         
-        # Configurar endpoint de DBpedia con timeout y user agent
-        self.sparql = SPARQLWrapper("http://dbpedia.org/sparql")
-        self.sparql.setReturnFormat(JSON)
-        self.sparql.setTimeout(30)
-        self.sparql.addCustomHttpHeader("User-Agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
+        # Índice de juegos existentes (un solo recorrido del grafo, luego O(1))
+        self.indice_juegos = IndiceExistencia(self.graph, VG.Videojuego, origen=owl_file)
+        # Resolución de entidades: mismo juego/estudio/género con otra URI,
+        # y reconocedor de sus nombres en las consultas (pln.gazetteer)
+        self.gazetteer = gazetteer_global
+        self.resolucion = IndiceEntidades(gazetteer=self.gazetteer)
+        self.resolucion.cargar_grafo(self.graph, VG)
+        
+        # Endpoint de DBpedia; su salud la registra el circuito compartido
+        self.endpoint = DBPEDIA_ENDPOINT
+        self.timeout = 30
+        self.circuito = circuito_dbpedia
     
     def verificar_conexion_dbpedia(self):
-        """Verifica si DBpedia está disponible"""
-        try:
-            print("Verificando conexión con DBpedia...")
-            
-            # Intento 1: Petición HTTP simple
-            response = requests.get("http://dbpedia.org/sparql", timeout=10)
-            if response.status_code == 200:
-                print("✓ DBpedia responde correctamente")
-                
-                # Intento 2: Query SPARQL de prueba
-                test_query = """
-                SELECT (COUNT(*) as ?count)
-                WHERE {
-                    ?s a <http://dbpedia.org/ontology/VideoGame>
-                }
-                LIMIT 1
-                """
-                self.sparql.setQuery(test_query)
-                result = self.sparql.query().convert()
-                
-                if "results" in result:
-                    print("✓ Endpoint SPARQL funcional")
-                    return True
-            
-            print("⚠ DBpedia no responde adecuadamente")
-            return False
-            
-        except requests.exceptions.Timeout:
-            print("✗ Timeout al conectar con DBpedia")
-            return False
-        except requests.exceptions.ConnectionError:
-            print("✗ Error de conexión con DBpedia")
-            return False
-        except Exception as e:
-            print(f"✗ Error inesperado: {str(e)[:100]}")
-            return False
+        """
+        Indica si DBpedia está disponible según el circuit breaker.
+        No hace tráfico de red: el estado se alimenta de las consultas reales.
+        En modo espejo las consultas se responden localmente y siempre hay datos.
+        """
+        if espejo_dbpedia is not None:
+            return True
+        return not self.circuito.esta_abierto()
+    
+    def estado_conexion_dbpedia(self):
+        """Retorna el estado detallado del circuito de DBpedia"""
+        return self.circuito.obtener_estado()
+    
+    def estado_espejo_dbpedia(self):
+        """Retorna el tamaño y uso del espejo local, o None en modo remoto"""
+        return espejo_dbpedia.obtener_estadisticas() if espejo_dbpedia is not None else None
     
     def consultar_dbpedia(self, limite=20):
         """Consulta videojuegos desde DBpedia evitando duplicados - MÉTODO PRINCIPAL"""
-        # Verificar conexión primero
+        # Verificar conexión primero (estado en caché, sin tráfico de red)
         if not self.verificar_conexion_dbpedia():
-            print("\n⚠ No se puede conectar con DBpedia.")
+            print("\n⚠ No se puede conectar con DBpedia (circuito abierto).")
             print("Usando datos de ejemplo...")
             return self._crear_datos_ejemplo()
         
@@ -92,8 +95,9 @@ class BuscadorSemantico:
         print("CONSULTANDO DBPEDIA CON VALIDACIÓN DE DUPLICADOS")
         print(f"{'─'*60}")
         
-        # Obtener juegos que ya existen en la ontología
-        uris_existentes = self.dbpedia_sync.obtener_juegos_existentes(self.graph, VG)
+        # Juegos que ya existen en la ontología (índice, sin recorrer el grafo)
+        uris_existentes = self.indice_juegos
+        print(f"   Juegos en ontología local: {len(uris_existentes)}")
         
         if not uris_existentes:
             print("   No hay juegos previos, consultando normalmente...")
@@ -111,37 +115,22 @@ class BuscadorSemantico:
             print("Usando datos de ejemplo...")
             # Filtrar ejemplos que no existan
             ejemplos = self._crear_datos_ejemplo()
-            ejemplos_nuevos = [ej for ej in ejemplos if ej["game"]["value"] not in uris_existentes]
+            ejemplos_nuevos = [ej for ej in ejemplos if ej["game"] not in uris_existentes]
             return ejemplos_nuevos if ejemplos_nuevos else ejemplos[:limite]
     
     def _consultar_dbpedia_simple(self, limite):
         """Consulta simple cuando no hay juegos previos"""
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            FILTER (lang(?label) = 'en')
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-        }}
-        LIMIT {limite}
-        """
-        
-        self.sparql.setQuery(query)
+        query = construir_consulta_juegos(limite=limite)
         
         try:
             print("   Consultando DBpedia...")
-            results = self.sparql.query().convert()
+            results = consultar_sparql(query, self.endpoint, self.timeout)
             
-            if "results" in results and "bindings" in results["results"]:
-                bindings = results["results"]["bindings"]
-                print(f"   ✓ {len(bindings)} juegos obtenidos")
-                return bindings
+            juegos = parsear_juegos(results)
+            print(f"   ✓ {len(juegos)} juegos obtenidos")
+            return juegos
+        except ConsultaOmitidaError as e:
+            print(f"   ⊙ {e}")
         except Exception as e:
             print(f"   ✗ Error: {str(e)[:100]}")
         
@@ -149,128 +138,228 @@ class BuscadorSemantico:
 
     def _crear_datos_ejemplo(self):
         """Crea datos de ejemplo si DBpedia no funciona"""
+        # (recurso, título, fecha, desarrollador, género) en DBpedia
+        datos = [
+            ("The_Legend_of_Zelda", "The Legend of Zelda", "1986-02-21", None, "Action-adventure_game"),
+            ("Super_Mario_Bros.", "Super Mario Bros.", "1985-09-13", "Nintendo", "Platform_game"),
+            ("Minecraft", "Minecraft", "2011-11-18", "Mojang_Studios", "Sandbox_game"),
+            ("The_Witcher_3:_Wild_Hunt", "The Witcher 3: Wild Hunt", "2015-05-19", "CD_Projekt_Red", "Role-playing_game"),
+            ("Grand_Theft_Auto_V", "Grand Theft Auto V", "2013-09-17", "Rockstar_Games", "Action_game"),
+            ("Dark_Souls", "Dark Souls", "2011-09-22", "FromSoftware", "Action_role-playing_game"),
+            ("Portal_(video_game)", "Portal", "2007-10-10", "Valve_Corporation", "Puzzle_game"),
+            ("Half-Life_2", "Half-Life 2", "2004-11-16", "Valve_Corporation", "First-person_shooter"),
+            ("Red_Dead_Redemption_2", "Red Dead Redemption 2", "2018-10-26", "Rockstar_Games", "Action-adventure_game"),
+            ("Cyberpunk_2077", "Cyberpunk 2077", "2020-12-10", "CD_Projekt_Red", "Role-playing_game"),
+            ("Elden_Ring", "Elden Ring", "2022-02-25", "FromSoftware", "Action_role-playing_game"),
+            ("God_of_War_(2018_video_game)", "God of War", "2018-04-20", "Santa_Monica_Studio", "Action-adventure_game"),
+            ("Horizon_Zero_Dawn", "Horizon Zero Dawn", "2017-02-28", "Guerrilla_Games", "Action_role-playing_game"),
+            ("The_Last_of_Us", "The Last of Us", "2013-06-14", "Naughty_Dog", "Action-adventure_game"),
+            ("Bloodborne", "Bloodborne", "2015-03-24", "FromSoftware", "Action_role-playing_game")
+        ]
+
         ejemplos = [
-            {
-                "game": {"value": "http://dbpedia.org/resource/The_Legend_of_Zelda"},
-                "label": {"value": "The Legend of Zelda"},
-                "releaseDate": {"value": "1986-02-21"},
-                "genre": {"value": "http://dbpedia.org/resource/Action-adventure_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Super_Mario_Bros."},
-                "label": {"value": "Super Mario Bros."},
-                "releaseDate": {"value": "1985-09-13"},
-                "developer": {"value": "http://dbpedia.org/resource/Nintendo"},
-                "genre": {"value": "http://dbpedia.org/resource/Platform_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Minecraft"},
-                "label": {"value": "Minecraft"},
-                "releaseDate": {"value": "2011-11-18"},
-                "developer": {"value": "http://dbpedia.org/resource/Mojang_Studios"},
-                "genre": {"value": "http://dbpedia.org/resource/Sandbox_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/The_Witcher_3:_Wild_Hunt"},
-                "label": {"value": "The Witcher 3: Wild Hunt"},
-                "releaseDate": {"value": "2015-05-19"},
-                "developer": {"value": "http://dbpedia.org/resource/CD_Projekt_Red"},
-                "genre": {"value": "http://dbpedia.org/resource/Role-playing_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Grand_Theft_Auto_V"},
-                "label": {"value": "Grand Theft Auto V"},
-                "releaseDate": {"value": "2013-09-17"},
-                "developer": {"value": "http://dbpedia.org/resource/Rockstar_Games"},
-                "genre": {"value": "http://dbpedia.org/resource/Action_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Dark_Souls"},
-                "label": {"value": "Dark Souls"},
-                "releaseDate": {"value": "2011-09-22"},
-                "developer": {"value": "http://dbpedia.org/resource/FromSoftware"},
-                "genre": {"value": "http://dbpedia.org/resource/Action_role-playing_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Portal_(video_game)"},
-                "label": {"value": "Portal"},
-                "releaseDate": {"value": "2007-10-10"},
-                "developer": {"value": "http://dbpedia.org/resource/Valve_Corporation"},
-                "genre": {"value": "http://dbpedia.org/resource/Puzzle_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Half-Life_2"},
-                "label": {"value": "Half-Life 2"},
-                "releaseDate": {"value": "2004-11-16"},
-                "developer": {"value": "http://dbpedia.org/resource/Valve_Corporation"},
-                "genre": {"value": "http://dbpedia.org/resource/First-person_shooter"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Red_Dead_Redemption_2"},
-                "label": {"value": "Red Dead Redemption 2"},
-                "releaseDate": {"value": "2018-10-26"},
-                "developer": {"value": "http://dbpedia.org/resource/Rockstar_Games"},
-                "genre": {"value": "http://dbpedia.org/resource/Action-adventure_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Cyberpunk_2077"},
-                "label": {"value": "Cyberpunk 2077"},
-                "releaseDate": {"value": "2020-12-10"},
-                "developer": {"value": "http://dbpedia.org/resource/CD_Projekt_Red"},
-                "genre": {"value": "http://dbpedia.org/resource/Role-playing_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Elden_Ring"},
-                "label": {"value": "Elden Ring"},
-                "releaseDate": {"value": "2022-02-25"},
-                "developer": {"value": "http://dbpedia.org/resource/FromSoftware"},
-                "genre": {"value": "http://dbpedia.org/resource/Action_role-playing_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/God_of_War_(2018_video_game)"},
-                "label": {"value": "God of War"},
-                "releaseDate": {"value": "2018-04-20"},
-                "developer": {"value": "http://dbpedia.org/resource/Santa_Monica_Studio"},
-                "genre": {"value": "http://dbpedia.org/resource/Action-adventure_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Horizon_Zero_Dawn"},
-                "label": {"value": "Horizon Zero Dawn"},
-                "releaseDate": {"value": "2017-02-28"},
-                "developer": {"value": "http://dbpedia.org/resource/Guerrilla_Games"},
-                "genre": {"value": "http://dbpedia.org/resource/Action_role-playing_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/The_Last_of_Us"},
-                "label": {"value": "The Last of Us"},
-                "releaseDate": {"value": "2013-06-14"},
-                "developer": {"value": "http://dbpedia.org/resource/Naughty_Dog"},
-                "genre": {"value": "http://dbpedia.org/resource/Action-adventure_game"}
-            },
-            {
-                "game": {"value": "http://dbpedia.org/resource/Bloodborne"},
-                "label": {"value": "Bloodborne"},
-                "releaseDate": {"value": "2015-03-24"},
-                "developer": {"value": "http://dbpedia.org/resource/FromSoftware"},
-                "genre": {"value": "http://dbpedia.org/resource/Action_role-playing_game"}
-            }
+            crear_registro_juego(
+                str(DBR[recurso]), titulo, fecha,
+                [str(DBR[desarrollador])] if desarrollador else [],
+                [str(DBR[genero])]
+            )
+            for recurso, titulo, fecha, desarrollador, genero in datos
         ]
-        
+
         print(f"✓ Creados {len(ejemplos)} videojuegos de ejemplo (modo offline)")
         return ejemplos
     
-    def poblar_ontologia(self, limite=20):
-        """Pobla la ontología con datos de DBpedia o ejemplos"""
+    def _triples_juego(self, juego):
+        """
+        Triples que representan un registro de juego (ver parsear_juegos)
+        en la ontología, incluidos sus desarrolladores y géneros. Los
+        desarrolladores y géneros que ya existen con otra URI usan la existente
+        """
+        game_uri = URIRef(juego["game"])
+        label = juego.get("titulo") or "Sin título"
+        
+        triples = [
+            (game_uri, RDF.type, VG.Videojuego),
+            (game_uri, VG.titulo, Literal(label, lang="es")),
+            (game_uri, VG.dbpediaURI, Literal(juego["game"], datatype=XSD.anyURI)),
+            (game_uri, VG.hashContenido, Literal(self.hash_contenido(juego)))
+        ]
+        
+        # Año de lanzamiento
+        if juego.get("anios"):
+            triples.append((game_uri, VG.anioLanzamiento, Literal(juego["anios"][0], datatype=XSD.integer)))
+        
+        # Desarrolladores (todos los que reporta DBpedia)
+        for dev, dev_name in zip(juego.get("desarrolladores_uri", []), juego.get("desarrolladores", [])):
+            dev_uri = URIRef(self.resolucion.resolver_recurso(VG.Desarrollador, dev_name, dev))
+            triples.append((dev_uri, RDF.type, VG.Desarrollador))
+            triples.append((dev_uri, RDFS.label, Literal(dev_name)))
+            triples.append((game_uri, VG.desarrolladoPor, dev_uri))
+        
+        # Géneros
+        for genre, genre_name in zip(juego.get("generos_uri", []), juego.get("generos", [])):
+            genre_uri = URIRef(self.resolucion.resolver_recurso(VG.Genero, genre_name, genre))
+            triples.append((genre_uri, RDF.type, VG.Genero))
+            triples.append((genre_uri, RDFS.label, Literal(genre_name)))
+            triples.append((game_uri, VG.tieneGenero, genre_uri))
+        
+        return triples
+    
+    def registrar_entidades(self, juego, clave=None, nuevo=True):
+        """
+        Registra en la resolución de entidades los desarrolladores y géneros
+        de un juego cuyos triples (_triples_juego) ya se escribieron o se
+        están escribiendo, y el juego mismo si es nuevo
+
+        Args:
+            juego: Registro de juego (ver parsear_juegos)
+            clave: clave_titulo del título si ya se calculó
+            nuevo: Si es False solo se registran los recursos
+        """
+        for uri, nombre in zip(juego.get("desarrolladores_uri", []), juego.get("desarrolladores", [])):
+            self.resolucion.registrar_recurso(VG.Desarrollador, nombre, uri)
+        for uri, nombre in zip(juego.get("generos_uri", []), juego.get("generos", [])):
+            self.resolucion.registrar_recurso(VG.Genero, nombre, uri)
+        if nuevo:
+            self.resolucion.registrar_juego(juego["game"], juego.get("titulo") or "Sin título",
+                                            juego.get("anios", []), clave=clave)
+    
+    def hash_contenido(self, juego):
+        """
+        Hash de los atributos normalizados de un juego (título, años y
+        nombres normalizados de desarrolladores y géneros), independiente
+        del orden. No depende de las URIs canónicas: el mismo registro da el
+        mismo hash antes y después de que se registren sus entidades
+        """
+        datos = {
+            'titulo': (juego.get("titulo") or "Sin título").strip(),
+            'anios': sorted({int(a) for a in juego.get("anios", [])}),
+            'desarrolladores': sorted({clave_nombre(nombre) for nombre in juego.get("desarrolladores", [])}),
+            'generos': sorted({clave_nombre(nombre) for nombre in juego.get("generos", [])})
+        }
+        return hashlib.sha1(json.dumps(datos, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def upsert_juego(self, juego):
+        """
+        Inserta o actualiza un juego. Si el hash de su contenido coincide con
+        el guardado (vg:hashContenido) no se toca el grafo; si no, se escribe
+        solo la diferencia (ver aplicar_cambios_juego). Un juego que no está
+        en la ontología pero equivale a uno existente con otra URI no se
+        agrega
+        
+        Args:
+            juego: Registro de juego (ver parsear_juegos)
+            
+        Returns:
+            tuple: (estado, triples_quitados, triples_agregados), con estado
+                   'nuevo', 'actualizado', 'sin_cambios' o 'fusionado'
+        """
+        game_uri = URIRef(juego["game"])
+        if self.graph.value(game_uri, VG.hashContenido) == Literal(self.hash_contenido(juego)):
+            return 'sin_cambios', 0, 0
+        
+        es_nuevo = juego["game"] not in self.indice_juegos
+        if es_nuevo and self.resolucion.resolver_juego(juego["titulo"], juego.get("anios", []), juego["game"]):
+            return 'fusionado', 0, 0
+        quitados, agregados = self.aplicar_cambios_juego(juego)
+        if es_nuevo:
+            return 'nuevo', quitados, agregados
+        return ('actualizado' if quitados or agregados else 'sin_cambios'), quitados, agregados
+    
+    def upsert_juegos(self, juegos, guardar=True):
+        """
+        Upsert de varios juegos; guarda la ontología una vez si algo cambió
+        
+        Returns:
+            dict: Cantidad de juegos nuevos, actualizados, sin cambios y fusionados
+        """
+        resumen = {'nuevo': 0, 'actualizado': 0, 'sin_cambios': 0, 'fusionado': 0}
+        for juego in juegos:
+            estado, _, _ = self.upsert_juego(juego)
+            resumen[estado] += 1
+        
+        if guardar and (resumen['nuevo'] or resumen['actualizado']):
+            self.guardar_ontologia()
+        print(f"   ✓ Upsert: {resumen['nuevo']} nuevos, {resumen['actualizado']} actualizados, "
+              f"{resumen['sin_cambios']} sin cambios, {resumen['fusionado']} fusionados")
+        return resumen
+    
+    def aplicar_cambios_juego(self, juego):
+        """
+        Aplica a la ontología la versión actual de un juego como diferencia:
+        solo se quitan y agregan los triples de PROPIEDADES_SINCRONIZADAS que
+        cambiaron. Un valor con el mismo texto no se reescribe aunque su
+        literal tenga otro idioma o tipo
+        
+        Args:
+            juego: Registro de juego (ver parsear_juegos)
+            
+        Returns:
+            tuple: (triples_quitados, triples_agregados)
+        """
+        game_uri = URIRef(juego["game"])
+        deseados = self._triples_juego(juego)
+        claves_deseadas = {(p, str(o)) for s, p, o in deseados if s == game_uri}
+        
+        with self.lock_grafo:
+            actuales = [
+                (game_uri, p, o)
+                for p in PROPIEDADES_SINCRONIZADAS
+                for o in self.graph.objects(game_uri, p)
+            ]
+            claves_actuales = {(p, str(o)) for _, p, o in actuales}
+            
+            quitar = [t for t in actuales if (t[1], str(t[2])) not in claves_deseadas]
+            agregar = [
+                t for t in deseados
+                if t not in self.graph and not (t[0] == game_uri and (t[1], str(t[2])) in claves_actuales)
+            ]
+            
+            for triple in quitar:
+                self.graph.remove(triple)
+            for triple in agregar:
+                self.graph.add(triple)
+        
+        es_nuevo = (game_uri, RDF.type, VG.Videojuego) in agregar
+        if es_nuevo:
+            self.indice_juegos.agregar(game_uri)
+        self.registrar_entidades(juego, nuevo=es_nuevo)
+        return len(quitar), len(agregar)
+    
+    def guardar_ontologia(self):
+        """Guarda el grafo en el archivo OWL"""
+        with self.lock_grafo:
+            self.graph.serialize(destination=self.owl_file, format="xml")
+        self.indice_juegos.guardar()
+    
+    def poblar_ontologia(self, limite=20, progreso=None):
+        """
+        Pobla la ontología con datos de DBpedia o ejemplos
+        
+        Args:
+            limite: Número de juegos nuevos deseados
+            progreso: Callable opcional que recibe el avance como argumentos
+                      con nombre (etapa, obtenidos, agregados, duplicados)
+            
+        Returns:
+            dict: Reporte de generar_reporte_sincronizacion más el total en la ontología
+        """
+        if progreso is None:
+            progreso = lambda **avance: None
+        
         print(f"\n{'='*60}")
         print(f" POBLANDO ONTOLOGÍA")
         print(f"{'='*60}")
         print(f"Límite solicitado: {limite} videojuegos nuevos")
         
+        progreso(etapa='consultando', obtenidos=0, agregados=0, duplicados=0)
         resultados = self.consultar_dbpedia(limite)
         
         if not resultados:
             print("✗ No se obtuvieron resultados")
-            return
+            reporte = self.dbpedia_sync.generar_reporte_sincronizacion(limite, 0, 0)
+            reporte['total'] = len(self.indice_juegos)
+            return reporte
         
         print(f"\n{'─'*60}")
         print(f"Procesando {len(resultados)} videojuegos...")
@@ -278,72 +367,59 @@ class BuscadorSemantico:
         
         count_agregados = 0
         count_duplicados = 0
+        progreso(etapa='procesando', obtenidos=len(resultados))
         
-        # Obtener URIs existentes para doble verificación
-        uris_existentes = self.dbpedia_sync.obtener_juegos_existentes(self.graph, VG)
+        with self.lock_ingesta:
+            # Doble verificación contra el índice y los juegos de esta misma población
+            nuevos = set()
+            # Los triples de todos los juegos se insertan juntos al final (addN)
+            escritor = EscritorGrafo(self.graph, lock=self.lock_grafo)
         
-        for row in resultados:
-            try:
-                game_uri = URIRef(row["game"]["value"])
-                label = row.get("label", {}).get("value", "Sin título")
+            for juego in resultados:
+                try:
+                    game_uri = URIRef(juego["game"])
+                    label = juego.get("titulo") or "Sin título"
                 
-                # Verificar si el juego ya existe (doble verificación)
-                if not self.dbpedia_sync.validar_juego_nuevo(game_uri, uris_existentes):
-                    count_duplicados += 1
-                    print(f"  ⊙ {label} (ya existe, omitiendo)")
-                    continue
+                    # Verificar si el juego ya existe (doble verificación)
+                    if str(game_uri) in nuevos or not self.dbpedia_sync.validar_juego_nuevo(game_uri, self.indice_juegos):
+                        count_duplicados += 1
+                        progreso(duplicados=count_duplicados)
+                        print(f"  ⊙ {label} (ya existe, omitiendo)")
+                        continue
                 
-                # Agregar videojuego
-                self.graph.add((game_uri, RDF.type, VG.Videojuego))
-                self.graph.add((game_uri, VG.titulo, Literal(label, lang="es")))
-                self.graph.add((game_uri, VG.dbpediaURI, Literal(row["game"]["value"], datatype=XSD.anyURI)))
+                    # Mismo juego con otra URI (título normalizado y año)
+                    equivalente = self.resolucion.resolver_juego(label, juego.get("anios", []), game_uri)
+                    if equivalente:
+                        count_duplicados += 1
+                        progreso(duplicados=count_duplicados)
+                        print(f"  ⊙ {label} (duplicado de {equivalente}, omitiendo)")
+                        continue
                 
-                # Agregar año de lanzamiento
-                if "releaseDate" in row:
-                    try:
-                        year = row["releaseDate"]["value"][:4]
-                        self.graph.add((game_uri, VG.anioLanzamiento, Literal(int(year), datatype=XSD.integer)))
-                    except:
-                        pass
+                    # Agregar videojuego con su año, desarrolladores y géneros
+                    escritor.agregar_todos(self._triples_juego(juego))
                 
-                # Agregar desarrollador
-                if "developer" in row:
-                    dev_uri = URIRef(row["developer"]["value"])
-                    dev_name = row["developer"]["value"].split("/")[-1].replace("_", " ")
-                    self.graph.add((dev_uri, RDF.type, VG.Desarrollador))
-                    self.graph.add((dev_uri, RDFS.label, Literal(dev_name)))
-                    self.graph.add((game_uri, VG.desarrolladoPor, dev_uri))
+                    count_agregados += 1
+                    nuevos.add(str(game_uri))  # Agregar a la lista para futuras verificaciones
+                    self.registrar_entidades(juego)
+                    progreso(agregados=count_agregados)
                 
-                # Agregar género
-                if "genre" in row:
-                    genre_uri = URIRef(row["genre"]["value"])
-                    genre_name = row["genre"]["value"].split("/")[-1].replace("_", " ")
-                    self.graph.add((genre_uri, RDF.type, VG.Genero))
-                    self.graph.add((genre_uri, RDFS.label, Literal(genre_name)))
-                    self.graph.add((game_uri, VG.tieneGenero, genre_uri))
+                    anio = f" ({juego['anios'][0]})" if juego.get("anios") else ""
+                    print(f"  ✓ {count_agregados}. {label}{anio} (NUEVO)")
                 
-                count_agregados += 1
-                uris_existentes.add(str(game_uri))  # Agregar a la lista para futuras verificaciones
-                
-                anio = ""
-                if "releaseDate" in row:
-                    try:
-                        anio = f" ({row['releaseDate']['value'][:4]})"
-                    except:
-                        pass
-                print(f"  ✓ {count_agregados}. {label}{anio} (NUEVO)")
-                
-            except Exception as e:
-                print(f"  ✗ Error procesando {label}: {str(e)[:50]}")
+                except Exception as e:
+                    print(f"  ✗ Error procesando {label}: {str(e)[:50]}")
         
+            escritor.confirmar()
+            self.indice_juegos.agregar_todos(nuevos)
 
         reporte = self.dbpedia_sync.generar_reporte_sincronizacion(
             limite, count_agregados, count_duplicados
         )
         
         if count_agregados > 0:
+            progreso(etapa='guardando')
             try:
-                self.graph.serialize(destination=self.owl_file, format="xml")
+                self.guardar_ontologia()
                 print(f"\n{'='*60}")
                 print(f"✓ ONTOLOGÍA GUARDADA EXITOSAMENTE")
                 print(f"{'='*60}")
@@ -351,7 +427,7 @@ class BuscadorSemantico:
                 print(f"  Nuevos agregados: {count_agregados} videojuegos")
                 print(f"  Duplicados omitidos: {count_duplicados}")
                 
-                total = sum(1 for _ in self.graph.triples((None, RDF.type, VG.Videojuego)))
+                total = len(self.indice_juegos)
                 print(f"  Total en ontología: {total} videojuegos")
                 print(f"{'='*60}\n")
             except Exception as e:
@@ -361,10 +437,14 @@ class BuscadorSemantico:
             print(f"⚠ NO SE AGREGARON NUEVOS VIDEOJUEGOS")
             print(f"{'='*60}")
             print(f"  {reporte['mensaje']}")
-            total = sum(1 for _ in self.graph.triples((None, RDF.type, VG.Videojuego)))
+            total = len(self.indice_juegos)
             print(f"  Total en ontología: {total} videojuegos")
             print(f"  SUGERENCIA: Aumenta el límite de juegos a solicitar")
             print(f"{'='*60}\n")
+        
+        reporte['total'] = len(self.indice_juegos)
+        progreso(etapa='terminado')
+        return reporte
 
     def buscar_por_titulo(self, termino):
         """Busca videojuegos por título"""
@@ -507,8 +587,9 @@ class BuscadorSemantico:
     
     def _ejecutar_consulta(self, query):
         """Ejecuta una consulta SPARQL en la ontología local"""
-        resultados = self.graph.query(query)
-        return list(resultados)
+        # Con el lock: una población en curso no modifica el grafo a mitad de la consulta
+        with self.lock_grafo:
+            return list(self.graph.query(query))
 
 def menu_principal():
     print("\n" + "="*60)
@@ -0,0 +1,133 @@
+"""
+Módulo de circuit breaker para servicios remotos
+Registra el resultado real de las consultas y corta el tráfico hacia un
+endpoint caído hasta que pase un tiempo de enfriamiento
+"""
+
+import threading
+import time
+
+CERRADO = 'cerrado'
+ABIERTO = 'abierto'
+SEMIABIERTO = 'semiabierto'
+
+
+class CircuitBreaker:
+    def __init__(self, nombre, umbral_fallos=3, tiempo_apertura=30):
+        """
+        Inicializa el circuito
+
+        Args:
+            nombre: Nombre del servicio protegido (para logs y estado)
+            umbral_fallos: Fallos consecutivos necesarios para abrir el circuito
+            tiempo_apertura: Segundos que el circuito permanece abierto antes
+                             de dejar pasar una petición de prueba
+        """
+        self.nombre = nombre
+        self.UMBRAL_FALLOS = umbral_fallos
+        self.TIEMPO_APERTURA = tiempo_apertura
+
+        self._estado = CERRADO
+        self._fallos_consecutivos = 0
+        self._abierto_desde = None
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+        self.ultimo_exito = None
+        self.ultimo_fallo = None
+        self.ultimo_error = None
+        self.total_exitos = 0
+        self.total_fallos = 0
+        self.total_rechazadas = 0
+
+    @property
+    def estado(self):
+        """Estado actual, pasando a semiabierto si ya venció la apertura"""
+        with self._lock:
+            return self._actualizar_estado()
+
+    def permite_peticion(self):
+        """
+        Indica si se puede hacer una petición remota ahora mismo.
+        En estado semiabierto solo deja pasar una petición de prueba a la vez.
+
+        Returns:
+            bool: True si la petición puede salir hacia el endpoint
+        """
+        with self._lock:
+            estado = self._actualizar_estado()
+
+            if estado == CERRADO:
+                return True
+
+            if estado == SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                print(f"   ⊙ Circuito {self.nombre} semiabierto: enviando petición de prueba")
+                return True
+
+            self.total_rechazadas += 1
+            return False
+
+    def esta_abierto(self):
+        """Consulta sin efectos: True si las peticiones se rechazarían"""
+        return self.estado == ABIERTO
+
+    def registrar_exito(self):
+        """Registra una respuesta correcta del endpoint"""
+        with self._lock:
+            if self._estado != CERRADO:
+                print(f"   ✓ Circuito {self.nombre} cerrado: endpoint recuperado")
+            self._estado = CERRADO
+            self._fallos_consecutivos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+            self.ultimo_exito = time.time()
+            self.total_exitos += 1
+
+    def registrar_fallo(self, error=None):
+        """Registra un fallo del endpoint (timeout, conexión, error 5xx)"""
+        with self._lock:
+            self._fallos_consecutivos += 1
+            self.ultimo_fallo = time.time()
+            self.ultimo_error = str(error)[:200] if error is not None else None
+            self.total_fallos += 1
+
+            if self._estado == SEMIABIERTO or self._fallos_consecutivos >= self.UMBRAL_FALLOS:
+                if self._estado != ABIERTO:
+                    print(f"   ✗ Circuito {self.nombre} abierto durante {self.TIEMPO_APERTURA}s")
+                self._estado = ABIERTO
+                self._abierto_desde = time.time()
+                self._prueba_en_curso = False
+
+    def liberar_prueba(self):
+        """Libera la petición de prueba sin veredicto (se cortó por causas locales)"""
+        with self._lock:
+            self._prueba_en_curso = False
+
+    def obtener_estado(self):
+        """Retorna una instantánea del estado (sin tráfico de red)"""
+        with self._lock:
+            estado = self._actualizar_estado()
+            reintento_en = None
+            if estado == ABIERTO:
+                reintento_en = max(0.0, self._abierto_desde + self.TIEMPO_APERTURA - time.time())
+            return {
+                'nombre': self.nombre,
+                'estado': estado,
+                'disponible': estado != ABIERTO,
+                'fallos_consecutivos': self._fallos_consecutivos,
+                'reintento_en_segundos': round(reintento_en, 1) if reintento_en is not None else None,
+                'ultimo_exito': self.ultimo_exito,
+                'ultimo_fallo': self.ultimo_fallo,
+                'ultimo_error': self.ultimo_error,
+                'total_exitos': self.total_exitos,
+                'total_fallos': self.total_fallos,
+                'total_rechazadas': self.total_rechazadas
+            }
+
+    def _actualizar_estado(self):
+        """Pasa de abierto a semiabierto al vencer la apertura (con el lock tomado)"""
+        if self._estado == ABIERTO and time.time() - self._abierto_desde >= self.TIEMPO_APERTURA:
+            self._estado = SEMIABIERTO
+            self._prueba_en_curso = False
+        return self._estado
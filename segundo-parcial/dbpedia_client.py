@@ -0,0 +1,145 @@
+"""
+Módulo cliente para el endpoint SPARQL de DBpedia
+Punto único por el que pasan todas las consultas remotas para registrar
+su resultado en el circuit breaker compartido
+"""
+
+import os
+from urllib.error import HTTPError
+from SPARQLWrapper import SPARQLWrapper, JSON
+from SPARQLWrapper.SPARQLExceptions import EndPointInternalError, EndPointNotFound
+from circuit_breaker import CircuitBreaker
+from remote_cache import es_error_de_red, es_timeout
+from retry_policy import es_reintentable, politica_reintentos_global
+from dbpedia_mirror import DBpediaMirror
+
+DBPEDIA_ENDPOINT = "http://dbpedia.org/sparql"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+
+# Circuito compartido: todas las consultas a DBpedia alimentan el mismo estado
+circuito_dbpedia = CircuitBreaker(
+    'DBpedia',
+    umbral_fallos=int(os.environ.get('DBPEDIA_CIRCUITO_UMBRAL', 3)),
+    tiempo_apertura=int(os.environ.get('DBPEDIA_CIRCUITO_APERTURA', 30))
+)
+
+# Modo espejo: DBPEDIA_MODO=espejo responde las consultas de videojuegos
+# desde la copia local (dbpedia_mirror.py) en lugar del endpoint público
+MODO_DBPEDIA = os.environ.get('DBPEDIA_MODO', 'remoto')
+RUTA_ESPEJO = os.environ.get(
+    'DBPEDIA_ESPEJO', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dbpedia_espejo.sqlite3')
+)
+espejo_dbpedia = DBpediaMirror(RUTA_ESPEJO) if MODO_DBPEDIA == 'espejo' else None
+
+
+class ConsultaOmitidaError(Exception):
+    """La consulta remota no se completó por una decisión local (no es un fallo de DBpedia)"""
+
+
+class CircuitoAbiertoError(ConsultaOmitidaError):
+    """Se lanza cuando el circuito está abierto y la consulta no se envía"""
+
+
+class PresupuestoAgotadoError(ConsultaOmitidaError):
+    """Se lanza cuando el deadline de la petición no deja tiempo para la consulta"""
+
+
+def es_fallo_del_endpoint(error):
+    """
+    Indica si un error refleja la salud del endpoint (y no de la query)
+
+    Returns:
+        bool: True para timeouts, fallos de conexión y errores 5xx
+    """
+    if isinstance(error, (EndPointInternalError, EndPointNotFound)):
+        return True
+    if isinstance(error, HTTPError) and error.code >= 500:
+        return True
+    return es_error_de_red(error)
+
+
+def crear_cliente(endpoint=DBPEDIA_ENDPOINT, timeout=10):
+    """Crea un SPARQLWrapper nuevo (uno por consulta, no se comparte entre hilos)"""
+    sparql = SPARQLWrapper(endpoint)
+    sparql.setReturnFormat(JSON)
+    sparql.setTimeout(timeout)
+    sparql.addCustomHttpHeader("User-Agent", USER_AGENT)
+    return sparql
+
+
+def _reintentable(error):
+    """Las consultas omitidas por decisión local nunca se reintentan"""
+    return not isinstance(error, ConsultaOmitidaError) and es_reintentable(error)
+
+
+def consultar_sparql(query, endpoint=DBPEDIA_ENDPOINT, timeout=10, circuito=circuito_dbpedia,
+                     deadline=None, max_intentos=None, politica=politica_reintentos_global,
+                     espejo=espejo_dbpedia):
+    """
+    Ejecuta una consulta SPARQL remota pasando por el circuit breaker y la
+    política de reintentos compartida. En modo espejo la responde la copia
+    local, sin tráfico de red
+
+    Args:
+        query: Consulta SPARQL
+        endpoint: URL del endpoint
+        timeout: Timeout máximo en segundos de cada intento
+        circuito: CircuitBreaker que registra el resultado
+        deadline: Deadline de la petición; el timeout se recorta a lo que quede
+        max_intentos: Sobrescribe los intentos de la política (1 = sin reintentos)
+        politica: RetryPolicy con backoff exponencial y presupuesto de reintentos
+        espejo: DBpediaMirror local (None para ir siempre al endpoint)
+
+    Returns:
+        dict: Respuesta JSON del endpoint
+
+    Raises:
+        CircuitoAbiertoError: Si el circuito está abierto (no hay tráfico de red)
+        PresupuestoAgotadoError: Si el deadline no deja tiempo para la consulta
+    """
+    if espejo is not None:
+        return espejo.consultar(query)
+
+    return politica.ejecutar(
+        lambda: _consultar_una_vez(query, endpoint, timeout, circuito, deadline),
+        max_intentos=max_intentos,
+        deadline=deadline,
+        descripcion="consulta SPARQL",
+        reintentable=_reintentable
+    )
+
+
+def _consultar_una_vez(query, endpoint, timeout, circuito, deadline):
+    """Un único intento de consulta, registrando el resultado en el circuito"""
+    timeout_efectivo = timeout
+    if deadline is not None:
+        restante = deadline.timeout_para(timeout)
+        if restante is None:
+            deadline.marcar_agotado()
+            raise PresupuestoAgotadoError("Presupuesto de la petición agotado, consulta omitida")
+        # SPARQLWrapper trunca el timeout a segundos enteros (y 0 significa sin límite)
+        timeout_efectivo = max(1, int(restante))
+
+    if not circuito.permite_peticion():
+        raise CircuitoAbiertoError(f"Circuito {circuito.nombre} abierto, consulta omitida")
+
+    sparql = crear_cliente(endpoint, timeout_efectivo)
+    sparql.setQuery(query)
+
+    try:
+        resultado = sparql.query().convert()
+    except Exception as e:
+        if timeout_efectivo < timeout and es_timeout(e):
+            # El corte lo provocó nuestro presupuesto, no la salud del endpoint
+            circuito.liberar_prueba()
+            deadline.marcar_agotado()
+            raise PresupuestoAgotadoError("Presupuesto de la petición agotado durante la consulta") from e
+        if es_fallo_del_endpoint(e):
+            circuito.registrar_fallo(e)
+        else:
+            # El endpoint respondió; el problema es de la consulta
+            circuito.registrar_exito()
+        raise
+
+    circuito.registrar_exito()
+    return resultado
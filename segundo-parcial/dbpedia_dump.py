@@ -0,0 +1,318 @@
+"""
+Módulo de ingesta masiva desde volcados (dumps) de DBpedia
+Lee en streaming archivos N-Triples o Turtle (opcionalmente .bz2/.gz),
+se queda con los videojuegos y sus títulos, fechas, desarrolladores y
+géneros, y los carga en la ontología sin consultar el endpoint
+
+Uso:
+    python dbpedia_dump.py instance_types_en.ttl.bz2 labels_en.ttl.bz2 \\
+        mappingbased_objects_en.ttl.bz2 mappingbased_literals_en.ttl.bz2
+"""
+
+import argparse
+import bz2
+import gzip
+import io
+import os
+import re
+import time
+from rdflib import RDF, RDFS
+from dbpedia_queries import nombre_desde_uri, crear_registro_juego
+from graph_writer import EscritorGrafo
+
+RDF_TYPE = str(RDF.type)
+RDFS_LABEL = str(RDFS.label)
+DBO_VIDEOGAME = "http://dbpedia.org/ontology/VideoGame"
+DBO_RELEASE_DATE = "http://dbpedia.org/ontology/releaseDate"
+DBO_DEVELOPER = "http://dbpedia.org/ontology/developer"
+DBO_GENRE = "http://dbpedia.org/ontology/genre"
+
+PREDICADOS_DE_INTERES = {RDFS_LABEL, DBO_RELEASE_DATE, DBO_DEVELOPER, DBO_GENRE}
+
+PATRON_PREFIJO = re.compile(r'^(?:@prefix|PREFIX)\s+([\w-]*):\s*<([^>]*)>', re.IGNORECASE)
+PATRON_ESCAPE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+
+def abrir_volcado(ruta):
+    """
+    Abre un volcado en modo texto, descomprimiendo .bz2/.gz en streaming
+
+    Returns:
+        tuple: (archivo de texto, archivo binario subyacente para medir el avance)
+    """
+    crudo = open(ruta, 'rb')
+    if ruta.endswith('.bz2'):
+        binario = bz2.BZ2File(crudo)
+    elif ruta.endswith('.gz'):
+        binario = gzip.GzipFile(fileobj=crudo)
+    else:
+        binario = crudo
+    return io.TextIOWrapper(binario, encoding='utf-8', errors='replace'), crudo
+
+
+def _desescapar(texto):
+    """Resuelve los escapes de N-Triples/Turtle (\\", \\n, \\uXXXX...)"""
+    if '\\' not in texto:
+        return texto
+
+    def reemplazar(match):
+        codigo = match.group(1)
+        if codigo[0] in 'uU' and len(codigo) > 1:
+            return chr(int(codigo[1:], 16))
+        return ESCAPES.get(codigo, codigo)
+
+    return PATRON_ESCAPE.sub(reemplazar, texto)
+
+
+class LectorTriples:
+    """
+    Parser de línea para N-Triples y Turtle con un triple por línea (el
+    formato en que DBpedia publica sus volcados .ttl). Las sentencias
+    Turtle que ocupan varias líneas (con ';' o ',') se cuentan como omitidas.
+    """
+
+    def __init__(self):
+        self.prefijos = {}
+        self.omitidas = 0
+
+    def _expandir(self, termino):
+        """Convierte <iri> o prefijo:nombre en IRI; None si no es un IRI"""
+        if termino.startswith('<') and termino.endswith('>'):
+            return termino[1:-1]
+        if termino == 'a':
+            return RDF_TYPE
+        if ':' in termino and not termino.startswith('_:'):
+            prefijo, nombre = termino.split(':', 1)
+            if prefijo in self.prefijos:
+                return self.prefijos[prefijo] + nombre
+        return None
+
+    def _objeto(self, texto):
+        """
+        Interpreta el objeto de un triple
+
+        Returns:
+            tuple: ('uri', iri) o ('literal', valor, idioma, tipo); None si no se reconoce
+        """
+        if texto.startswith('"'):
+            cierre = texto.rfind('"')
+            if cierre <= 0:
+                return None
+            valor = _desescapar(texto[1:cierre])
+            sufijo = texto[cierre + 1:]
+            idioma = sufijo[1:] if sufijo.startswith('@') else None
+            tipo = self._expandir(sufijo[2:]) if sufijo.startswith('^^') else None
+            return ('literal', valor, idioma, tipo)
+
+        iri = self._expandir(texto)
+        return ('uri', iri) if iri else None
+
+    def leer(self, linea):
+        """
+        Interpreta una línea del volcado
+
+        Returns:
+            tuple | None: (sujeto, predicado, objeto) o None si no es un triple utilizable
+        """
+        linea = linea.strip()
+        if not linea or linea.startswith('#'):
+            return None
+
+        prefijo = PATRON_PREFIJO.match(linea)
+        if prefijo:
+            self.prefijos[prefijo.group(1)] = prefijo.group(2)
+            return None
+
+        if not linea.endswith('.'):
+            self.omitidas += 1
+            return None
+
+        partes = linea[:-1].rstrip().split(None, 2)
+        if len(partes) < 3:
+            self.omitidas += 1
+            return None
+
+        sujeto = self._expandir(partes[0])
+        predicado = self._expandir(partes[1])
+        objeto = self._objeto(partes[2].rstrip())
+        if sujeto is None or predicado is None or objeto is None:
+            self.omitidas += 1
+            return None
+        return sujeto, predicado, objeto
+
+
+class DumpIngestor:
+    def __init__(self, buscador, idiomas=('en', 'es'), tamano_lote=10000, intervalo_progreso=1000000):
+        """
+        Inicializa la ingesta
+
+        Args:
+            buscador: BuscadorSemantico cuyo grafo recibe los juegos
+            idiomas: Idiomas aceptados para el título, en orden de preferencia
+            tamano_lote: Triples acumulados antes de volcarlos al grafo
+            intervalo_progreso: Cada cuántas líneas se informa el avance
+        """
+        self.buscador = buscador
+        self.idiomas = list(idiomas)
+        self.TAMANO_LOTE = tamano_lote
+        self.INTERVALO_PROGRESO = intervalo_progreso
+
+    def _recorrer(self, rutas, descripcion):
+        """Genera los triples de todos los volcados informando el avance"""
+        for ruta in rutas:
+            lector = LectorTriples()
+            tamano = os.path.getsize(ruta)
+            texto, crudo = abrir_volcado(ruta)
+            inicio = time.time()
+            lineas = 0
+
+            print(f"\n→ {descripcion}: {os.path.basename(ruta)} ({tamano / 1e6:.1f} MB)")
+            with crudo, texto:
+                for linea in texto:
+                    lineas += 1
+                    if lineas % self.INTERVALO_PROGRESO == 0:
+                        leidos = crudo.tell()
+                        transcurrido = time.time() - inicio
+                        print(f"   {lineas:,} líneas · {100 * leidos / max(tamano, 1):.1f}% · "
+                              f"{lineas / max(transcurrido, 1e-6):,.0f} líneas/s")
+                    triple = lector.leer(linea)
+                    if triple is not None:
+                        yield triple
+
+            print(f"   ✓ {lineas:,} líneas en {time.time() - inicio:.1f}s "
+                  f"({lector.omitidas:,} omitidas)")
+
+    def recolectar_juegos(self, rutas, uris_existentes, max_juegos=None):
+        """
+        Primera pasada: URIs de los recursos con tipo dbo:VideoGame
+
+        Returns:
+            set: URIs de juegos nuevos (no existentes en la ontología)
+        """
+        juegos = set()
+        for sujeto, predicado, objeto in self._recorrer(rutas, "Pasada 1/2 (videojuegos)"):
+            if predicado == RDF_TYPE and objeto[0] == 'uri' and objeto[1] == DBO_VIDEOGAME:
+                if sujeto not in uris_existentes:
+                    juegos.add(sujeto)
+                    if max_juegos is not None and len(juegos) >= max_juegos:
+                        break
+        print(f"   ✓ {len(juegos):,} videojuegos nuevos en el volcado")
+        return juegos
+
+    def ingerir(self, rutas, max_juegos=None, guardar=True):
+        """
+        Carga los videojuegos de los volcados en la ontología
+
+        Args:
+            rutas: Archivos de volcado (.nt/.ttl, opcionalmente .bz2/.gz)
+            max_juegos: Tope opcional de juegos nuevos
+            guardar: Si es True, serializa la ontología al terminar
+
+        Returns:
+            dict: Resumen de la ingesta
+        """
+        from buscador_semantico import VG
+
+        inicio = time.time()
+        graph = self.buscador.graph
+        juegos = self.recolectar_juegos(rutas, self.buscador.indice_juegos, max_juegos)
+
+        # Estado acotado por la cantidad de juegos, no por el tamaño del volcado
+        titulos = {}      # juego -> (prioridad del idioma, título)
+        anios = {}        # juego -> año más antiguo
+        relaciones = {}   # juego -> {clase: [URIs de desarrolladores o géneros]}
+        escritor = EscritorGrafo(graph, tamano_lote=self.TAMANO_LOTE, lock=self.buscador.lock_grafo)
+        prioridad = {idioma: i for i, idioma in enumerate(self.idiomas)}
+
+        for sujeto, predicado, objeto in self._recorrer(rutas, "Pasada 2/2 (propiedades)"):
+            if sujeto not in juegos or predicado not in PREDICADOS_DE_INTERES:
+                continue
+
+            if predicado == RDFS_LABEL and objeto[0] == 'literal':
+                idioma = objeto[2]
+                if idioma in prioridad:
+                    actual = titulos.get(sujeto)
+                    if actual is None or prioridad[idioma] < actual[0]:
+                        titulos[sujeto] = (prioridad[idioma], objeto[1])
+
+            elif predicado == DBO_RELEASE_DATE and objeto[0] == 'literal':
+                try:
+                    anio = int(objeto[1][:4])
+                except ValueError:
+                    continue
+                anios[sujeto] = min(anio, anios.get(sujeto, anio))
+
+            elif predicado in (DBO_DEVELOPER, DBO_GENRE) and objeto[0] == 'uri':
+                clase = 'desarrolladores' if predicado == DBO_DEVELOPER else 'generos'
+                por_clase = relaciones.setdefault(sujeto, {}).setdefault(clase, [])
+                if objeto[1] not in por_clase:
+                    por_clase.append(objeto[1])
+
+        # Cada juego pasa por la resolución de entidades como en poblar: se
+        # descartan los que ya están con otra URI, y desarrolladores y géneros
+        # usan la URI canónica de su nombre. El reconocedor se carga al final
+        with self.buscador.lock_ingesta:
+            nuevos, fusionados, nombres = [], 0, []
+            with self.buscador.resolucion.sin_gazetteer():
+                for juego in juegos:
+                    titulo = titulos[juego][1] if juego in titulos else nombre_desde_uri(juego)
+                    anios_juego = [anios[juego]] if juego in anios else []
+                    if self.buscador.resolucion.resolver_juego(titulo, anios_juego, juego):
+                        fusionados += 1
+                        continue
+
+                    recursos = relaciones.get(juego, {})
+                    registro = crear_registro_juego(
+                        juego, titulo, str(anios[juego]) if juego in anios else None,
+                        recursos.get('desarrolladores', []), recursos.get('generos', []), source='dump'
+                    )
+                    escritor.agregar_todos(self.buscador._triples_juego(registro))
+                    self.buscador.registrar_entidades(registro)
+                    nuevos.append(juego)
+                    nombres.append(('Videojuego', titulo, juego))
+                    nombres += [('Desarrollador', n, u) for n, u in zip(registro['desarrolladores'], registro['desarrolladores_uri'])]
+                    nombres += [('Genero', n, u) for n, u in zip(registro['generos'], registro['generos_uri'])]
+            escritor.confirmar()
+            self.buscador.indice_juegos.agregar_todos(nuevos)
+        self.buscador.gazetteer.agregar_todos(
+            (tipo, nombre, self.buscador.resolucion.resolver_recurso(VG[tipo], nombre, uri) if tipo != 'Videojuego' else uri)
+            for tipo, nombre, uri in nombres
+        )
+
+        if guardar and nuevos:
+            print(f"\n→ Guardando ontología en {self.buscador.owl_file}...")
+            self.buscador.guardar_ontologia()
+
+        resumen = {
+            'juegos_nuevos': len(nuevos),
+            'fusionados': fusionados,
+            'con_titulo': len(titulos),
+            'con_anio': len(anios),
+            'triples_agregados': escritor.triples_agregados,
+            'segundos': round(time.time() - inicio, 1)
+        }
+        print(f"\n✓ Ingesta terminada: {resumen['juegos_nuevos']:,} juegos "
+              f"({resumen['fusionados']:,} fusionados con existentes), "
+              f"{resumen['triples_agregados']:,} triples en {resumen['segundos']}s")
+        return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga videojuegos desde volcados de DBpedia (sin conexión)")
+    parser.add_argument('volcados', nargs='+', help="Archivos .nt/.ttl, opcionalmente comprimidos (.bz2/.gz)")
+    parser.add_argument('--owl', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'videojuegos.owl'),
+                        help="Ontología destino")
+    parser.add_argument('--idiomas', default='en,es', help="Idiomas del título en orden de preferencia")
+    parser.add_argument('--max-juegos', type=int, default=None, help="Tope de juegos nuevos")
+    parser.add_argument('--lote', type=int, default=10000, help="Triples por inserción en el grafo")
+    args = parser.parse_args()
+
+    from buscador_semantico import BuscadorSemantico
+    buscador = BuscadorSemantico(args.owl)
+    ingestor = DumpIngestor(buscador, idiomas=args.idiomas.split(','), tamano_lote=args.lote)
+    ingestor.ingerir(args.volcados, max_juegos=args.max_juegos)
+
+
+if __name__ == '__main__':
+    main()
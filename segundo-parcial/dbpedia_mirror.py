@@ -0,0 +1,426 @@
+"""
+Módulo espejo local de DBpedia
+Guarda el subgrafo dbo:VideoGame (labels en todos los idiomas soportados,
+fecha, desarrolladores con sus labels y géneros) en SQLite indexado y responde las
+consultas de dbpedia_queries con el mismo formato JSON que el endpoint
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dbpedia_queries import (
+    ConsultaJuegos, ConsultaLabels, SEPARADOR, construir_consulta_juegos,
+    construir_consulta_labels, nombre_desde_uri
+)
+
+# Idiomas de los labels que se copian (los de multilingual.py, inglés primero)
+IDIOMAS_ESPEJO = ('en', 'es', 'fr', 'de', 'it', 'pt', 'ja')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS juegos (
+    uri TEXT PRIMARY KEY,
+    fecha TEXT,
+    anio INTEGER
+);
+CREATE TABLE IF NOT EXISTS labels (
+    juego TEXT NOT NULL,
+    idioma TEXT NOT NULL,
+    label TEXT NOT NULL,
+    label_min TEXT NOT NULL,
+    PRIMARY KEY (juego, idioma, label)
+);
+CREATE TABLE IF NOT EXISTS desarrolladores (
+    juego TEXT NOT NULL,
+    uri TEXT NOT NULL,
+    nombre_min TEXT NOT NULL,
+    PRIMARY KEY (juego, uri)
+);
+CREATE TABLE IF NOT EXISTS labels_desarrolladores (
+    uri TEXT NOT NULL,
+    label TEXT NOT NULL,
+    label_min TEXT NOT NULL,
+    PRIMARY KEY (uri, label)
+);
+CREATE TABLE IF NOT EXISTS generos (
+    juego TEXT NOT NULL,
+    uri TEXT NOT NULL,
+    PRIMARY KEY (juego, uri)
+);
+CREATE TABLE IF NOT EXISTS metadatos (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_juegos_anio ON juegos (anio);
+CREATE INDEX IF NOT EXISTS idx_juegos_fecha ON juegos (fecha);
+CREATE INDEX IF NOT EXISTS idx_labels_idioma ON labels (idioma, juego);
+CREATE INDEX IF NOT EXISTS idx_generos_uri ON generos (uri);
+CREATE INDEX IF NOT EXISTS idx_desarrolladores_uri ON desarrolladores (uri);
+"""
+
+# Órdenes equivalentes a dbpedia_queries.ORDENES
+ORDENES_SQL = {
+    'fecha_desc': "ORDER BY j.fecha DESC",
+    'fecha_asc': "ORDER BY j.fecha",
+    'game': "ORDER BY j.uri"
+}
+
+# Desarrolladores por consulta de labels al importar
+LOTE_LABELS_DESARROLLADORES = 200
+
+# Igual que el endpoint: algún rdfs:label del desarrollador contiene el texto.
+# Los desarrolladores sin labels copiados (espejos importados antes de que se
+# copiaran) se comparan por el nombre de su URI
+FILTRO_DESARROLLADOR_SQL = """
+    EXISTS (
+        SELECT 1 FROM desarrolladores d
+        WHERE d.juego = j.uri AND (
+            EXISTS (SELECT 1 FROM labels_desarrolladores ld
+                    WHERE ld.uri = d.uri AND instr(ld.label_min, ?) > 0)
+            OR (NOT EXISTS (SELECT 1 FROM labels_desarrolladores ld WHERE ld.uri = d.uri)
+                AND instr(d.nombre_min, ?) > 0)
+        )
+    )
+"""
+
+
+def _literal(valor):
+    """Valor literal con el formato JSON de SPARQL"""
+    return {'type': 'literal', 'value': valor}
+
+
+def _uri(valor):
+    """URI con el formato JSON de SPARQL"""
+    return {'type': 'uri', 'value': valor}
+
+
+class DBpediaMirror:
+    def __init__(self, ruta):
+        """
+        Inicializa el espejo (crea el esquema si el archivo no existe)
+
+        Args:
+            ruta: Archivo SQLite del espejo
+        """
+        self.ruta = ruta
+        self._lock_escritura = threading.Lock()
+        self.consultas_atendidas = 0
+
+        with self._conectar() as conexion:
+            conexion.executescript(ESQUEMA)
+
+    @contextmanager
+    def _conectar(self):
+        """Una conexión por operación (SQLite no comparte conexiones entre hilos)"""
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            with conexion:
+                yield conexion
+        finally:
+            conexion.close()
+
+    def consultar(self, query):
+        """
+        Ejecuta una consulta construida con dbpedia_queries
+
+        Args:
+            query: ConsultaJuegos o ConsultaLabels
+
+        Returns:
+            dict: Respuesta con el formato JSON de SPARQL ({"results": {"bindings": [...]}})
+        """
+        self.consultas_atendidas += 1
+        if isinstance(query, ConsultaJuegos):
+            bindings = self._consultar_juegos(**query.parametros)
+        elif isinstance(query, ConsultaLabels):
+            bindings = self._consultar_labels(**query.parametros)
+        else:
+            # Consultas SPARQL libres: el espejo no las interpreta
+            bindings = []
+        return {"head": {"vars": []}, "results": {"bindings": bindings}}
+
+    def _consultar_juegos(self, idioma, contiene, desarrollador_contiene, genero_uri,
+                          anio_min, anio_max, requiere_fecha, requiere_desarrollador,
+                          orden, limite, offset, despues_de, marca, marca_min, marcas_por_juego):
+        """Traduce los parámetros de ConsultaJuegos a SQL sobre las tablas indexadas"""
+        if marca:
+            # El espejo no guarda revisiones de Wikipedia: se refresca reimportando
+            return []
+
+        condiciones = ["l.idioma = ?"]
+        argumentos = [idioma]
+
+        if despues_de:
+            condiciones.append("j.uri > ?")
+            argumentos.append(despues_de)
+
+        if contiene:
+            alternativas = []
+            for termino, excluido in contiene:
+                if excluido:
+                    alternativas.append("(instr(l.label_min, ?) > 0 AND instr(l.label_min, ?) = 0)")
+                    argumentos.extend([termino.lower(), excluido.lower()])
+                else:
+                    alternativas.append("instr(l.label_min, ?) > 0")
+                    argumentos.append(termino.lower())
+            condiciones.append(f"({' OR '.join(alternativas)})")
+
+        if desarrollador_contiene:
+            condiciones.append(FILTRO_DESARROLLADOR_SQL)
+            argumentos.extend([desarrollador_contiene.lower()] * 2)
+
+        if genero_uri:
+            condiciones.append("EXISTS (SELECT 1 FROM generos g WHERE g.juego = j.uri AND g.uri = ?)")
+            argumentos.append(genero_uri)
+
+        if requiere_fecha:
+            condiciones.append("j.fecha IS NOT NULL")
+        if anio_min is not None:
+            condiciones.append("j.anio >= ?")
+            argumentos.append(int(anio_min))
+        if anio_max is not None:
+            condiciones.append("j.anio <= ?")
+            argumentos.append(int(anio_max))
+
+        if requiere_desarrollador:
+            condiciones.append("EXISTS (SELECT 1 FROM desarrolladores d WHERE d.juego = j.uri)")
+
+        sql = f"""
+            SELECT j.uri, MIN(l.label), j.fecha
+            FROM juegos j JOIN labels l ON l.juego = j.uri
+            WHERE {' AND '.join(condiciones)}
+            GROUP BY j.uri
+            {ORDENES_SQL.get(orden, '')}
+            LIMIT ? OFFSET ?
+        """
+        argumentos.extend([int(limite), int(offset or 0)])
+
+        with self._conectar() as conexion:
+            filas = conexion.execute(sql, argumentos).fetchall()
+            uris = [fila[0] for fila in filas]
+            desarrolladores = self._valores_por_juego(conexion, 'desarrolladores', uris)
+            generos = self._valores_por_juego(conexion, 'generos', uris)
+
+        bindings = []
+        for uri, label, fecha in filas:
+            row = {
+                'game': _uri(uri),
+                'label': {'type': 'literal', 'xml:lang': idioma, 'value': label},
+                'developers': _literal(SEPARADOR.join(desarrolladores.get(uri, []))),
+                'genres': _literal(SEPARADOR.join(generos.get(uri, [])))
+            }
+            if fecha:
+                row['releaseDate'] = _literal(fecha)
+            bindings.append(row)
+        return bindings
+
+    def _valores_por_juego(self, conexion, tabla, uris):
+        """URIs de desarrolladores o géneros de varios juegos, en una consulta"""
+        valores = {}
+        if not uris:
+            return valores
+        marcadores = ', '.join('?' for _ in uris)
+        for juego, uri in conexion.execute(
+            f"SELECT juego, uri FROM {tabla} WHERE juego IN ({marcadores})", uris
+        ):
+            valores.setdefault(juego, []).append(uri)
+        return valores
+
+    def _consultar_labels(self, uris, idiomas):
+        """Labels de varios recursos en varios idiomas"""
+        if not uris or not idiomas:
+            return []
+        marcadores_uris = ', '.join('?' for _ in uris)
+        marcadores_idiomas = ', '.join('?' for _ in idiomas)
+        sql = f"""
+            SELECT juego, idioma, MIN(label) FROM labels
+            WHERE juego IN ({marcadores_uris}) AND idioma IN ({marcadores_idiomas})
+            GROUP BY juego, idioma
+        """
+        with self._conectar() as conexion:
+            filas = conexion.execute(sql, list(uris) + list(idiomas)).fetchall()
+        return [
+            {
+                'game': _uri(juego),
+                'lang': _literal(idioma),
+                'label': {'type': 'literal', 'xml:lang': idioma, 'value': label}
+            }
+            for juego, idioma, label in filas
+        ]
+
+    def guardar_juegos(self, juegos):
+        """
+        Inserta o reemplaza juegos en el espejo (una transacción por lote)
+
+        Args:
+            juegos: Iterable de dicts con 'game', 'labels' ({idioma: [labels]}),
+                    'fecha', 'desarrolladores_uri' y 'generos_uri'
+
+        Returns:
+            int: Juegos guardados
+        """
+        juegos = list(juegos)
+        if not juegos:
+            return 0
+
+        uris = [(juego['game'],) for juego in juegos]
+        filas_juegos, filas_labels, filas_devs, filas_generos = [], [], [], []
+        for juego in juegos:
+            fecha = juego.get('fecha')
+            anio = None
+            if fecha:
+                try:
+                    anio = int(fecha[:4])
+                except ValueError:
+                    fecha = None
+            filas_juegos.append((juego['game'], fecha, anio))
+
+            for idioma, labels in juego.get('labels', {}).items():
+                for label in labels:
+                    filas_labels.append((juego['game'], idioma, label, label.lower()))
+            for dev in juego.get('desarrolladores_uri', []):
+                filas_devs.append((juego['game'], dev, nombre_desde_uri(dev).lower()))
+            for genero in juego.get('generos_uri', []):
+                filas_generos.append((juego['game'], genero))
+
+        with self._lock_escritura, self._conectar() as conexion:
+            for tabla in ('labels', 'desarrolladores', 'generos'):
+                conexion.executemany(f"DELETE FROM {tabla} WHERE juego = ?", uris)
+            conexion.executemany("INSERT OR REPLACE INTO juegos VALUES (?, ?, ?)", filas_juegos)
+            conexion.executemany("INSERT OR IGNORE INTO labels VALUES (?, ?, ?, ?)", filas_labels)
+            conexion.executemany("INSERT OR IGNORE INTO desarrolladores VALUES (?, ?, ?)", filas_devs)
+            conexion.executemany("INSERT OR IGNORE INTO generos VALUES (?, ?)", filas_generos)
+        return len(juegos)
+
+    def guardar_labels_desarrolladores(self, labels):
+        """
+        Guarda los labels de desarrolladores (reemplaza los que ya tenían)
+
+        Args:
+            labels: dict {uri del desarrollador: [labels]}
+        """
+        if not labels:
+            return
+        filas = [(uri, label, label.lower()) for uri, valores in labels.items() for label in valores]
+        with self._lock_escritura, self._conectar() as conexion:
+            conexion.executemany("DELETE FROM labels_desarrolladores WHERE uri = ?", [(uri,) for uri in labels])
+            conexion.executemany("INSERT OR IGNORE INTO labels_desarrolladores VALUES (?, ?, ?)", filas)
+
+    def desarrolladores_sin_labels(self, uris):
+        """URIs de `uris` cuyos labels todavía no están en el espejo"""
+        uris = list(dict.fromkeys(uris))
+        if not uris:
+            return []
+        conocidas = set()
+        with self._conectar() as conexion:
+            for inicio in range(0, len(uris), 500):
+                bloque = uris[inicio:inicio + 500]
+                marcadores = ', '.join('?' for _ in bloque)
+                conocidas.update(fila[0] for fila in conexion.execute(
+                    f"SELECT DISTINCT uri FROM labels_desarrolladores WHERE uri IN ({marcadores})", bloque
+                ))
+        return [uri for uri in uris if uri not in conocidas]
+
+    def guardar_metadato(self, clave, valor):
+        """Guarda un valor de control (última importación, origen, etc.)"""
+        with self._lock_escritura, self._conectar() as conexion:
+            conexion.execute("INSERT OR REPLACE INTO metadatos VALUES (?, ?)", (clave, str(valor)))
+
+    def obtener_metadato(self, clave, defecto=None):
+        """Lee un valor de control"""
+        with self._conectar() as conexion:
+            fila = conexion.execute("SELECT valor FROM metadatos WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else defecto
+
+    def obtener_estadisticas(self):
+        """Tamaño del espejo y uso"""
+        with self._conectar() as conexion:
+            juegos = conexion.execute("SELECT COUNT(*) FROM juegos").fetchone()[0]
+            labels = conexion.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+            labels_desarrolladores = conexion.execute("SELECT COUNT(*) FROM labels_desarrolladores").fetchone()[0]
+            idiomas = [fila[0] for fila in conexion.execute("SELECT DISTINCT idioma FROM labels")]
+        return {
+            'ruta': self.ruta,
+            'juegos': juegos,
+            'labels': labels,
+            'labels_desarrolladores': labels_desarrolladores,
+            'idiomas': sorted(idiomas),
+            'consultas_atendidas': self.consultas_atendidas,
+            'ultima_importacion': self.obtener_metadato('ultima_importacion')
+        }
+
+    def importar_desde_dbpedia(self, idiomas=IDIOMAS_ESPEJO, lote=500, max_juegos=None):
+        """
+        Llena el espejo copiando el subgrafo de videojuegos del endpoint remoto
+
+        Args:
+            idiomas: Idiomas de los labels a copiar (el primero es el principal)
+            lote: Juegos por consulta
+            max_juegos: Tope opcional de juegos a copiar
+
+        Returns:
+            int: Juegos copiados
+        """
+        from dbpedia_client import consultar_sparql
+
+        total = 0
+        cursor = None
+        inicio = time.time()
+        while max_juegos is None or total < max_juegos:
+            # Paginación por clave: cada página cuesta lo mismo que la primera
+            query = construir_consulta_juegos(idioma=idiomas[0], orden='game', limite=lote, despues_de=cursor)
+            # espejo=None: la copia siempre va al endpoint remoto
+            respuesta = consultar_sparql(query, timeout=60, espejo=None)
+            juegos = {}
+            for row in respuesta.get("results", {}).get("bindings", []):
+                if 'game' not in row or 'label' not in row:
+                    continue
+                juegos[row['game']['value']] = {
+                    'game': row['game']['value'],
+                    'labels': {idiomas[0]: [row['label']['value']]},
+                    'fecha': row.get('releaseDate', {}).get('value'),
+                    'desarrolladores_uri': [v for v in row.get('developers', {}).get('value', '').split(SEPARADOR) if v],
+                    'generos_uri': [v for v in row.get('genres', {}).get('value', '').split(SEPARADOR) if v]
+                }
+            if not juegos:
+                break
+
+            if len(idiomas) > 1:
+                respuesta = consultar_sparql(
+                    construir_consulta_labels(list(juegos), idiomas[1:]), timeout=60, espejo=None
+                )
+                for row in respuesta.get("results", {}).get("bindings", []):
+                    juego = juegos.get(row.get('game', {}).get('value'))
+                    if juego is not None and 'label' in row:
+                        juego['labels'].setdefault(row['lang']['value'], []).append(row['label']['value'])
+
+            # Labels de los desarrolladores nuevos: el filtro por desarrollador
+            # del endpoint compara con ellos, no con el nombre de la URI
+            pendientes = self.desarrolladores_sin_labels(
+                dev for juego in juegos.values() for dev in juego['desarrolladores_uri']
+            )
+            labels_devs = {}
+            for desde in range(0, len(pendientes), LOTE_LABELS_DESARROLLADORES):
+                bloque = pendientes[desde:desde + LOTE_LABELS_DESARROLLADORES]
+                respuesta = consultar_sparql(construir_consulta_labels(bloque, idiomas), timeout=60, espejo=None)
+                for row in respuesta.get("results", {}).get("bindings", []):
+                    if 'game' in row and 'label' in row:
+                        labels_devs.setdefault(row['game']['value'], []).append(row['label']['value'])
+            self.guardar_labels_desarrolladores(labels_devs)
+
+            total += self.guardar_juegos(juegos.values())
+            cursor = max(juegos)
+            print(f"   ✓ Espejo: {total} juegos copiados ({time.time() - inicio:.1f}s)")
+
+        self.guardar_metadato('ultima_importacion', time.strftime('%Y-%m-%dT%H:%M:%S'))
+        return total
+
+
+if __name__ == '__main__':
+    # python dbpedia_mirror.py [max_juegos]: llena el espejo desde DBpedia
+    import sys
+    from dbpedia_client import RUTA_ESPEJO
+    espejo = DBpediaMirror(RUTA_ESPEJO)
+    maximo = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    copiados = espejo.importar_desde_dbpedia(max_juegos=maximo)
+    print(f"✓ {copiados} juegos en {RUTA_ESPEJO}")
@@ -0,0 +1,299 @@
+"""
+Módulo constructor de consultas de videojuegos para DBpedia
+Agrega en el servidor (SAMPLE/MIN/GROUP_CONCAT) las filas multivaluadas
+de cada juego, para que una consulta devuelva un registro por juego
+"""
+
+# Separador de los valores concatenados con GROUP_CONCAT
+SEPARADOR = "|"
+
+PREFIJOS = """
+        PREFIX dbo: <http://dbpedia.org/ontology/>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+"""
+
+# Órdenes soportados; ?releaseDate es la fecha agregada (la más antigua)
+ORDENES = {
+    'fecha_desc': "ORDER BY DESC(?releaseDate)",
+    'fecha_asc': "ORDER BY ?releaseDate",
+    'game': "ORDER BY STR(?game)",
+    'marca': "ORDER BY ?marca",
+    'marca_desc': "ORDER BY DESC(?marca)"
+}
+
+# Marcas de agua para sincronización incremental: propiedades numéricas
+# que crecen al crear la página del juego o al editarla
+MARCAS = {
+    'pagina': "dbo:wikiPageID",
+    'revision': "dbo:wikiPageRevisionID"
+}
+
+
+def escapar_literal(texto):
+    """Escapa un texto para usarlo dentro de un literal SPARQL entre comillas dobles"""
+    return str(texto).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def titulo_contiene(termino, excluido=None):
+    """Filtro: el título (?l) contiene `termino` (y no `excluido`) sin distinguir mayúsculas"""
+    filtro = f'CONTAINS(LCASE(?l), LCASE("{escapar_literal(termino)}"))'
+    if excluido:
+        filtro = f'({filtro} && !CONTAINS(LCASE(?l), LCASE("{escapar_literal(excluido)}")))'
+    return filtro
+
+
+def normalizar_terminos(contiene):
+    """Convierte la lista `contiene` en pares (término, excluido o None)"""
+    terminos = []
+    for termino in contiene or []:
+        if isinstance(termino, (tuple, list)):
+            terminos.append((termino[0], termino[1]))
+        else:
+            terminos.append((termino, None))
+    return terminos
+
+
+class ConsultaJuegos(str):
+    """
+    Consulta SPARQL de juegos que conserva sus parámetros, para que el
+    espejo local de DBpedia pueda ejecutarla sin interpretar el texto
+    """
+
+    def __new__(cls, **parametros):
+        consulta = super().__new__(cls, _renderizar_consulta_juegos(**parametros))
+        consulta.parametros = parametros
+        return consulta
+
+
+class ConsultaLabels(str):
+    """Consulta SPARQL de labels por lotes (VALUES), con sus parámetros"""
+
+    def __new__(cls, uris, idiomas):
+        consulta = super().__new__(cls, _renderizar_consulta_labels(uris, idiomas))
+        consulta.parametros = {'uris': list(uris), 'idiomas': list(idiomas)}
+        return consulta
+
+
+def construir_consulta_juegos(idioma='en', contiene=None, desarrollador_contiene=None,
+                              genero_uri=None, anio_min=None, anio_max=None,
+                              requiere_fecha=False, requiere_desarrollador=False,
+                              orden=None, limite=20, offset=None, despues_de=None,
+                              marca=None, marca_min=None, marcas_por_juego=None):
+    """
+    Construye una consulta que devuelve una fila por juego
+
+    Args:
+        idioma: Idioma del título
+        contiene: Términos que puede contener el título (basta uno). Cada
+                  término puede ser un par (término, excluido) para descartar
+                  los títulos que además contengan `excluido`
+        desarrollador_contiene: Texto que debe contener el nombre de algún desarrollador
+        genero_uri: URI de un género que el juego debe tener
+        anio_min: Año de lanzamiento mínimo (inclusive)
+        anio_max: Año de lanzamiento máximo (inclusive)
+        requiere_fecha: Si es True, solo juegos con fecha de lanzamiento
+        requiere_desarrollador: Si es True, solo juegos con desarrollador
+        orden: Clave de ORDENES ('fecha_desc', 'fecha_asc', 'game')
+        limite: Máximo de juegos (no de filas)
+        offset: Desplazamiento opcional
+        despues_de: Cursor de paginación por clave: solo juegos cuya URI es
+                    mayor que esta (usar con orden='game')
+        marca: Clave de MARCAS; agrega ?marca al resultado (usar con orden='marca')
+        marca_min: Solo juegos cuya marca es mayor que este valor
+        marcas_por_juego: dict {URI: marca}; limita la consulta a esos juegos
+                          (VALUES) y a los que superan su propia marca
+
+    Returns:
+        ConsultaJuegos: Texto SPARQL con los parámetros adjuntos
+    """
+    return ConsultaJuegos(
+        idioma=idioma,
+        contiene=normalizar_terminos(contiene),
+        desarrollador_contiene=desarrollador_contiene,
+        genero_uri=genero_uri,
+        anio_min=anio_min,
+        anio_max=anio_max,
+        # Un filtro por año descarta los juegos sin fecha
+        requiere_fecha=requiere_fecha or anio_min is not None or anio_max is not None,
+        requiere_desarrollador=requiere_desarrollador,
+        orden=orden,
+        limite=limite,
+        offset=offset,
+        despues_de=despues_de,
+        marca=marca,
+        marca_min=marca_min,
+        marcas_por_juego=marcas_por_juego
+    )
+
+
+def construir_consulta_labels(uris, idiomas):
+    """
+    Construye una consulta VALUES con los labels de varios recursos en varios idiomas
+
+    Returns:
+        ConsultaLabels: Texto SPARQL con los parámetros adjuntos
+    """
+    return ConsultaLabels(uris, idiomas)
+
+
+def _renderizar_consulta_juegos(idioma, contiene, desarrollador_contiene, genero_uri,
+                                anio_min, anio_max, requiere_fecha, requiere_desarrollador,
+                                orden, limite, offset, despues_de, marca, marca_min, marcas_por_juego):
+    """Genera el texto SPARQL agregado de construir_consulta_juegos"""
+    patrones = []
+    if marcas_por_juego:
+        # Primero los juegos concretos: el resto del patrón se evalúa solo sobre ellos
+        valores = ' '.join(f'(<{uri}> {int(m)})' for uri, m in marcas_por_juego.items())
+        patrones.append(f"VALUES (?game ?marcaPrevia) {{ {valores} }}")
+    patrones += [
+        "?game a dbo:VideoGame .",
+        "?game rdfs:label ?l .",
+        f"FILTER (lang(?l) = '{idioma}')"
+    ]
+
+    if despues_de:
+        patrones.append(f'FILTER (STR(?game) > "{escapar_literal(despues_de)}")')
+
+    seleccion_marca = ""
+    if marca:
+        patrones.append(f"?game {MARCAS[marca]} ?m .")
+        if marca_min is not None:
+            patrones.append(f"FILTER (?m > {int(marca_min)})")
+        if marcas_por_juego:
+            patrones.append("FILTER (?m > ?marcaPrevia)")
+        seleccion_marca = " (MAX(?m) AS ?marca)"
+
+    if contiene:
+        patrones.append(f"FILTER ({' || '.join(titulo_contiene(t, e) for t, e in contiene)})")
+
+    if desarrollador_contiene:
+        patrones.append("?game dbo:developer ?devFiltro .")
+        patrones.append("?devFiltro rdfs:label ?devLabel .")
+        patrones.append(f'FILTER (CONTAINS(LCASE(?devLabel), LCASE("{escapar_literal(desarrollador_contiene)}")))')
+
+    if genero_uri:
+        patrones.append(f"?game dbo:genre <{genero_uri}> .")
+
+    patrones.append("?game dbo:releaseDate ?fecha ." if requiere_fecha
+                    else "OPTIONAL { ?game dbo:releaseDate ?fecha }")
+    if anio_min is not None:
+        patrones.append(f"FILTER (YEAR(?fecha) >= {int(anio_min)})")
+    if anio_max is not None:
+        patrones.append(f"FILTER (YEAR(?fecha) <= {int(anio_max)})")
+
+    patrones.append("?game dbo:developer ?dev ." if requiere_desarrollador
+                    else "OPTIONAL { ?game dbo:developer ?dev }")
+    patrones.append("OPTIONAL { ?game dbo:genre ?gen }")
+
+    cuerpo = "\n            ".join(patrones)
+    query = f"""{PREFIJOS}
+        SELECT ?game (SAMPLE(?l) AS ?label) (MIN(?fecha) AS ?releaseDate)
+               (GROUP_CONCAT(DISTINCT STR(?dev); separator="{SEPARADOR}") AS ?developers)
+               (GROUP_CONCAT(DISTINCT STR(?gen); separator="{SEPARADOR}") AS ?genres){seleccion_marca}
+        WHERE {{
+            {cuerpo}
+        }}
+        GROUP BY ?game
+        {ORDENES.get(orden, '')}
+        LIMIT {int(limite)}
+        """
+    if offset:
+        query += f"OFFSET {int(offset)}\n        "
+    return query
+
+
+def _renderizar_consulta_labels(uris, idiomas):
+    """Genera el texto SPARQL de construir_consulta_labels"""
+    valores = ' '.join(f'<{uri}>' for uri in uris)
+    filtro_idiomas = ', '.join(f"'{idioma}'" for idioma in idiomas)
+
+    return f"""{PREFIJOS}
+        SELECT ?game ?lang (SAMPLE(?l) AS ?label)
+        WHERE {{
+            VALUES ?game {{ {valores} }}
+            ?game rdfs:label ?l .
+            BIND (lang(?l) AS ?lang)
+            FILTER (?lang IN ({filtro_idiomas}))
+        }}
+        GROUP BY ?game ?lang
+        """
+
+
+def nombre_desde_uri(uri):
+    """Nombre legible a partir de la URI de un recurso de DBpedia"""
+    return uri.split('/')[-1].replace('_', ' ')
+
+
+def crear_registro_juego(game, titulo, fecha=None, desarrolladores_uri=(), generos_uri=(), source='dbpedia'):
+    """
+    Crea el registro normalizado de un juego (mismo formato que las búsquedas locales)
+
+    Args:
+        game: URI del juego
+        titulo: Título
+        fecha: Fecha de lanzamiento (texto 'AAAA-MM-DD') o None
+        desarrolladores_uri: URIs de los desarrolladores
+        generos_uri: URIs de los géneros
+        source: Origen de los datos
+
+    Returns:
+        dict: Registro con anios, desarrollador(es) y géneros
+    """
+    anios = []
+    if fecha:
+        try:
+            anios = [int(fecha[:4])]
+        except ValueError:
+            pass
+
+    desarrolladores = [nombre_desde_uri(uri) for uri in desarrolladores_uri]
+    return {
+        'game': game,
+        'titulo': titulo,
+        'anios': anios,
+        'desarrollador': desarrolladores[0] if desarrolladores else None,
+        'desarrolladores': desarrolladores,
+        'desarrolladores_uri': list(desarrolladores_uri),
+        'generos': [nombre_desde_uri(uri) for uri in generos_uri],
+        'generos_uri': list(generos_uri),
+        'source': source
+    }
+
+
+def _valores(row, campo):
+    """Separa un campo concatenado con GROUP_CONCAT (vacío si no hay valores)"""
+    valor = row.get(campo, {}).get('value', '')
+    return [v for v in valor.split(SEPARADOR) if v] if valor else []
+
+
+def parsear_juegos(results):
+    """
+    Convierte la respuesta JSON de construir_consulta_juegos en registros
+
+    Args:
+        results: Respuesta JSON del endpoint (o directamente la lista de bindings)
+
+    Returns:
+        list: Un registro por juego, en el orden de la respuesta
+    """
+    if isinstance(results, dict):
+        bindings = results.get("results", {}).get("bindings", [])
+    else:
+        bindings = results
+
+    juegos = []
+    for row in bindings:
+        if 'game' not in row or 'label' not in row:
+            continue
+        juego = crear_registro_juego(
+            row['game']['value'],
+            row['label']['value'],
+            row.get('releaseDate', {}).get('value'),
+            _valores(row, 'developers'),
+            _valores(row, 'genres')
+        )
+        if 'marca' in row:
+            juego['marca'] = int(row['marca']['value'])
+        juegos.append(juego)
+    return juegos
@@ -3,17 +3,67 @@ Módulo para sincronización con DBpedia
 Maneja la validación de duplicados y obtención de nuevos videojuegos
 """
 
-from SPARQLWrapper import SPARQLWrapper, JSON
-from rdflib import URIRef
+import json
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from rdflib import URIRef
+from dbpedia_client import consultar_sparql, ConsultaOmitidaError
+from dbpedia_queries import construir_consulta_juegos, parsear_juegos
+from deadline import Deadline
 import random
 
+# Estado persistente de la sincronización (cursor de paginación por clave)
+RUTA_ESTADO_SYNC = os.environ.get(
+    'DBPEDIA_SYNC_ESTADO', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dbpedia_sync_estado.json')
+)
+
+
+class PaginaCursor(list):
+    """
+    Juegos devueltos por la estrategia del cursor, junto con el cursor al que
+    se llegó. El cursor solo se guarda al confirmar qué juegos se entregaron
+    """
+
+    def __init__(self, juegos=(), siguiente=None, avanzo=False):
+        super().__init__(juegos)
+        self.siguiente = siguiente
+        self.avanzo = avanzo
+
+
 class DBpediaSync:
-    def __init__(self, sparql_endpoint="http://dbpedia.org/sparql"):
-        self.sparql = SPARQLWrapper(sparql_endpoint)
-        self.sparql.setReturnFormat(JSON)
-        self.sparql.setTimeout(30)
-        self.sparql.addCustomHttpHeader("User-Agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
+    # Páginas que puede recorrer la estrategia del cursor en una misma población
+    MAX_PAGINAS_CURSOR = 5
+    # Segundos máximos que puede durar una población completa (todas las estrategias)
+    PRESUPUESTO_ESTRATEGIAS = 60
+
+    def __init__(self, sparql_endpoint="http://dbpedia.org/sparql", ruta_estado=RUTA_ESTADO_SYNC):
+        self.endpoint = sparql_endpoint
+        self.timeout = 30
+        self.ruta_estado = ruta_estado
+        self._lock_estado = threading.Lock()
+        self._ejecutor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="dbpedia-sync")
+        
+        # Estrategias registradas; todas se lanzan a la vez
+        self.estrategias = []
+        self.registrar_estrategia('recientes', self._consultar_juegos_recientes)
+        self.registrar_estrategia('genero', self._consultar_por_genero)
+        self.registrar_estrategia('cursor', self._consultar_con_cursor, confirmar=self._confirmar_cursor)
+    
+    def registrar_estrategia(self, nombre, funcion, confirmar=None):
+        """
+        Agrega una estrategia de búsqueda de juegos nuevos
+        
+        Args:
+            nombre: Identificador de la estrategia
+            funcion: Callable (limite, faltantes, uris_existentes, deadline) -> list
+                     de registros de juego (ver parsear_juegos)
+            confirmar: Callable opcional (juegos, uris_entregadas) que se llama
+                       solo si el resultado de la estrategia se usó, para que
+                       guarde su estado (p. ej. un cursor)
+        """
+        self.estrategias.append({'nombre': nombre, 'funcion': funcion, 'confirmar': confirmar})
     
     def obtener_juegos_existentes(self, graph, vg_namespace):
         """
@@ -35,65 +85,92 @@ class DBpediaSync:
         print(f"   Juegos en ontología local: {len(uris_existentes)}")
         return uris_existentes
     
-    def consultar_dbpedia_con_estrategias(self, limite, uris_existentes):
+    def consultar_dbpedia_con_estrategias(self, limite, uris_existentes, deadline=None):
         """
-        Consulta DBpedia usando múltiples estrategias para obtener juegos nuevos
+        Consulta DBpedia con todas las estrategias registradas en paralelo.
+        En cuanto se juntan `limite` juegos nuevos se cancelan las que siguen
+        pendientes: no envían más consultas y su resultado se ignora
         
         Args:
             limite: Número de juegos nuevos deseados
             uris_existentes: Set de URIs que ya existen localmente
+            deadline: Deadline de la población (por defecto PRESUPUESTO_ESTRATEGIAS)
             
         Returns:
-            list: Lista de juegos nuevos (formato bindings de SPARQL)
+            list: Lista de juegos nuevos (un registro por juego, ver parsear_juegos)
         """
-        juegos_nuevos = []
-        
-        # Estrategia 1: Juegos recientes (post-2000) con desarrollador
-        estrategia1 = self._consultar_juegos_recientes(limite * 3, uris_existentes)
-        juegos_nuevos.extend(estrategia1)
+        if deadline is None:
+            deadline = Deadline(self.PRESUPUESTO_ESTRATEGIAS)
         
-        if len(juegos_nuevos) >= limite:
-            return juegos_nuevos[:limite]
+        lanzadas = {}
+        for estrategia in self.estrategias:
+            hijo = deadline.derivar()
+            futuro = self._ejecutor.submit(
+                estrategia['funcion'], limite * 3, limite, uris_existentes, hijo
+            )
+            lanzadas[futuro] = (estrategia, hijo)
         
-        # Estrategia 2: Juegos con género específico
-        estrategia2 = self._consultar_por_genero(limite * 3, uris_existentes)
-        juegos_nuevos.extend(estrategia2)
+        resultados = {}
+        encontrados = set()
+        pendientes = set(lanzadas)
+        while pendientes and len(encontrados) < limite:
+            listos, pendientes = wait(pendientes, timeout=deadline.restante(), return_when=FIRST_COMPLETED)
+            if not listos:
+                deadline.marcar_agotado()
+                print("   ⊙ Presupuesto agotado esperando estrategias")
+                break
+            
+            for futuro in listos:
+                estrategia, _ = lanzadas[futuro]
+                try:
+                    juegos = futuro.result()
+                except Exception as e:
+                    print(f"      ✗ Error en estrategia {estrategia['nombre']}: {str(e)[:100]}")
+                    continue
+                resultados[estrategia['nombre']] = juegos
+                encontrados.update(j["game"] for j in juegos)
         
-        if len(juegos_nuevos) >= limite:
-            return juegos_nuevos[:limite]
+        if pendientes:
+            print(f"   ⊙ {len(pendientes)} estrategia(s) cancelada(s), objetivo cubierto o sin tiempo")
+            for futuro in pendientes:
+                lanzadas[futuro][1].cancelar()
+                futuro.cancel()
         
-        # Estrategia 3: Usando OFFSET dinámico
-        offset = len(uris_existentes)
-        estrategia3 = self._consultar_con_offset(limite * 3, offset, uris_existentes)
-        juegos_nuevos.extend(estrategia3)
+        # Se combinan en el orden de registro, sin repetir juegos entre estrategias
+        juegos_nuevos = []
+        vistos = set()
+        for estrategia in self.estrategias:
+            juegos = resultados.get(estrategia['nombre'])
+            if juegos is None:
+                continue
+            
+            entregados = set()
+            for juego in juegos:
+                if len(juegos_nuevos) >= limite:
+                    break
+                if juego["game"] not in vistos:
+                    vistos.add(juego["game"])
+                    juegos_nuevos.append(juego)
+                entregados.add(juego["game"])
+            
+            if estrategia['confirmar']:
+                estrategia['confirmar'](juegos, entregados)
         
-        return juegos_nuevos[:limite] if juegos_nuevos else []
+        return juegos_nuevos
     
-    def _consultar_juegos_recientes(self, limite, uris_existentes):
+    def _consultar_juegos_recientes(self, limite, faltantes, uris_existentes, deadline=None):
         """Consulta juegos lanzados después del año 2000"""
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            ?game dbo:releaseDate ?releaseDate .
-            ?game dbo:developer ?developer .
-            FILTER (lang(?label) = 'en')
-            FILTER (YEAR(?releaseDate) >= 2000)
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-        }}
-        ORDER BY DESC(?releaseDate)
-        LIMIT {limite}
-        """
+        query = construir_consulta_juegos(
+            anio_min=2000,
+            requiere_desarrollador=True,
+            orden='fecha_desc',
+            limite=limite
+        )
         
         print("\n   Estrategia 1: Buscando juegos recientes con desarrollador...")
-        return self._ejecutar_query_filtrada(query, uris_existentes)
+        return self._ejecutar_query_filtrada(query, uris_existentes, deadline)
     
-    def _consultar_por_genero(self, limite, uris_existentes):
+    def _consultar_por_genero(self, limite, faltantes, uris_existentes, deadline=None):
         """Consulta juegos por géneros populares"""
         generos = [
             "Action_game",
@@ -105,91 +182,158 @@ class DBpediaSync:
         
         genero_aleatorio = random.choice(generos)
         
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX dbr: <http://dbpedia.org/resource/>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            ?game dbo:genre dbr:{genero_aleatorio} .
-            FILTER (lang(?label) = 'en')
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            BIND(dbr:{genero_aleatorio} as ?genre)
-        }}
-        LIMIT {limite}
-        """
+        query = construir_consulta_juegos(
+            genero_uri=f"http://dbpedia.org/resource/{genero_aleatorio}",
+            limite=limite
+        )
         
         print(f"\n   Estrategia 2: Buscando juegos de género {genero_aleatorio.replace('_', ' ')}...")
-        return self._ejecutar_query_filtrada(query, uris_existentes)
+        return self._ejecutar_query_filtrada(query, uris_existentes, deadline)
     
-    def _consultar_con_offset(self, limite, offset, uris_existentes):
-        """Consulta con OFFSET para saltar los primeros resultados"""
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    def _consultar_con_cursor(self, limite, faltantes, uris_existentes, deadline=None):
+        """
+        Pagina DBpedia por clave (URI del último juego visto) en lugar de OFFSET,
+        así cada página cuesta lo mismo sin importar cuánto se haya avanzado.
+        El cursor se guarda en _confirmar_cursor, y la siguiente población
+        continúa donde se quedó la anterior
         
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            FILTER (lang(?label) = 'en')
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-        }}
-        ORDER BY ?game
-        OFFSET {offset}
-        LIMIT {limite}
+        Args:
+            limite: Juegos por página
+            faltantes: Juegos nuevos que todavía se necesitan
+            uris_existentes: Set de URIs existentes
+            deadline: Deadline de la estrategia (cancelarlo corta el recorrido)
+            
+        Returns:
+            PaginaCursor: Juegos nuevos (no existentes) y cursor alcanzado
         """
+        juegos_nuevos = PaginaCursor()
+        cursor = self.obtener_cursor()
+        
+        print(f"\n   Estrategia 3: Recorriendo DBpedia desde {cursor or 'el inicio'}...")
+        for _ in range(self.MAX_PAGINAS_CURSOR):
+            query = construir_consulta_juegos(orden='game', limite=limite, despues_de=cursor)
+            
+            try:
+                results = consultar_sparql(query, self.endpoint, self.timeout, deadline=deadline)
+            except ConsultaOmitidaError as e:
+                print(f"      ⊙ {e}, estrategia omitida")
+                break
+            except Exception as e:
+                print(f"      ✗ Error: {str(e)[:100]}")
+                break
+            
+            juegos = parsear_juegos(results)
+            if not juegos:
+                # Fin del catálogo: la próxima vuelta empieza desde el inicio
+                print("      ⊙ Fin del recorrido, el cursor vuelve al inicio")
+                juegos_nuevos.siguiente, juegos_nuevos.avanzo = None, True
+                break
+            
+            # El cursor avanza solo hasta el último juego entregado, para que
+            # los que sobran de la página queden para la próxima población
+            for juego in juegos:
+                cursor = juego["game"]
+                if cursor not in uris_existentes:
+                    juegos_nuevos.append(juego)
+                    if len(juegos_nuevos) >= faltantes:
+                        break
+            juegos_nuevos.siguiente, juegos_nuevos.avanzo = cursor, True
+            
+            if len(juegos_nuevos) >= faltantes:
+                break
         
-        print(f"\n   Estrategia 3: Consultando con offset {offset}...")
-        return self._ejecutar_query_filtrada(query, uris_existentes)
+        if juegos_nuevos:
+            print(f"      ✓ {len(juegos_nuevos)} juegos nuevos encontrados")
+        return juegos_nuevos
     
-    def _ejecutar_query_filtrada(self, query, uris_existentes):
+    def _confirmar_cursor(self, pagina, entregados):
+        """
+        Guarda el cursor hasta donde se entregaron juegos: si alguno de la
+        página quedó fuera (por el límite), el cursor se detiene antes de él
+        """
+        if not pagina.avanzo:
+            return
+        for anterior, juego in zip([None] + pagina[:-1], pagina):
+            if juego["game"] not in entregados:
+                if anterior is not None:
+                    self.guardar_cursor(anterior["game"])
+                return
+        self.guardar_cursor(pagina.siguiente)
+    
+    def _leer_estado(self):
+        """Lee el estado persistente (vacío si no existe o está dañado)"""
+        try:
+            with open(self.ruta_estado, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def obtener_estado(self, clave, defecto=None):
+        """Valor guardado en el estado persistente (cursor, marcas de agua...)"""
+        with self._lock_estado:
+            return self._leer_estado().get(clave, defecto)
+    
+    def guardar_estado(self, **valores):
+        """Actualiza claves del estado persistente (escritura atómica: archivo temporal + reemplazo)"""
+        with self._lock_estado:
+            estado = self._leer_estado()
+            estado.update(valores)
+            estado['actualizado'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            
+            temporal = f"{self.ruta_estado}.tmp"
+            try:
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(estado, f, ensure_ascii=False, indent=2)
+                os.replace(temporal, self.ruta_estado)
+            except OSError as e:
+                print(f"      ⊙ No se pudo guardar el estado de sincronización: {e}")
+    
+    def obtener_cursor(self):
+        """URI del último juego recorrido por la estrategia del cursor (None = inicio)"""
+        return self.obtener_estado('cursor')
+    
+    def guardar_cursor(self, cursor):
+        """Persiste el cursor; None cierra una vuelta completa al catálogo"""
+        if cursor is None:
+            self.guardar_estado(cursor=None, vueltas=self.obtener_estado('vueltas', 0) + 1)
+        else:
+            self.guardar_estado(cursor=cursor)
+    
+    def _ejecutar_query_filtrada(self, query, uris_existentes, deadline=None):
         """
         Ejecuta una query SPARQL y filtra resultados que ya existen
         
         Args:
             query: Query SPARQL a ejecutar
             uris_existentes: Set de URIs existentes
+            deadline: Deadline de la estrategia (opcional)
             
         Returns:
             list: Juegos nuevos (no existentes)
         """
         juegos_nuevos = []
-        max_intentos = 2
         
-        self.sparql.setQuery(query)
+        try:
+            # Los reintentos (backoff exponencial con jitter) los aplica consultar_sparql
+            results = consultar_sparql(query, self.endpoint, self.timeout, deadline=deadline)
+        except ConsultaOmitidaError as e:
+            print(f"      ⊙ {e}, estrategia omitida")
+            return []
+        except Exception as e:
+            print(f"      ✗ Error: {str(e)[:100]}")
+            return []
         
-        for intento in range(1, max_intentos + 1):
-            try:
-                print(f"      Intento {intento}/{max_intentos}...")
-                results = self.sparql.query().convert()
-                
-                if "results" in results and "bindings" in results["results"]:
-                    bindings = results["results"]["bindings"]
-                    
-                    # Filtrar juegos que no existen localmente
-                    for row in bindings:
-                        game_uri = row["game"]["value"]
-                        if game_uri not in uris_existentes:
-                            juegos_nuevos.append(row)
-                    
-                    if juegos_nuevos:
-                        print(f"      ✓ {len(juegos_nuevos)} juegos nuevos encontrados")
-                        return juegos_nuevos
-                    else:
-                        print(f"      ⊙ Todos los {len(bindings)} juegos ya existen")
-                        return []
-                
-            except Exception as e:
-                print(f"      ✗ Error: {str(e)[:100]}")
-                if intento < max_intentos:
-                    time.sleep(2)
+        juegos = parsear_juegos(results)
+        
+        # Filtrar juegos que no existen localmente
+        for juego in juegos:
+            if juego["game"] not in uris_existentes:
+                juegos_nuevos.append(juego)
+        
+        if juegos_nuevos:
+            print(f"      ✓ {len(juegos_nuevos)} juegos nuevos encontrados")
+        elif juegos:
+            print(f"      ⊙ Todos los {len(juegos)} juegos ya existen")
         
         return juegos_nuevos
     
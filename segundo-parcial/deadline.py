@@ -0,0 +1,79 @@
+"""
+Módulo de presupuesto de latencia por petición
+Un Deadline se crea al entrar la petición HTTP y se pasa a todas las capas
+que consultan DBpedia, que solo usan el tiempo que queda
+"""
+
+import time
+
+
+class Deadline:
+    def __init__(self, presupuesto, minimo_util=1.0):
+        """
+        Inicializa el presupuesto
+
+        Args:
+            presupuesto: Segundos totales disponibles para la petición
+            minimo_util: Por debajo de este tiempo restante no vale la pena
+                         iniciar una consulta remota
+        """
+        self.presupuesto = presupuesto
+        self.minimo_util = minimo_util
+        self.inicio = time.monotonic()
+        self.limite = self.inicio + presupuesto
+        self.agotado = False
+        self.cancelado = False
+        self.omitidas = 0
+
+    def restante(self):
+        """Segundos que quedan del presupuesto (nunca negativo)"""
+        if self.cancelado:
+            return 0.0
+        return max(0.0, self.limite - time.monotonic())
+
+    def transcurrido(self):
+        """Segundos consumidos desde que se creó el deadline"""
+        return time.monotonic() - self.inicio
+
+    def expirado(self):
+        """True si ya no queda tiempo útil para otra consulta remota"""
+        return self.restante() < self.minimo_util
+
+    def timeout_para(self, maximo):
+        """
+        Timeout a usar en una consulta remota: el menor entre el máximo
+        configurado del módulo y lo que queda del presupuesto
+
+        Returns:
+            float | None: Timeout en segundos, o None si no queda tiempo útil
+        """
+        restante = self.restante()
+        if restante < self.minimo_util:
+            return None
+        return min(maximo, restante)
+
+    def permite_espera(self, segundos):
+        """Indica si se puede dormir `segundos` (p. ej. antes de un reintento)"""
+        return self.restante() - segundos >= self.minimo_util
+
+    def derivar(self):
+        """Crea un deadline hijo con el tiempo restante, cancelable por separado"""
+        return Deadline(self.restante(), self.minimo_util)
+
+    def cancelar(self):
+        """Cancela el trabajo remoto pendiente: las siguientes consultas se omiten"""
+        self.cancelado = True
+
+    def marcar_agotado(self):
+        """Registra que se omitió o se cortó trabajo remoto por falta de tiempo"""
+        self.agotado = True
+        self.omitidas += 1
+
+    def resumen(self):
+        """Datos del presupuesto para incluir en la respuesta"""
+        return {
+            'presupuesto_segundos': self.presupuesto,
+            'transcurrido_segundos': round(self.transcurrido(), 3),
+            'parcial': self.agotado,
+            'consultas_omitidas': self.omitidas
+        }
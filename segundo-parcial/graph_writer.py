@@ -0,0 +1,78 @@
+"""
+Módulo de escritura por lotes en el grafo RDF
+Junta los triples de una ingesta, descarta los repetidos y los que el grafo
+ya tiene, y los inserta con una sola llamada a addN por lote
+"""
+
+import contextlib
+
+
+class EscritorGrafo:
+    def __init__(self, graph, tamano_lote=None, lock=None):
+        """
+        Inicializa el escritor
+
+        Args:
+            graph: Grafo RDF destino
+            tamano_lote: Triples pendientes que disparan una inserción; None
+                         para insertar todo de una vez al confirmar
+            lock: Lock a tomar durante cada inserción (p. ej. el del buscador)
+        """
+        self.graph = graph
+        self.tamano_lote = tamano_lote
+        self.lock = lock if lock is not None else contextlib.nullcontext()
+        self.triples_agregados = 0
+        self.triples_omitidos = 0
+        self._pendientes = []
+        # Dedupe dentro del lote; los lotes anteriores ya están en el grafo
+        self._vistos = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        if tipo_error is None:
+            self.confirmar()
+        else:
+            self.descartar()
+        return False
+
+    def agregar(self, triple):
+        """Encola un triple (los repetidos se descartan)"""
+        if triple in self._vistos:
+            self.triples_omitidos += 1
+            return
+        self._vistos.add(triple)
+        self._pendientes.append(triple)
+        if self.tamano_lote is not None and len(self._pendientes) >= self.tamano_lote:
+            self.vaciar()
+
+    def agregar_todos(self, triples):
+        """Encola varios triples"""
+        for triple in triples:
+            self.agregar(triple)
+
+    def vaciar(self):
+        """Inserta en el grafo los triples pendientes que todavía no tiene"""
+        if not self._pendientes:
+            return
+        with self.lock:
+            nuevos = [t for t in self._pendientes if t not in self.graph]
+            self.graph.addN((s, p, o, self.graph) for s, p, o in nuevos)
+        self.triples_agregados += len(nuevos)
+        self.triples_omitidos += len(self._pendientes) - len(nuevos)
+        self._pendientes = []
+        self._vistos = set()
+
+    def confirmar(self):
+        """Inserta lo pendiente y confirma la transacción si el store las soporta"""
+        self.vaciar()
+        if self.graph.store.transaction_aware:
+            self.graph.commit()
+
+    def descartar(self):
+        """Descarta lo pendiente (y revierte la transacción si el store las soporta)"""
+        self._pendientes = []
+        self._vistos = set()
+        if self.graph.store.transaction_aware:
+            self.graph.rollback()
@@ -3,10 +3,15 @@ Módulo para búsqueda híbrida (local + online)
 Busca primero en la ontología local y luego en DBpedia si no hay resultados
 """
 
-from SPARQLWrapper import SPARQLWrapper, JSON
 from rdflib import Literal
 from semantic_reasoning import SemanticReasoner
 from multilingual import traductor_global
+from remote_cache import cache_remoto_global
+from dbpedia_client import consultar_sparql, ConsultaOmitidaError
+from dbpedia_queries import construir_consulta_juegos, parsear_juegos
+from deadline import Deadline
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+import threading
 import time
 
 try:
@@ -17,19 +22,19 @@ except ImportError:
     print("⚠ Búsqueda inteligente no disponible")
 
 class HybridSearch:
-    def __init__(self, buscador_local, sparql_endpoint="http://dbpedia.org/sparql"):
+    def __init__(self, buscador_local, sparql_endpoint="http://dbpedia.org/sparql", especulativo=False):
         """
         Inicializa el buscador híbrido
         
         Args:
             buscador_local: Instancia de BuscadorSemantico para búsquedas locales
             sparql_endpoint: URL del endpoint SPARQL de DBpedia
+            especulativo: Si es True, la consulta a DBpedia arranca en paralelo
+                          con la local y se descarta si la local basta
         """
         self.buscador = buscador_local
-        self.sparql = SPARQLWrapper(sparql_endpoint)
-        self.sparql.setReturnFormat(JSON)
-        self.sparql.setTimeout(8)  # REDUCIDO de 30 a 8
-        self.sparql.addCustomHttpHeader("User-Agent", "Mozilla/5.0")
+        self.endpoint = sparql_endpoint
+        self.timeout = 8  # REDUCIDO de 30 a 8
         
         self.semantic_reasoner = SemanticReasoner(sparql_endpoint)
         
@@ -38,6 +43,9 @@ class HybridSearch:
         self.cache_resultados = {}
         self.CACHE_TTL = 180  # 3 minutos
         
+        # Caché compartido de consultas remotas (incluye resultados vacíos y timeouts)
+        self.cache_remoto = cache_remoto_global
+        
         if INTELLIGENT_SEARCH_DISPONIBLE:
             try:
                 self.intelligent_search = IntelligentSearch(sparql_endpoint)
@@ -47,9 +55,31 @@ class HybridSearch:
                 print(f"✗ Error al inicializar búsqueda inteligente: {e}")
         else:
             self.intelligent_search = None
+        
+        # Modo especulativo: pool de hilos para lanzar DBpedia junto con la búsqueda local
+        self.modo_especulativo = especulativo
+        self._ejecutor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dbpedia-especulativo") if especulativo else None
+        self.estadisticas_especulativas = {'lanzadas': 0, 'usadas': 0, 'descartadas': 0}
+        self._lock_estadisticas = threading.Lock()
+    
+    def _contar_especulativa(self, clave):
+        """Suma una consulta especulativa (se cuentan desde varios hilos de petición)"""
+        with self._lock_estadisticas:
+            self.estadisticas_especulativas[clave] += 1
     
-    def buscar_titulo_hibrido(self, termino):
-        """OPTIMIZADO con multilingüismo - búsqueda más rápida"""
+    def obtener_estadisticas_especulativas(self):
+        """Copia de los contadores del modo especulativo"""
+        with self._lock_estadisticas:
+            return {'activo': self.modo_especulativo, **self.estadisticas_especulativas}
+    
+    def buscar_titulo_hibrido(self, termino, deadline=None):
+        """
+        OPTIMIZADO con multilingüismo - búsqueda más rápida
+        
+        Args:
+            termino: Término de búsqueda
+            deadline: Deadline de la petición (opcional); DBpedia solo usa el tiempo restante
+        """
         print(f"\n{'='*60}")
         print(f"BÚSQUEDA HÍBRIDA MULTILINGÜE: '{termino}'")
         print(f"{'='*60}")
@@ -75,11 +105,21 @@ class HybridSearch:
                 self.semantic_reasoner.siglas_conocidas[termino.lower()][:2]
             )
         
+        # Modo especulativo: DBpedia arranca ya, en paralelo con la búsqueda local
+        especulacion = None
+        if self.modo_especulativo:
+            especulacion = self._lanzar_especulativo(
+                lambda hijo: self.semantic_reasoner.buscar_semanticamente_dbpedia(termino, limite=15, deadline=hijo),
+                deadline
+            )
+        
         print("\n[1/2] Búsqueda local (rápida)...")
         resultados_locales = self._buscar_local_expandido(terminos_expandidos)
         count_local = len(resultados_locales)
 
         if count_local > 0:
+            if especulacion is not None:
+                self._descartar_especulativo(especulacion)
             print("✓ Resultados locales encontrados. DBpedia omitida para evitar duplicados.")
             resultado_final = {
                 'success': True,
@@ -100,11 +140,15 @@ class HybridSearch:
         resultados_dbpedia_raw = []
         
         try:
-            # Usar búsqueda rápida con timeout corto
-            resultados_dbpedia_raw = self.semantic_reasoner.buscar_semanticamente_dbpedia(
-                termino, 
-                limite=15  # Reducido de 20 a 15
-            )
+            if especulacion is not None:
+                resultados_dbpedia_raw = self._esperar_especulativo(especulacion, deadline) or []
+            else:
+                # Usar búsqueda rápida con timeout corto
+                resultados_dbpedia_raw = self.semantic_reasoner.buscar_semanticamente_dbpedia(
+                    termino, 
+                    limite=15,  # Reducido de 20 a 15
+                    deadline=deadline
+                )
         except Exception as e:
             print(f"   ⚠ DBpedia timeout (continuando con local)")
         
@@ -120,12 +164,71 @@ class HybridSearch:
             'message': 'Sin coincidencias locales. Mostrando resultados de DBpedia.' if count_dbpedia else 'Sin coincidencias locales ni en DBpedia.',
             'terminos_usados': terminos_expandidos[:2]
         }
+        
+        # Un resultado cortado por el presupuesto no se guarda en caché
+        if deadline is not None and deadline.agotado:
+            resultado_final['parcial'] = True
+            return resultado_final
+        
         self.cache_resultados[cache_key] = {
             'data': resultado_final,
             'timestamp': time.time()
         }
         return resultado_final
     
+    def _lanzar_especulativo(self, funcion, deadline):
+        """
+        Inicia una consulta remota en paralelo a la búsqueda local
+        
+        Args:
+            funcion: Callable que recibe el deadline hijo y hace la consulta
+            deadline: Deadline de la petición (opcional)
+            
+        Returns:
+            tuple: (future, deadline_hijo) para esperar o descartar la consulta
+        """
+        hijo = deadline.derivar() if deadline is not None else Deadline(float('inf'))
+        futuro = self._ejecutor.submit(funcion, hijo)
+        self._contar_especulativa('lanzadas')
+        print("→ DBpedia lanzada en paralelo (modo especulativo)")
+        return futuro, hijo
+    
+    def _descartar_especulativo(self, especulacion):
+        """Cancela la consulta especulativa: no se envían más queries y se ignora su resultado"""
+        futuro, hijo = especulacion
+        hijo.cancelar()
+        self._contar_especulativa('descartadas')
+        if futuro.cancel():
+            print("⊙ Consulta especulativa cancelada antes de empezar")
+        else:
+            print("⊙ Consulta especulativa descartada (locales suficientes)")
+    
+    def _esperar_especulativo(self, especulacion, deadline):
+        """
+        Espera el resultado de la consulta especulativa dentro del presupuesto
+        
+        Returns:
+            El resultado de la consulta, o None si no llegó a tiempo o falló
+        """
+        futuro, hijo = especulacion
+        espera = deadline.restante() if deadline is not None else None
+        
+        try:
+            resultado = futuro.result(timeout=espera)
+        except FuturesTimeout:
+            hijo.cancelar()
+            deadline.marcar_agotado()
+            print("⊙ Presupuesto agotado esperando la consulta especulativa")
+            return None
+        except Exception as e:
+            print(f"✗ Error en consulta especulativa: {str(e)[:100]}")
+            return None
+        
+        if hijo.agotado and deadline is not None:
+            deadline.marcar_agotado()
+        self._contar_especulativa('usadas')
+        return resultado
+    
     def _buscar_local_expandido(self, terminos):
         """OPTIMIZADO - búsqueda local más eficiente"""
         resultados = []
@@ -152,41 +255,18 @@ class HybridSearch:
         """Formatea resultados de DBpedia CON información de traducción"""
         resultados_formateados = []
         
-        for row in resultados_dbpedia:
-            resultado = {
-                'game': row['game']['value'],
-                'titulo': row['label']['value'],
-                'anios': [],
-                'desarrollador': None,
-                'generos': [],
-                'source': 'dbpedia',
-                'relevancia': row.get('semantic_score', 0),
-                'idioma_contenido': row.get('idioma_contenido', 'en'),
-                'idioma_busqueda': row.get('idioma_busqueda', 'en'),
-                'necesita_traduccion': row.get('necesita_traduccion', False)
-            }
-            
-            # Procesar año, desarrollador y género...
-            if 'releaseDate' in row:
-                try:
-                    year = row['releaseDate']['value'][:4]
-                    resultado['anios'] = [int(year)]
-                except:
-                    pass
-            
-            if 'developer' in row:
-                dev_name = row['developer']['value'].split('/')[-1].replace('_', ' ')
-                resultado['desarrollador'] = dev_name
-            
-            if 'genre' in row:
-                genre_name = row['genre']['value'].split('/')[-1].replace('_', ' ')
-                resultado['generos'] = [genre_name]
-            
+        for juego in resultados_dbpedia:
+            resultado = dict(juego)
+            resultado['relevancia'] = juego.get('semantic_score', 0)
+            resultado['idioma_contenido'] = juego.get('idioma_contenido', 'en')
+            resultado['idioma_busqueda'] = juego.get('idioma_busqueda', 'en')
+            resultado['necesita_traduccion'] = juego.get('necesita_traduccion', False)
+            resultado.pop('semantic_score', None)
             resultados_formateados.append(resultado)
         
         return resultados_formateados
 
-    def buscar_desarrollador_hibrido(self, termino):
+    def buscar_desarrollador_hibrido(self, termino, deadline=None):
         """Búsqueda híbrida por desarrollador - SIEMPRE ambas fuentes"""
         print(f"\n{'='*60}")
         print(f"BÚSQUEDA SEMÁNTICA POR DESARROLLADOR: '{termino}'")
@@ -210,7 +290,7 @@ class HybridSearch:
             }
         
         print("\n[2/2] Buscando en DBpedia...")
-        resultados_dbpedia = self._buscar_en_dbpedia_por_desarrollador(termino)
+        resultados_dbpedia = self._buscar_en_dbpedia_por_desarrollador(termino, deadline)
         count_dbpedia = len(resultados_dbpedia)
 
         return {
@@ -219,19 +299,32 @@ class HybridSearch:
             'local': {'results': [], 'count': 0},
             'dbpedia': {'results': resultados_dbpedia, 'count': count_dbpedia},
             'total_count': count_dbpedia,
-            'message': 'Sin coincidencias locales. Resultados obtenidos desde DBpedia.' if count_dbpedia else 'Sin coincidencias en ninguna fuente.'
+            'message': 'Sin coincidencias locales. Resultados obtenidos desde DBpedia.' if count_dbpedia else 'Sin coincidencias en ninguna fuente.',
+            'parcial': bool(deadline is not None and deadline.agotado)
         }
 
-    def buscar_general_hibrido(self, termino):
+    def buscar_general_hibrido(self, termino, deadline=None):
         """Búsqueda general híbrida CON búsqueda inteligente"""
         print(f"\n{'='*60}")
         print(f"BÚSQUEDA HÍBRIDA: '{termino}'")
         print(f"{'='*60}")
         
+        limite_busqueda = 30 if any(x in termino.lower() for x in ['recientes', 'nintendo', 'jugadores']) else 20
+        
+        # Modo especulativo: la búsqueda inteligente arranca en paralelo con la local
+        especulacion = None
+        if self.modo_especulativo and self.intelligent_search is not None:
+            especulacion = self._lanzar_especulativo(
+                lambda hijo: self.intelligent_search.buscar_inteligente(termino, limite=limite_busqueda, deadline=hijo),
+                deadline
+            )
+        
         print("→ Explorando ontología local antes de consultar DBpedia...")
         resultados_locales = self.buscador.buscar_general(termino)
 
         if resultados_locales:
+            if especulacion is not None:
+                self._descartar_especulativo(especulacion)
             print("✓ Resultados locales encontrados. No se consultará DBpedia.")
             return {
                 'success': True,
@@ -242,14 +335,23 @@ class HybridSearch:
                 'message': 'Coincidencias locales detectadas. Consulta online omitida.'
             }
         
-        if self.intelligent_search is not None:
+        if self.intelligent_search is not None and especulacion is None and deadline is not None and deadline.expirado():
+            print("⊙ Presupuesto agotado, búsqueda inteligente omitida")
+            deadline.marcar_agotado()
+        elif self.intelligent_search is not None:
             try:
                 print("→ Intentando búsqueda inteligente...")
-                limite_busqueda = 30 if any(x in termino.lower() for x in ['recientes', 'nintendo', 'jugadores']) else 20
                 
-                resultado_inteligente = self.intelligent_search.buscar_inteligente(termino, limite=limite_busqueda)
+                if especulacion is not None:
+                    resultado_inteligente = self._esperar_especulativo(especulacion, deadline)
+                else:
+                    resultado_inteligente = self.intelligent_search.buscar_inteligente(
+                        termino, limite=limite_busqueda, deadline=deadline
+                    )
                 
-                if resultado_inteligente['success'] and resultado_inteligente['count'] > 0:
+                if resultado_inteligente is None:
+                    print("→ Búsqueda inteligente sin respuesta a tiempo")
+                elif resultado_inteligente['success'] and resultado_inteligente['count'] > 0:
                     print(f"\n✓ Búsqueda inteligente EXITOSA")
                     print(f"  Tipo: {resultado_inteligente['analisis']['tipo']}")
                     print(f"  Confianza: {resultado_inteligente['analisis']['confianza']:.2%}")
@@ -263,7 +365,8 @@ class HybridSearch:
                         },
                         'total_count': resultado_inteligente['count'],
                         'message': f"Sin coincidencias locales. {resultado_inteligente['count']} resultado(s) desde DBpedia (inteligente).",
-                        'analisis': resultado_inteligente['analisis']
+                        'analisis': resultado_inteligente['analisis'],
+                        'parcial': bool(deadline is not None and deadline.agotado)
                     }
                 else:
                     print(f"→ Búsqueda inteligente rechazada (confianza: {resultado_inteligente['analisis']['confianza']:.2%})")
@@ -275,146 +378,64 @@ class HybridSearch:
             print("⚠ Búsqueda inteligente no disponible")
         
         print("\n→ Usando búsqueda híbrida estándar...")
-        return self.buscar_titulo_hibrido(termino)
+        return self.buscar_titulo_hibrido(termino, deadline)
     
-    def _buscar_en_dbpedia_por_titulo(self, termino):
+    def _buscar_en_dbpedia_por_titulo(self, termino, deadline=None):
         """Busca en DBpedia por título"""
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            FILTER (lang(?label) = 'en')
-            FILTER (CONTAINS(LCASE(?label), LCASE("{termino}")))
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-        }}
-        LIMIT 20
-        """
-        
-        return self._ejecutar_query_dbpedia(query)
+        query = construir_consulta_juegos(contiene=[termino], limite=20)
+        return self._ejecutar_query_dbpedia(query, deadline)
     
-    def _buscar_en_dbpedia_por_desarrollador(self, termino):
+    def _buscar_en_dbpedia_por_desarrollador(self, termino, deadline=None):
         """Busca en DBpedia por desarrollador"""
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            ?game dbo:developer ?dev .
-            ?dev rdfs:label ?devLabel .
-            FILTER (lang(?label) = 'en')
-            FILTER (CONTAINS(LCASE(?devLabel), LCASE("{termino}")))
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            BIND(?dev as ?developer)
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-        }}
-        LIMIT 20
-        """
-        
-        return self._ejecutar_query_dbpedia(query)
+        query = construir_consulta_juegos(desarrollador_contiene=termino, limite=20)
+        return self._ejecutar_query_dbpedia(query, deadline)
     
-    def _buscar_en_dbpedia_general(self, termino):
+    def _buscar_en_dbpedia_general(self, termino, deadline=None):
         """Búsqueda general en DBpedia"""
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            FILTER (lang(?label) = 'en')
-            FILTER (
-                CONTAINS(LCASE(?label), LCASE("{termino}"))
-            )
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-        }}
-        LIMIT 20
-        """
-        
-        return self._ejecutar_query_dbpedia(query)
+        query = construir_consulta_juegos(contiene=[termino], limite=20)
+        return self._ejecutar_query_dbpedia(query, deadline)
     
-    def _ejecutar_query_dbpedia(self, query):
+    def _ejecutar_query_dbpedia(self, query, deadline=None):
         """Ejecuta una query en DBpedia y formatea resultados"""
-        self.sparql.setQuery(query)
+        clave_cache = f"hybrid::{' '.join(query.split())}"
+        encontrado, cacheado = self.cache_remoto.obtener(clave_cache)
+        if encontrado:
+            print(f"   ✓ DBpedia desde caché ({len(cacheado)} resultado(s))")
+            return cacheado
         
-        max_intentos = 2
-        for intento in range(1, max_intentos + 1):
-            try:
-                print(f"   Consultando DBpedia (intento {intento}/{max_intentos})...")
-                results = self.sparql.query().convert()
-                
-                if "results" in results and "bindings" in results["results"]:
-                    bindings = results["results"]["bindings"]
-                    
-                    if not bindings:
-                        return []
-                    
-                    # Formatear resultados para que sean compatibles con el formato local
-                    resultados_formateados = []
-                    for row in bindings:
-                        resultado = {
-                            'game': row['game']['value'],
-                            'titulo': row['label']['value'],
-                            'anios': [],
-                            'desarrollador': None,
-                            'generos': [],
-                            'source': 'dbpedia'
-                        }
-                        
-                        # Procesar año
-                        if 'releaseDate' in row:
-                            try:
-                                year = row['releaseDate']['value'][:4]
-                                resultado['anios'] = [int(year)]
-                            except:
-                                pass
-                        
-                        # Procesar desarrollador
-                        if 'developer' in row:
-                            dev_name = row['developer']['value'].split('/')[-1].replace('_', ' ')
-                            resultado['desarrollador'] = dev_name
-                        
-                        # Procesar género
-                        if 'genre' in row:
-                            genre_name = row['genre']['value'].split('/')[-1].replace('_', ' ')
-                            resultado['generos'] = [genre_name]
-                        
-                        resultados_formateados.append(resultado)
-                    
-                    return resultados_formateados
-                
-            except Exception as e:
-                print(f"   ✗ Error: {str(e)[:100]}")
-                if intento < max_intentos:
-                    time.sleep(2)
+        try:
+            print("   Consultando DBpedia...")
+            results = consultar_sparql(query, self.endpoint, self.timeout, deadline=deadline)
+        except ConsultaOmitidaError as e:
+            print(f"   ⊙ {e}")
+            return []
+        except Exception as e:
+            print(f"   ✗ Error: {str(e)[:100]}")
+            if self.cache_remoto.registrar_error(clave_cache, e):
+                print(f"   ⊙ Consulta en espera {self.cache_remoto.BACKOFF_TIMEOUT}s tras fallo de red")
+            return []
+        
+        # Un registro por juego, con todos sus desarrolladores y géneros
+        resultados_formateados = parsear_juegos(results)
         
-        return []
+        self.cache_remoto.guardar(clave_cache, resultados_formateados)
+        return resultados_formateados
     
     def agregar_juegos_dbpedia_a_ontologia(self, juegos_dbpedia):
         """
-        Agrega juegos encontrados en DBpedia a la ontología local
-        CORREGIDO - Sin language tags, solo xsd:string
+        Agrega juegos encontrados en DBpedia a la ontología local con los
+        mismos triples que la población (_triples_juego, incluido el hash de
+        contenido que usa la sincronización)
         
         Args:
-            juegos_dbpedia: Lista de juegos obtenidos de DBpedia
+            juegos_dbpedia: Lista de juegos obtenidos de DBpedia (formato de
+                            parsear_juegos o de las búsquedas híbridas)
             
         Returns:
             int: Cantidad de juegos agregados
         """
-        from rdflib import URIRef, RDF, RDFS, Literal
-        from rdflib.namespace import XSD
-        from buscador_semantico import VG  # Importar el namespace correcto
+        from graph_writer import EscritorGrafo
+        from importacion_ndjson import normalizar_registro
         
         print(f"\n{'='*60}")
         print(f"AGREGANDO JUEGOS DE DBPEDIA A ONTOLOGÍA LOCAL")
@@ -423,73 +444,52 @@ class HybridSearch:
         
         count = 0
         errores = 0
+        # Resolver y escribir sin que otra ingesta intercale sus juegos
+        with self.buscador.lock_ingesta:
+            # Todos los triples se insertan juntos al final con addN
+            escritor = EscritorGrafo(self.buscador.graph, lock=self.buscador.lock_grafo)
+            agregados = set()
         
-        for idx, juego in enumerate(juegos_dbpedia, 1):
-            try:
-                game_uri = URIRef(juego['game'])
-                titulo = juego.get('titulo', 'Sin título')
-                
-                # Verificar si ya existe
-                if (game_uri, RDF.type, VG.Videojuego) in self.buscador.graph:
-                    print(f"  ⊙ {idx}. {titulo} (ya existe)")
-                    continue
-                
-                # Agregar el juego - ARREGLADO: Sin language tag, solo xsd:string
-                self.buscador.graph.add((game_uri, RDF.type, VG.Videojuego))
-                self.buscador.graph.add((game_uri, VG.titulo, Literal(titulo, datatype=XSD.string)))
-                self.buscador.graph.add((game_uri, VG.dbpediaURI, Literal(juego['game'], datatype=XSD.anyURI)))
+            for idx, juego in enumerate(juegos_dbpedia, 1):
+                try:
+                    juego = normalizar_registro(juego)
+                    game_uri = juego['game']
+                    titulo = juego['titulo']
                 
-                # Agregar año
-                if juego.get('anios') and len(juego['anios']) > 0:
-                    try:
-                        anio = int(juego['anios'][0])
-                        self.buscador.graph.add((game_uri, VG.anioLanzamiento, 
-                                               Literal(anio, datatype=XSD.integer)))
-                    except (ValueError, TypeError) as e:
-                        print(f"      ⚠ Error procesando año: {e}")
+                    # Verificar si ya existe (en el grafo o en este mismo lote)
+                    if game_uri in agregados or game_uri in self.buscador.indice_juegos:
+                        print(f"  ⊙ {idx}. {titulo} (ya existe)")
+                        continue
                 
-                # Agregar desarrollador
-                if juego.get('desarrollador'):
-                    try:
-                        dev_name = juego['desarrollador']
-                        # Crear URI segura para el desarrollador
-                        dev_uri_safe = dev_name.replace(' ', '_').replace('/', '_').replace('&', 'and')
-                        dev_uri = URIRef(f"http://dbpedia.org/resource/{dev_uri_safe}")
-                        
-                        self.buscador.graph.add((dev_uri, RDF.type, VG.Desarrollador))
-                        self.buscador.graph.add((dev_uri, RDFS.label, Literal(dev_name, datatype=XSD.string)))
-                        self.buscador.graph.add((game_uri, VG.desarrolladoPor, dev_uri))
-                    except Exception as e:
-                        print(f"      ⚠ Error procesando desarrollador: {e}")
+                    # Mismo juego con otra URI (título normalizado y año)
+                    equivalente = self.buscador.resolucion.resolver_juego(titulo, juego['anios'], game_uri)
+                    if equivalente:
+                        print(f"  ⊙ {idx}. {titulo} (duplicado de {equivalente})")
+                        continue
                 
-                # Agregar géneros
-                if juego.get('generos'):
-                    for genero in juego['generos']:
-                        try:
-                            # Crear URI segura para el género
-                            genre_uri_safe = genero.replace(' ', '_').replace('/', '_').replace('&', 'and')
-                            genre_uri = URIRef(f"http://dbpedia.org/resource/{genre_uri_safe}")
-                            
-                            self.buscador.graph.add((genre_uri, RDF.type, VG.Genero))
-                            self.buscador.graph.add((genre_uri, RDFS.label, Literal(genero, datatype=XSD.string)))
-                            self.buscador.graph.add((game_uri, VG.tieneGenero, genre_uri))
-                        except Exception as e:
-                            print(f"      ⚠ Error procesando género {genero}: {e}")
+                    # Juego con su año, desarrolladores, géneros y hash de contenido
+                    escritor.agregar_todos(self.buscador._triples_juego(juego))
                 
-                count += 1
+                    count += 1
+                    agregados.add(game_uri)
+                    self.buscador.registrar_entidades(juego)
                 
-                # Mostrar progreso
-                anio_str = f" ({juego['anios'][0]})" if juego.get('anios') else ""
-                print(f"  ✓ {idx}. {titulo}{anio_str}")
+                    # Mostrar progreso
+                    anio_str = f" ({juego['anios'][0]})" if juego['anios'] else ""
+                    print(f"  ✓ {idx}. {titulo}{anio_str}")
                 
-            except Exception as e:
-                errores += 1
-                print(f"  ✗ {idx}. Error procesando {juego.get('titulo', 'desconocido')}: {str(e)[:80]}")
+                except Exception as e:
+                    errores += 1
+                    titulo = juego.get('titulo', 'desconocido') if isinstance(juego, dict) else 'desconocido'
+                    print(f"  ✗ {idx}. Error procesando {titulo}: {str(e)[:80]}")
+        
+            escritor.confirmar()
+            self.buscador.indice_juegos.agregar_todos(agregados)
         
         # Guardar si se agregaron juegos
         if count > 0:
             try:
-                self.buscador.graph.serialize(destination=self.buscador.owl_file, format="xml")
+                self.buscador.guardar_ontologia()
                 print(f"\n{'='*60}")
                 print(f"✓ ONTOLOGÍA GUARDADA EXITOSAMENTE")
                 print(f"{'='*60}")
@@ -497,8 +497,7 @@ class HybridSearch:
                 print(f"  Errores: {errores}")
                 
                 # Contar total
-                from buscador_semantico import VG
-                total = sum(1 for _ in self.buscador.graph.triples((None, RDF.type, VG.Videojuego)))
+                total = len(self.buscador.indice_juegos)
                 print(f"  Total en ontología: {total}")
                 print(f"{'='*60}\n")
             except Exception as e:
@@ -0,0 +1,219 @@
+"""
+Módulo de importación en streaming (NDJSON)
+Recibe un juego por línea y valida e inserta lotes de tamaño fijo a medida
+que llegan, informando el progreso de cada lote. El cuerpo se lee recién
+cuando el lote anterior terminó de escribirse, así que un cliente rápido
+queda frenado por el control de flujo de TCP y la memoria no crece con el
+tamaño de la subida
+"""
+
+import json
+import os
+import time
+from graph_writer import EscritorGrafo
+
+# Juegos por lote de validación e inserción
+IMPORTACION_LOTE = int(os.environ.get('IMPORTACION_LOTE', 500))
+# Bytes máximos de una línea (las más largas se rechazan sin leerlas enteras)
+IMPORTACION_MAX_LINEA = int(os.environ.get('IMPORTACION_MAX_LINEA', 64 * 1024))
+# Errores detallados por lote en el progreso
+MAX_ERRORES_LOTE = 10
+
+
+def uri_desde_nombre(nombre):
+    """URI de DBpedia armada desde un nombre visible (como hybrid_search)"""
+    seguro = nombre.replace(' ', '_').replace('/', '_').replace('&', 'and')
+    return f"http://dbpedia.org/resource/{seguro}"
+
+
+def normalizar_registro(juego):
+    """
+    Valida un juego recibido y lo lleva al formato de parsear_juegos. Acepta
+    tanto ese formato (con URIs) como el de las búsquedas híbridas (nombres)
+
+    Returns:
+        dict: Registro normalizado
+
+    Raises:
+        ValueError: Si el juego no tiene la estructura mínima
+    """
+    if not isinstance(juego, dict):
+        raise ValueError("estructura inválida")
+    game = juego.get('game') or juego.get('uri')
+    if not game or not isinstance(game, str):
+        raise ValueError("sin URI válida")
+
+    if not isinstance(juego.get('anios') or [], list):
+        raise ValueError("'anios' debe ser una lista")
+    anios = []
+    for anio in juego.get('anios') or []:
+        try:
+            anios.append(int(anio))
+        except (ValueError, TypeError):
+            raise ValueError(f"año inválido: {anio!r}")
+
+    desarrolladores = juego.get('desarrolladores') or (
+        [juego['desarrollador']] if juego.get('desarrollador') else []
+    )
+    generos = juego.get('generos') or []
+    if not isinstance(desarrolladores, list) or not isinstance(generos, list) or \
+            not all(isinstance(n, str) for n in desarrolladores + generos):
+        raise ValueError("desarrolladores o géneros inválidos")
+
+    desarrolladores_uri = _uris(juego, 'desarrolladores_uri', desarrolladores)
+    generos_uri = _uris(juego, 'generos_uri', generos)
+
+    return {
+        'game': game,
+        'titulo': str(juego.get('titulo') or 'Sin título'),
+        'anios': anios,
+        'desarrollador': desarrolladores[0] if desarrolladores else None,
+        'desarrolladores': desarrolladores,
+        'desarrolladores_uri': desarrolladores_uri,
+        'generos': generos,
+        'generos_uri': generos_uri,
+        'source': juego.get('source', 'dbpedia')
+    }
+
+
+def _uris(juego, campo, nombres):
+    """URIs de `campo` (una por nombre) o, si no vienen, armadas desde los nombres"""
+    uris = juego.get(campo)
+    if not uris:
+        return [uri_desde_nombre(n) for n in nombres]
+    if not isinstance(uris, list) or not all(isinstance(u, str) and u for u in uris):
+        raise ValueError(f"'{campo}' debe ser una lista de URIs")
+    if len(uris) != len(nombres):
+        raise ValueError(f"'{campo}' tiene {len(uris)} URIs para {len(nombres)} nombres")
+    return uris
+
+
+class ImportadorNDJSON:
+    def __init__(self, buscador, tamano_lote=IMPORTACION_LOTE, max_linea=IMPORTACION_MAX_LINEA):
+        """
+        Inicializa el importador
+
+        Args:
+            buscador: BuscadorSemantico destino (grafo e índices)
+            tamano_lote: Juegos por lote
+            max_linea: Bytes máximos de una línea
+        """
+        self.buscador = buscador
+        self.tamano_lote = tamano_lote
+        self.max_linea = max_linea
+
+    def leer_lineas(self, stream):
+        """
+        Lee las líneas de un flujo binario de a una, sin cargarlo entero
+
+        Yields:
+            tuple: (número de línea, bytes de la línea o None si supera max_linea)
+        """
+        numero = 0
+        while True:
+            linea = stream.readline(self.max_linea + 1)
+            if not linea:
+                return
+            numero += 1
+            if len(linea) > self.max_linea and not linea.endswith(b'\n'):
+                # Se descarta el resto de la línea sin acumularlo
+                while True:
+                    resto = stream.readline(self.max_linea + 1)
+                    if not resto or resto.endswith(b'\n'):
+                        break
+                yield numero, None
+                continue
+            yield numero, linea
+
+    def importar(self, lineas, guardar=True):
+        """
+        Importa los juegos de un iterable de (número, línea) lote a lote
+
+        Args:
+            lineas: Iterable de leer_lineas (se consume a medida que avanza)
+            guardar: Si es True, serializa la ontología al terminar
+
+        Yields:
+            dict: Progreso de cada lote y, al final, el resumen ('fin': True)
+        """
+        inicio = time.time()
+        resumen = {'lineas': 0, 'validos': 0, 'invalidos': 0, 'agregados': 0,
+                   'existentes': 0, 'fusionados': 0, 'lotes': 0}
+        lote = []
+
+        print(f"\n→ Importación NDJSON en lotes de {self.tamano_lote}...")
+        for numero, linea in lineas:
+            lote.append((numero, linea))
+            if len(lote) >= self.tamano_lote:
+                yield self._procesar_lote(lote, resumen)
+                lote = []
+        if lote:
+            yield self._procesar_lote(lote, resumen)
+
+        if guardar and resumen['agregados']:
+            self.buscador.guardar_ontologia()
+
+        resumen['segundos'] = round(time.time() - inicio, 2)
+        resumen['juegos_por_segundo'] = round(resumen['validos'] / max(resumen['segundos'], 1e-6), 1)
+        resumen['total'] = len(self.buscador.indice_juegos)
+        print(f"✓ Importación: {resumen['agregados']} agregados, {resumen['existentes']} existentes, "
+              f"{resumen['fusionados']} fusionados, {resumen['invalidos']} inválidos "
+              f"({resumen['segundos']}s)")
+        yield {'fin': True, **resumen}
+
+    def _procesar_lote(self, lote, resumen):
+        """
+        Valida, descarta duplicados e inserta un lote con un solo addN. Los
+        juegos de lotes anteriores ya están en el índice, así que solo se
+        recuerdan las URIs del lote en curso
+        """
+        inicio = time.time()
+        progreso = {'lote': resumen['lotes'] + 1, 'lineas': 0, 'validos': 0, 'invalidos': 0,
+                    'agregados': 0, 'existentes': 0, 'fusionados': 0, 'errores': []}
+        with self.buscador.lock_ingesta:
+            indice = self.buscador.indice_juegos
+            resolucion = self.buscador.resolucion
+            vistos = set()
+            nuevos = []
+
+            escritor = EscritorGrafo(self.buscador.graph, lock=self.buscador.lock_grafo)
+            for numero, linea in lote:
+                if linea is not None and not linea.strip():
+                    continue
+                progreso['lineas'] += 1
+                try:
+                    if linea is None:
+                        raise ValueError(f"línea de más de {self.max_linea} bytes")
+                    juego = normalizar_registro(json.loads(linea))
+                except ValueError as e:
+                    # json.JSONDecodeError también es ValueError
+                    progreso['invalidos'] += 1
+                    if len(progreso['errores']) < MAX_ERRORES_LOTE:
+                        progreso['errores'].append({'linea': numero, 'error': str(e)[:100]})
+                    continue
+
+                progreso['validos'] += 1
+                uri = juego['game']
+                if uri in vistos or uri in indice:
+                    progreso['existentes'] += 1
+                    continue
+                if resolucion.resolver_juego(juego['titulo'], juego['anios'], uri):
+                    progreso['fusionados'] += 1
+                    continue
+
+                escritor.agregar_todos(self.buscador._triples_juego(juego))
+                vistos.add(uri)
+                self.buscador.registrar_entidades(juego)
+                nuevos.append(uri)
+            escritor.confirmar()
+            indice.agregar_todos(nuevos)
+        progreso['agregados'] = len(nuevos)
+
+        resumen['lotes'] += 1
+        for clave in ('lineas', 'validos', 'invalidos', 'agregados', 'existentes', 'fusionados'):
+            resumen[clave] += progreso[clave]
+        progreso['total_agregados'] = resumen['agregados']
+        progreso['segundos'] = round(time.time() - inicio, 3)
+        print(f"   ✓ Lote {progreso['lote']}: {progreso['agregados']} agregados, "
+              f"{progreso['invalidos']} inválidos ({resumen['lineas']} líneas)")
+        return progreso
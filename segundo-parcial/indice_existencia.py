@@ -0,0 +1,223 @@
+"""
+Módulo de índice de existencia de videojuegos
+Responde en O(1) si una URI ya está en la ontología, sin recorrer el grafo
+en cada población. Usa un conjunto en memoria y, opcionalmente, un filtro
+de Bloom persistente en disco que se puede enviar a otros procesos para
+descartar juegos conocidos antes de procesarlos
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+from rdflib import URIRef, RDF
+
+# Ruta del filtro de Bloom persistente (vacío = sin filtro en disco)
+INDICE_BLOOM = os.environ.get('INDICE_BLOOM', '')
+# Catálogos enormes: solo el filtro en memoria, confirmando los positivos en el grafo
+INDICE_SOLO_BLOOM = os.environ.get('INDICE_SOLO_BLOOM', '0') == '1'
+
+
+class FiltroBloom:
+    def __init__(self, capacidad, tasa_error=0.01):
+        """
+        Filtro de Bloom (puede dar falsos positivos, nunca falsos negativos)
+
+        Args:
+            capacidad: Elementos esperados
+            tasa_error: Probabilidad de falso positivo con `capacidad` elementos
+        """
+        self.capacidad = max(1, int(capacidad))
+        self.tasa_error = tasa_error
+        self.num_bits = max(8, int(-self.capacidad * math.log(tasa_error) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacidad * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.cantidad = 0
+        # Datos de quien lo guarda (p. ej. el estado de la ontología que refleja)
+        self.metadatos = {}
+
+    def _posiciones(self, elemento):
+        # Doble hashing (Kirsch-Mitzenmacher) a partir de un único blake2b
+        digest = hashlib.blake2b(elemento.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def agregar(self, elemento):
+        for posicion in self._posiciones(elemento):
+            self.bits[posicion >> 3] |= 1 << (posicion & 7)
+        self.cantidad += 1
+
+    def __contains__(self, elemento):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._posiciones(elemento))
+
+    def saturado(self):
+        """True si ya tiene más elementos que su capacidad (la tasa de error sube)"""
+        return self.cantidad > self.capacidad
+
+    def a_bytes(self):
+        """Serializa el filtro (cabecera JSON + bits) para guardarlo o enviarlo"""
+        cabecera = json.dumps({
+            'capacidad': self.capacidad,
+            'tasa_error': self.tasa_error,
+            'cantidad': self.cantidad,
+            'metadatos': self.metadatos
+        }).encode('utf-8')
+        return len(cabecera).to_bytes(4, 'little') + cabecera + bytes(self.bits)
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        largo = int.from_bytes(datos[:4], 'little')
+        cabecera = json.loads(datos[4:4 + largo].decode('utf-8'))
+        filtro = cls(cabecera['capacidad'], cabecera['tasa_error'])
+        filtro.bits = bytearray(datos[4 + largo:])
+        filtro.cantidad = cabecera['cantidad']
+        filtro.metadatos = cabecera.get('metadatos', {})
+        return filtro
+
+    def guardar(self, ruta):
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(self.a_bytes())
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with open(ruta, 'rb') as f:
+            return cls.desde_bytes(f.read())
+
+
+class IndiceExistencia:
+    def __init__(self, graph, clase, ruta_bloom=INDICE_BLOOM, solo_bloom=INDICE_SOLO_BLOOM, origen=None):
+        """
+        Construye el índice recorriendo una sola vez los `rdf:type clase` del grafo
+
+        Args:
+            graph: Grafo RDF de la ontología
+            clase: Clase de los recursos a indexar (VG.Videojuego)
+            ruta_bloom: Archivo del filtro de Bloom ('' = sin filtro en disco)
+            solo_bloom: Si es True no se guarda el conjunto: los negativos del
+                        filtro son definitivos y los positivos se confirman
+                        en el grafo
+            origen: Archivo OWL del grafo; el filtro guardado solo se usa si
+                    refleja su versión actual
+        """
+        self.graph = graph
+        self.clase = clase
+        self.ruta_bloom = ruta_bloom
+        self.origen = origen
+        self._lock = threading.Lock()
+        self._uris = None if solo_bloom else set()
+        self._filtro = None
+
+        if solo_bloom and ruta_bloom and os.path.exists(ruta_bloom):
+            # Con el filtro guardado no hace falta recorrer el grafo, si es de
+            # esta misma ontología (tras un corte o una edición externa del
+            # OWL sus negativos ya no valen)
+            filtro = FiltroBloom.cargar(ruta_bloom)
+            if filtro.metadatos == self._firma():
+                self._filtro = filtro
+                print(f"✓ Índice de existencia: filtro cargado ({self._filtro.cantidad} juegos)")
+                return
+            print("   ⊙ Filtro de existencia desactualizado respecto de la ontología, reconstruyendo")
+
+        uris = [str(s) for s in graph.subjects(RDF.type, clase)]
+        if self._uris is not None:
+            self._uris.update(uris)
+        if ruta_bloom or solo_bloom:
+            self._filtro = self._crear_filtro(uris)
+            self.guardar()
+        print(f"✓ Índice de existencia: {len(uris)} juegos indexados")
+
+    def _firma(self):
+        """Estado de la ontología que refleja el filtro: triples del grafo y versión del archivo OWL"""
+        firma = {'triples': len(self.graph)}
+        if self.origen and os.path.exists(self.origen):
+            estado = os.stat(self.origen)
+            firma['origen'] = [estado.st_mtime_ns, estado.st_size]
+        return firma
+
+    def _crear_filtro(self, uris):
+        filtro = FiltroBloom(max(1000, len(uris) * 2))
+        for uri in uris:
+            filtro.agregar(uri)
+        return filtro
+
+    def __contains__(self, uri):
+        uri = str(uri)
+        if self._uris is not None:
+            return uri in self._uris
+        if uri not in self._filtro:
+            return False
+        return (URIRef(uri), RDF.type, self.clase) in self.graph
+
+    def __len__(self):
+        if self._uris is not None:
+            return len(self._uris)
+        return self._filtro.cantidad
+
+    def agregar(self, uri):
+        """Registra un juego recién agregado a la ontología"""
+        self.agregar_todos([uri])
+
+    def agregar_todos(self, uris):
+        """Registra varios juegos recién agregados a la ontología"""
+        with self._lock:
+            for uri in uris:
+                uri = str(uri)
+                if self._uris is not None:
+                    if uri in self._uris:
+                        continue
+                    self._uris.add(uri)
+                elif uri in self._filtro:
+                    # Ya contado (o falso positivo, que se confirma en el grafo)
+                    continue
+                if self._filtro is not None:
+                    self._filtro.agregar(uri)
+            if self._filtro is not None and self._filtro.saturado():
+                self._redimensionar_filtro()
+
+    def _redimensionar_filtro(self):
+        """Rehace el filtro con el doble de capacidad (los bits no se pueden ampliar)"""
+        if self._uris is not None:
+            uris = list(self._uris)
+        else:
+            uris = [str(s) for s in self.graph.subjects(RDF.type, self.clase)]
+        self._filtro = self._crear_filtro(uris)
+        print(f"   ⊙ Filtro de existencia ampliado a {self._filtro.capacidad} juegos")
+
+    def exportar_filtro(self):
+        """
+        Filtro de Bloom con los juegos conocidos, para enviarlo a otros
+        procesos (ver FiltroBloom.a_bytes) y descartar ahí los duplicados
+
+        Returns:
+            FiltroBloom: Copia del filtro (se crea si el índice no usa uno)
+        """
+        with self._lock:
+            if self._filtro is not None:
+                return FiltroBloom.desde_bytes(self._filtro.a_bytes())
+            return self._crear_filtro(self._uris)
+
+    def guardar(self):
+        """Persiste el filtro de Bloom (si hay ruta configurada) junto con la versión de la ontología"""
+        if self._filtro is None or not self.ruta_bloom:
+            return
+        with self._lock:
+            try:
+                self._filtro.metadatos = self._firma()
+                self._filtro.guardar(self.ruta_bloom)
+            except OSError as e:
+                print(f"   ⊙ No se pudo guardar el filtro de existencia: {e}")
+
+    def obtener_estadisticas(self):
+        return {
+            'juegos': len(self),
+            'conjunto': self._uris is not None,
+            'filtro_bloom': None if self._filtro is None else {
+                'capacidad': self._filtro.capacidad,
+                'bytes': len(self._filtro.bits),
+                'hashes': self._filtro.num_hashes
+            }
+        }
@@ -3,16 +3,20 @@ Módulo de Búsqueda Inteligente con NLP
 Interpreta consultas en lenguaje natural tipo Google
 """
 
-from SPARQLWrapper import SPARQLWrapper, JSON
+from remote_cache import cache_remoto_global
+from dbpedia_client import consultar_sparql, ConsultaOmitidaError
+from dbpedia_queries import construir_consulta_juegos, parsear_juegos
+from pln.gazetteer import gazetteer_global
 import re
 import datetime
 
 class IntelligentSearch:
     def __init__(self, sparql_endpoint="http://dbpedia.org/sparql"):
-        self.sparql = SPARQLWrapper(sparql_endpoint)
-        self.sparql.setReturnFormat(JSON)
-        self.sparql.setTimeout(15)
-        self.sparql.addCustomHttpHeader("User-Agent", "Mozilla/5.0")
+        self.endpoint = sparql_endpoint
+        self.timeout = 15
+        
+        # Caché compartido de consultas remotas (incluye resultados vacíos y timeouts)
+        self.cache_remoto = cache_remoto_global
         
         # ACTUALIZADO: Ganadores GOTY hasta 2024
         self.ganadores_goty = {
@@ -180,21 +184,14 @@ class IntelligentSearch:
                     print(f"✓ Género: {genero_key}")
                     break
         
-        # 4. Detectar desarrolladores
-        desarrolladores = [
-            'nintendo', 'sony', 'microsoft', 'valve', 'rockstar', 'ea', 
-            'ubisoft', 'activision', 'capcom', 'bethesda', 'fromsoftware',
-            'naughty dog', 'cd projekt', 'team asobi'
-        ]
-        
-        for dev in desarrolladores:
-            if dev in consulta_lower:
-                resultado['parametros']['desarrollador'] = dev
-                resultado['entidades'].append(('DESARROLLADOR', dev))
-                if resultado['confianza'] < 0.6:
-                    resultado['confianza'] = 0.6
-                print(f"✓ Desarrollador: {dev}")
-                break
+        # 4. Detectar desarrolladores (los de la ontología y los conocidos, ver pln.gazetteer)
+        for mencion in gazetteer_global.reconocer(consulta, tipos=('Desarrollador',))[:1]:
+            dev = mencion['etiqueta'].lower()
+            resultado['parametros']['desarrollador'] = dev
+            resultado['entidades'].append(('DESARROLLADOR', dev))
+            if resultado['confianza'] < 0.6:
+                resultado['confianza'] = 0.6
+            print(f"✓ Desarrollador: {dev}")
         
         # 5. Detectar términos temporales
         temporales = {
@@ -228,8 +225,15 @@ class IntelligentSearch:
         
         return resultado
     
-    def buscar_inteligente(self, consulta, limite=15):
-        """Ejecuta búsqueda CON GARANTÍA DE RESULTADOS - MEJORADO"""
+    def buscar_inteligente(self, consulta, limite=15, deadline=None):
+        """
+        Ejecuta búsqueda CON GARANTÍA DE RESULTADOS - MEJORADO
+        
+        Args:
+            consulta: Consulta en lenguaje natural
+            limite: Máximo de resultados
+            deadline: Deadline de la petición (opcional); las queries usan el tiempo restante
+        """
         analisis = self.analizar_consulta(consulta)
         
         # CAMBIO CLAVE: Solo forzar si confianza es EXTREMADAMENTE baja
@@ -246,20 +250,20 @@ class IntelligentSearch:
         try:
             # Ejecutar query según tipo
             if tipo == 'superlativo_ventas':
-                resultados = self._query_mas_vendidos(params, limite_efectivo)
+                resultados = self._query_mas_vendidos(params, limite_efectivo, deadline)
             elif tipo == 'premio':
-                resultados = self._query_premiados(params, limite_efectivo)
+                resultados = self._query_premiados(params, limite_efectivo, deadline)
             elif tipo == 'superlativo_jugadores':
-                resultados = self._query_mas_populares(params, limite_efectivo)
+                resultados = self._query_mas_populares(params, limite_efectivo, deadline)
             elif tipo == 'superlativo_calificacion':
-                resultados = self._query_mejor_calificados(params, limite_efectivo)
+                resultados = self._query_mejor_calificados(params, limite_efectivo, deadline)
             elif tipo == 'superlativo_reciente':
-                resultados = self._query_mas_recientes(params, limite_efectivo)
+                resultados = self._query_mas_recientes(params, limite_efectivo, deadline)
             elif tipo == 'superlativo_antiguo':
-                resultados = self._query_mas_antiguos(params, limite_efectivo)
+                resultados = self._query_mas_antiguos(params, limite_efectivo, deadline)
             else:
                 # Para búsquedas generales, usar query normal
-                resultados = self._query_general(params, limite_efectivo)
+                resultados = self._query_general(params, limite_efectivo, deadline)
             
             # Filtrar y deduplicar
             resultados = self._filtrar_y_deduplicar(resultados, params)
@@ -378,7 +382,7 @@ class IntelligentSearch:
             'message': 'No se encontraron resultados específicos. Mostrando juegos populares.'
         }
     
-    def _query_premiados(self, params, limite):
+    def _query_premiados(self, params, limite, deadline=None):
         """Query GOTY con Astro Bot 2024"""
         anio = params.get('anio')
         
@@ -386,215 +390,82 @@ class IntelligentSearch:
             ganador = self.ganadores_goty[anio]
             print(f"   ✓ GOTY {anio} garantizado: {ganador.title()}")
             
-            query = f"""
-            PREFIX dbo: <http://dbpedia.org/ontology/>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-            WHERE {{
-                ?game a dbo:VideoGame .
-                ?game rdfs:label ?label .
-                ?game dbo:releaseDate ?releaseDate .
-                FILTER (lang(?label) = 'en')
-                FILTER (CONTAINS(LCASE(?label), '{ganador}'))
-                FILTER (YEAR(?releaseDate) = {anio})
-                
-                OPTIONAL {{ ?game dbo:developer ?developer }}
-                OPTIONAL {{ ?game dbo:genre ?genre }}
-            }}
-            LIMIT {limite}
-            """
+            query = construir_consulta_juegos(
+                contiene=[ganador], anio_min=anio, anio_max=anio, limite=limite
+            )
         else:
-            ganadores_str = '|'.join(self.ganadores_goty.values())
-            query = f"""
-            PREFIX dbo: <http://dbpedia.org/ontology/>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-            WHERE {{
-                ?game a dbo:VideoGame .
-                ?game rdfs:label ?label .
-                FILTER (lang(?label) = 'en')
-                FILTER (REGEX(LCASE(?label), '({ganadores_str})'))
-                
-                OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-                OPTIONAL {{ ?game dbo:developer ?developer }}
-                OPTIONAL {{ ?game dbo:genre ?genre }}
-            }}
-            ORDER BY DESC(?releaseDate)
-            LIMIT {limite}
-            """
-        
-        return self._ejecutar_query(query)
+            query = construir_consulta_juegos(
+                contiene=list(self.ganadores_goty.values()),
+                orden='fecha_desc',
+                limite=limite
+            )
+        
+        return self._ejecutar_query(query, deadline)
     
-    def _query_mas_vendidos(self, params, limite):
+    def _query_mas_vendidos(self, params, limite, deadline=None):
         """Query más vendidos"""
-        filtro_anio = f"FILTER (YEAR(?releaseDate) <= 2024)" if 'anio' not in params else f"FILTER (YEAR(?releaseDate) = {params['anio']})"
-        
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        anio = params.get('anio')
         
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            FILTER (lang(?label) = 'en')
-            
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-            
-            {filtro_anio}
-            
-            FILTER (
-                CONTAINS(LCASE(?label), 'tetris') ||
-                (CONTAINS(LCASE(?label), 'minecraft') && !CONTAINS(LCASE(?label), 'story')) ||
-                (CONTAINS(LCASE(?label), 'grand theft auto v') && !CONTAINS(LCASE(?label), 'vi')) ||
-                CONTAINS(LCASE(?label), 'wii sports') ||
-                CONTAINS(LCASE(?label), 'super mario bros')
-            )
-        }}
-        ORDER BY DESC(?releaseDate)
-        LIMIT {limite * 3}
-        """
-        return self._ejecutar_query(query)
+        query = construir_consulta_juegos(
+            contiene=[
+                'tetris',
+                ('minecraft', 'story'),
+                ('grand theft auto v', 'vi'),
+                'wii sports',
+                'super mario bros'
+            ],
+            anio_min=anio,
+            anio_max=anio if anio else 2024,
+            orden='fecha_desc',
+            limite=limite * 3
+        )
+        return self._ejecutar_query(query, deadline)
     
-    def _query_mas_populares(self, params, limite):
+    def _query_mas_populares(self, params, limite, deadline=None):
         """Query más jugadores"""
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            FILTER (lang(?label) = 'en')
-            
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-            
-            FILTER (
-                CONTAINS(LCASE(?label), 'minecraft') ||
-                CONTAINS(LCASE(?label), 'league of legends') ||
-                CONTAINS(LCASE(?label), 'fortnite') ||
-                CONTAINS(LCASE(?label), 'roblox') ||
-                CONTAINS(LCASE(?label), 'counter-strike') ||
-                CONTAINS(LCASE(?label), 'valorant')
-            )
-        }}
-        ORDER BY DESC(?releaseDate)
-        LIMIT {limite}
-        """
-        return self._ejecutar_query(query)
+        query = construir_consulta_juegos(
+            contiene=['minecraft', 'league of legends', 'fortnite', 'roblox', 'counter-strike', 'valorant'],
+            orden='fecha_desc',
+            limite=limite
+        )
+        return self._ejecutar_query(query, deadline)
     
-    def _query_mas_recientes(self, params, limite):
+    def _query_mas_recientes(self, params, limite, deadline=None):
         """Query juegos recientes"""
-        filtro_dev = ""
-        if 'desarrollador' in params:
-            dev = params['desarrollador'].title()
-            filtro_dev = f"""
-            ?game dbo:developer ?dev .
-            ?dev rdfs:label ?devLabel .
-            FILTER (CONTAINS(LCASE(?devLabel), LCASE("{dev}")))
-            """
-        
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            ?game dbo:releaseDate ?releaseDate .
-            FILTER (lang(?label) = 'en')
-            FILTER (YEAR(?releaseDate) >= 2023 && YEAR(?releaseDate) <= 2025)
-            
-            {filtro_dev}
-            
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-        }}
-        ORDER BY DESC(?releaseDate)
-        LIMIT {limite * 2}
-        """
-        return self._ejecutar_query(query)
+        dev = params['desarrollador'].title() if 'desarrollador' in params else None
+        
+        query = construir_consulta_juegos(
+            anio_min=2023,
+            anio_max=2025,
+            desarrollador_contiene=dev,
+            orden='fecha_desc',
+            limite=limite * 2
+        )
+        return self._ejecutar_query(query, deadline)
     
-    def _query_mejor_calificados(self, params, limite):
+    def _query_mejor_calificados(self, params, limite, deadline=None):
         """Query mejor calificados"""
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            FILTER (lang(?label) = 'en')
-            
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-            
-            FILTER (
-                CONTAINS(LCASE(?label), 'the legend of zelda') ||
-                CONTAINS(LCASE(?label), 'super mario') ||
-                CONTAINS(LCASE(?label), 'the witcher 3') ||
-                CONTAINS(LCASE(?label), 'elden ring') ||
-                CONTAINS(LCASE(?label), "baldur's gate")
-            )
-        }}
-        ORDER BY DESC(?releaseDate)
-        LIMIT {limite}
-        """
-        return self._ejecutar_query(query)
+        query = construir_consulta_juegos(
+            contiene=['the legend of zelda', 'super mario', 'the witcher 3', 'elden ring', "baldur's gate"],
+            orden='fecha_desc',
+            limite=limite
+        )
+        return self._ejecutar_query(query, deadline)
     
-    def _query_mas_antiguos(self, params, limite):
+    def _query_mas_antiguos(self, params, limite, deadline=None):
         """Query juegos antiguos"""
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            ?game dbo:releaseDate ?releaseDate .
-            FILTER (lang(?label) = 'en')
-            FILTER (YEAR(?releaseDate) < 1990)
-            
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-        }}
-        ORDER BY ?releaseDate
-        LIMIT {limite}
-        """
-        return self._ejecutar_query(query)
+        query = construir_consulta_juegos(
+            anio_max=1989,
+            orden='fecha_asc',
+            limite=limite
+        )
+        return self._ejecutar_query(query, deadline)
     
-    def _query_general(self, params, limite):
+    def _query_general(self, params, limite, deadline=None):
         """Query general - SIN forzar resultados"""
         termino = params.get('termino', '')
-        query = f"""
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-        WHERE {{
-            ?game a dbo:VideoGame .
-            ?game rdfs:label ?label .
-            FILTER (lang(?label) = 'en')
-            FILTER (CONTAINS(LCASE(?label), LCASE("{termino}")))
-            
-            OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-            OPTIONAL {{ ?game dbo:developer ?developer }}
-            OPTIONAL {{ ?game dbo:genre ?genre }}
-        }}
-        LIMIT {limite}
-        """
-        return self._ejecutar_query(query)
+        query = construir_consulta_juegos(contiene=[termino], limite=limite)
+        return self._ejecutar_query(query, deadline)
     
     def _filtrar_y_deduplicar(self, resultados, params):
         """Filtra duplicados - Prioriza año específico si existe"""
@@ -628,50 +499,28 @@ class IntelligentSearch:
         
         return filtrados
     
-    def _ejecutar_query(self, query):
+    def _ejecutar_query(self, query, deadline=None):
         """Ejecuta query"""
-        self.sparql.setQuery(query)
+        clave_cache = f"intelligent::{' '.join(query.split())}"
+        encontrado, cacheado = self.cache_remoto.obtener(clave_cache)
+        if encontrado:
+            print(f"   ✓ Query desde caché ({len(cacheado)} resultados)")
+            return cacheado
         
         try:
             print(f"   Ejecutando query...")
-            results = self.sparql.query().convert()
+            results = consultar_sparql(query, self.endpoint, self.timeout, deadline=deadline)
             
-            if "results" in results and "bindings" in results["results"]:
-                bindings = results["results"]["bindings"]
-                resultados = []
-                
-                for row in bindings:
-                    resultado = {
-                        'game': row['game']['value'],
-                        'titulo': row['label']['value'],
-                        'anios': [],
-                        'desarrollador': None,
-                        'generos': [],
-                        'source': 'dbpedia'
-                    }
-                    
-                    if 'releaseDate' in row:
-                        try:
-                            year = row['releaseDate']['value'][:4]
-                            resultado['anios'] = [int(year)]
-                        except:
-                            pass
-                    
-                    if 'developer' in row:
-                        dev_name = row['developer']['value'].split('/')[-1].replace('_', ' ')
-                        resultado['desarrollador'] = dev_name
-                    
-                    if 'genre' in row:
-                        genre_name = row['genre']['value'].split('/')[-1].replace('_', ' ')
-                        resultado['generos'] = [genre_name]
-                    
-                    resultados.append(resultado)
-                
-                print(f"   ✓ {len(resultados)} resultados")
-                return resultados
+            resultados = parsear_juegos(results)
             
-            return []
+            print(f"   ✓ {len(resultados)} resultados")
+            self.cache_remoto.guardar(clave_cache, resultados)
+            return resultados
             
+        except ConsultaOmitidaError as e:
+            print(f"   ⊙ {e}")
+            return []
         except Exception as e:
             print(f"   ✗ Error: {str(e)[:100]}")
+            self.cache_remoto.registrar_error(clave_cache, e)
             return []
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Módulo de trabajos en segundo plano
+Las tareas largas (población de la ontología) se encolan en un pool acotado
+de hilos; la petición HTTP recibe un id y consulta el progreso después.
+La cola de espera también es acotada: si se llena, enviar() lo rechaza.
+Las tareas que escriben el grafo se serializan entre sí con el lock de
+ingesta del buscador, no acá
+"""
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Trabajo:
+    def __init__(self, tipo, parametros=None):
+        """
+        Trabajo encolado
+
+        Args:
+            tipo: Nombre de la tarea (p. ej. 'poblar')
+            parametros: Parámetros con los que se lanzó, para mostrarlos
+        """
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.parametros = parametros or {}
+        self.estado = 'pendiente'
+        self.progreso = {}
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self._lock = threading.Lock()
+
+    def actualizar(self, **progreso):
+        """Registra el avance (lo llama la tarea mientras corre)"""
+        with self._lock:
+            self.progreso.update(progreso)
+
+    def finalizado(self):
+        """True si el trabajo ya terminó (con éxito o con error)"""
+        return self.estado in ('completado', 'error')
+
+    def a_dict(self):
+        """Representación JSON del trabajo"""
+        with self._lock:
+            fin = self.terminado or time.time()
+            return {
+                'id': self.id,
+                'tipo': self.tipo,
+                'estado': self.estado,
+                'parametros': self.parametros,
+                'progreso': dict(self.progreso),
+                'resultado': self.resultado,
+                'error': self.error,
+                'creado': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.creado)),
+                'segundos': round(fin - self.iniciado, 2) if self.iniciado else 0
+            }
+
+
+class ColaLlenaError(Exception):
+    """Ya hay demasiados trabajos sin terminar; el llamador debe reintentar más tarde"""
+
+
+class ColaTrabajos:
+    def __init__(self, max_trabajadores=2, max_historial=100, max_pendientes=4):
+        """
+        Inicializa la cola
+
+        Args:
+            max_trabajadores: Trabajos que corren a la vez (el resto espera en cola)
+            max_historial: Trabajos terminados que se conservan para consultarlos
+            max_pendientes: Trabajos sin terminar (en curso o esperando) que se
+                            admiten; con más, enviar() lanza ColaLlenaError
+        """
+        self.max_trabajadores = max_trabajadores
+        self.max_historial = max_historial
+        self.max_pendientes = max_pendientes
+        self._ejecutor = ThreadPoolExecutor(max_workers=max_trabajadores, thread_name_prefix="trabajo")
+        self._trabajos = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, tipo, funcion, parametros=None):
+        """
+        Encola una tarea
+
+        Args:
+            tipo: Nombre de la tarea
+            funcion: Callable que recibe el Trabajo (para informar progreso)
+                     y devuelve el resultado final
+            parametros: Parámetros a mostrar en el estado del trabajo
+
+        Returns:
+            Trabajo: El trabajo creado (estado 'pendiente')
+
+        Raises:
+            ColaLlenaError: Si ya hay max_pendientes trabajos sin terminar
+        """
+        trabajo = Trabajo(tipo, parametros)
+        with self._lock:
+            pendientes = sum(1 for t in self._trabajos.values() if not t.finalizado())
+            if pendientes >= self.max_pendientes:
+                raise ColaLlenaError(f"hay {pendientes} trabajos sin terminar, reintentar más tarde")
+            self._trabajos[trabajo.id] = trabajo
+            self._purgar()
+        self._ejecutor.submit(self._ejecutar, trabajo, funcion)
+        print(f"→ Trabajo {tipo} encolado ({trabajo.id[:8]})")
+        return trabajo
+
+    def _ejecutar(self, trabajo, funcion):
+        trabajo.estado = 'en_curso'
+        trabajo.iniciado = time.time()
+        try:
+            trabajo.resultado = funcion(trabajo)
+            trabajo.estado = 'completado'
+            print(f"✓ Trabajo {trabajo.tipo} completado ({trabajo.id[:8]})")
+        except Exception as e:
+            trabajo.error = str(e)
+            trabajo.estado = 'error'
+            print(f"✗ Trabajo {trabajo.tipo} falló ({trabajo.id[:8]}):")
+            print(traceback.format_exc())
+        finally:
+            trabajo.terminado = time.time()
+
+    def obtener(self, trabajo_id):
+        """Trabajo por id, o None si no existe (o ya se purgó)"""
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def listar(self):
+        """Trabajos conocidos, del más reciente al más antiguo"""
+        with self._lock:
+            trabajos = list(self._trabajos.values())
+        return sorted(trabajos, key=lambda t: t.creado, reverse=True)
+
+    def _purgar(self):
+        """Descarta los trabajos terminados más antiguos por encima de max_historial"""
+        terminados = sorted(
+            (t for t in self._trabajos.values() if t.finalizado()),
+            key=lambda t: t.creado
+        )
+        for trabajo in terminados[:max(0, len(terminados) - self.max_historial)]:
+            del self._trabajos[trabajo.id]
+
+
+# Cola compartida por la aplicación
+cola_trabajos = ColaTrabajos(
+    max_trabajadores=int(os.environ.get('TRABAJOS_MAX', 2)),
+    max_pendientes=int(os.environ.get('TRABAJOS_MAX_PENDIENTES', 4))
+)
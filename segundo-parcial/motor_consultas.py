@@ -0,0 +1,322 @@
+"""
+Módulo de ejecución de specs de consulta (PLN)
+Compila la salida de build_query_spec en un único plan conjuntivo sobre la
+ontología local: cada filtro (desarrollador, géneros, años, plataformas,
+modos, flags...) es un paso que produce el conjunto de juegos que lo
+cumplen usando los índices del grafo (sujetos por predicado y objeto), y
+los pasos se intersecan empezando por el más chico. El plan de cada
+plantilla de SUPPORTED_INTENTS (sus pasos y filtros implícitos) se compila
+al crear el motor.
+
+Los filtros que no salen de la consulta (los implícitos de la plantilla y
+los que agrega build_query_spec según el intent) solo son obligatorios si
+el intent coincidió del todo; si no, son pasos blandos que se descartan
+cuando dejarían la búsqueda sin resultados.
+
+Como la ontología es de mundo abierto, un filtro sobre una propiedad de la
+que el grafo no tiene ningún dato no se puede evaluar: queda informado en
+el plan entre los 'omitidos' en lugar de descartar todos los juegos
+"""
+
+import threading
+import time
+from collections import namedtuple
+from rdflib import Namespace, RDF, RDFS, Literal, URIRef
+from rdflib.namespace import XSD
+from pln.pipeline import SUPPORTED_INTENTS
+
+VG = Namespace("http://www.semanticweb.org/videojuegos#")
+
+# Confianza de classify_intent cuando la consulta tiene todos los patrones del intent
+CONFIANZA_PLANTILLA = 0.85
+
+# Ancho máximo de un rango de años que se resuelve año a año (más ancho: un recorrido)
+MAX_ANIOS_POR_BUSQUEDA = 200
+
+# Claves de género del PLN -> términos que aparecen en las etiquetas de los géneros
+TERMINOS_GENERO = {
+    'vg:Accion': ('action', 'accion'),
+    'vg:Aventura': ('adventure', 'aventura'),
+    'vg:RPG': ('role-playing', 'rpg', ' rol'),
+    'vg:Estrategia': ('strategy', 'estrategia'),
+    'vg:Simulacion': ('simulation', 'simulacion', 'simulación'),
+    'vg:Deportes': ('sports', 'deporte'),
+    'vg:Educativo': ('educational', 'educativo')
+}
+
+# Filtros implícitos de cada plantilla (se suman a los que trae la spec)
+FILTROS_PLANTILLA = {
+    'sparql_crossplay': {'bool_flags': ['supportsCrossPlay']},
+    'sparql_openworld_mission': {'bool_flags': ['openWorld', 'missionBased']},
+    'sparql_customization_non_linear': {'bool_flags': ['advancedCustomization', 'nonLinearProgression']},
+    'sparql_proprietary_engine': {'bool_flags': ['proprietaryEngine']},
+    'sparql_adaptive_ai': {'bool_flags': ['adaptiveAI']},
+    'sparql_mod_support': {'bool_flags': ['modSupport']},
+    'sparql_monetization': {'bool_flags': ['monetization']},
+    'sparql_goty_by_year': {'awards': ['award:GOTY']},
+    'sparql_best_soundtrack_5y': {'awards': ['award:BestSoundtrack']}
+}
+
+# Tipos de paso y filtros de la spec que usa cada uno
+TIPOS_PASO = (
+    ('juegos', ('game_uris',)),
+    ('desarrollador', ('developer', 'developer_uris')),
+    ('generos', ('genres',)),
+    ('anios', ('year_range',)),
+    ('plataformas', ('platforms',)),
+    ('modos', ('modes',)),
+    ('clasificaciones', ('age_ratings',)),
+    ('premios', ('awards',)),
+    ('flags', ('bool_flags',))
+)
+
+# Fila de resultado con los mismos campos que las consultas SPARQL del buscador
+FilaJuego = namedtuple('FilaJuego', ['game', 'titulo', 'anios', 'dev', 'generos'])
+
+# pasos: (filtros que usa, función) de cada tipo; implicitos: filtros fijos de la plantilla
+PlanCompilado = namedtuple('PlanCompilado', ['plantilla', 'implicitos', 'pasos'])
+
+
+def _nombre_local(valor):
+    """'vg:PC' / 'http://...#PC' -> 'pc'"""
+    return str(valor).rsplit('#', 1)[-1].rsplit(':', 1)[-1].rsplit('/', 1)[-1].lower()
+
+
+def _unir(filtros, extra):
+    """Filtros de `filtros` más los valores de lista de `extra` (sin repetir)"""
+    unidos = dict(filtros)
+    for clave, valores in extra.items():
+        unidos[clave] = list(dict.fromkeys(list(unidos.get(clave) or []) + list(valores)))
+    return unidos
+
+
+class MotorConsultas:
+    def __init__(self, buscador):
+        """
+        Inicializa el motor
+
+        Args:
+            buscador: BuscadorSemantico con el grafo a consultar
+        """
+        self.buscador = buscador
+        self.graph = buscador.graph
+        self._lock = threading.Lock()
+        # plantilla -> PlanCompilado, todas compiladas de antemano
+        self._planes = {plantilla: self.compilar(plantilla)
+                        for plantilla in set(SUPPORTED_INTENTS.values()) | {'sparql_generic'}}
+        self.estadisticas = {'ejecuciones': 0, 'planes_compilados': len(self._planes), 'pasos_descartados': 0}
+
+    def compilar(self, plantilla):
+        """
+        Plan de una plantilla: sus filtros implícitos y los pasos que pueden
+        aplicarse, con los de esos filtros primero
+
+        Returns:
+            PlanCompilado: (plantilla, filtros implícitos, pasos)
+        """
+        implicitos = {clave: tuple(valores) for clave, valores in FILTROS_PLANTILLA.get(plantilla, {}).items()}
+        pasos = sorted(TIPOS_PASO, key=lambda t: not any(c in implicitos for c in t[1]))
+        return PlanCompilado(plantilla, implicitos,
+                             tuple((claves, getattr(self, f'_paso_{tipo}')) for tipo, claves in pasos))
+
+    def _plan(self, plantilla):
+        return self._planes.get(plantilla) or self._planes['sparql_generic']
+
+    def _separar_filtros(self, spec, plan):
+        """
+        Filtros obligatorios y blandos de una spec: los que no salen de la
+        consulta solo son obligatorios si el intent coincidió del todo
+        """
+        filtros = spec.get('filters') or {}
+        agregados = spec.get('implied_filters') or {}
+        if spec.get('confidence', 0) >= CONFIANZA_PLANTILLA:
+            return _unir(filtros, plan.implicitos), {}
+        obligatorios = {clave: [v for v in valores if v not in agregados[clave]] if clave in agregados else valores
+                        for clave, valores in filtros.items()}
+        return obligatorios, _unir(agregados, plan.implicitos)
+
+    def _evaluar(self, plan, filtros, omitidos):
+        """Candidatos de cada paso del plan con `filtros`; los pasos sin datos van a `omitidos`"""
+        pasos = []
+        for claves, funcion in plan.pasos:
+            if not any(filtros.get(c) for c in claves):
+                continue
+            for nombre, candidatos in funcion(filtros):
+                if candidatos is None:
+                    omitidos.append(nombre)
+                else:
+                    pasos.append((nombre, candidatos))
+        return pasos
+
+    def ejecutar(self, spec, limite=None):
+        """
+        Ejecuta una spec de pln.run_nlp como una sola consulta conjuntiva
+
+        Args:
+            spec: Dict con 'template' y 'filters' (build_query_spec)
+            limite: Máximo de juegos a devolver (None = todos)
+
+        Returns:
+            dict: 'juegos' (FilaJuego ordenadas por título), 'plan' (pasos
+                  aplicados con su cantidad de candidatos, en orden de
+                  ejecución), 'omitidos' (pasos sin datos en el grafo),
+                  'descartados' (pasos blandos que dejaban la búsqueda vacía)
+                  y 'aplicados' (cantidad de pasos del plan)
+        """
+        inicio = time.perf_counter()
+        plan = self._plan(spec.get('template', 'sparql_generic'))
+        obligatorios, blandos = self._separar_filtros(spec, plan)
+
+        with self.buscador.lock_grafo:
+            omitidos, descartados = [], []
+            pasos = self._evaluar(plan, obligatorios, omitidos)
+            opcionales = self._evaluar(plan, blandos, omitidos)
+
+            # Intersección empezando por el paso más selectivo
+            pasos.sort(key=lambda p: len(p[1]))
+            resultado = None
+            for _, candidatos in pasos:
+                resultado = set(candidatos) if resultado is None else resultado & candidatos
+                if not resultado:
+                    break
+
+            # Los pasos blandos solo acotan si queda algún juego
+            opcionales.sort(key=lambda p: len(p[1]))
+            for nombre, candidatos in opcionales:
+                if resultado is not None and not resultado:
+                    break
+                acotado = set(candidatos) if resultado is None else resultado & candidatos
+                if acotado:
+                    resultado = acotado
+                    pasos.append((nombre, candidatos))
+                else:
+                    descartados.append(nombre)
+            juegos = [] if resultado is None else self._filas(resultado, limite)
+
+        with self._lock:
+            self.estadisticas['ejecuciones'] += 1
+            self.estadisticas['pasos_descartados'] += len(descartados)
+        return {
+            'juegos': juegos,
+            'aplicados': len(pasos),
+            'plan': [{'paso': nombre, 'candidatos': len(candidatos)} for nombre, candidatos in pasos],
+            'omitidos': list(dict.fromkeys(omitidos)),
+            'descartados': descartados,
+            'segundos': round(time.perf_counter() - inicio, 4)
+        }
+
+    # --- Pasos: cada uno devuelve [(nombre, juegos | None si no hay datos)] ---
+
+    def _juegos_con(self, predicado, objetos):
+        """Juegos con `predicado` hacia alguno de `objetos` (índice por objeto)"""
+        juegos = set()
+        for objeto in objetos:
+            juegos.update(self.graph.subjects(predicado, objeto))
+        return juegos
+
+    def _tiene_datos(self, predicado):
+        return next(iter(self.graph.triples((None, predicado, None))), None) is not None
+
+    def _recursos(self, clase, predicado, coincide):
+        """Recursos de `clase` (o valores de `predicado`) cuyo nombre o etiqueta cumple `coincide`"""
+        recursos = set(self.graph.subjects(RDF.type, clase)) | set(self.graph.objects(None, predicado))
+        return {r for r in recursos
+                if coincide(_nombre_local(r)) or any(coincide(str(l).lower()) for l in self.graph.objects(r, RDFS.label))}
+
+    def _paso_juegos(self, filtros):
+        uris = filtros.get('game_uris') or []
+        if not uris:
+            return []
+        juegos = {g for g in (URIRef(str(u)) for u in uris) if (g, RDF.type, VG.Videojuego) in self.graph}
+        return [('juegos', juegos)]
+
+    def _paso_desarrollador(self, filtros):
+        texto = (filtros.get('developer') or '').strip().lower()
+        uris = filtros.get('developer_uris') or []
+        if not texto and not uris:
+            return []
+        desarrolladores = {URIRef(str(u)) for u in uris}
+        if texto:
+            desarrolladores |= {d for d in self.graph.subjects(RDF.type, VG.Desarrollador)
+                                if any(texto in str(l).lower() for l in self.graph.objects(d, RDFS.label))}
+        return [('desarrollador', self._juegos_con(VG.desarrolladoPor, desarrolladores))]
+
+    def _paso_generos(self, filtros):
+        # Un paso por género: el juego tiene que ser de todos
+        pasos = []
+        for genero in filtros.get('genres') or []:
+            terminos = TERMINOS_GENERO.get(genero, (_nombre_local(genero),))
+            generos = self._recursos(VG.Genero, VG.tieneGenero,
+                                     lambda nombre: any(t in f' {nombre}' for t in terminos))
+            pasos.append((f'genero:{_nombre_local(genero)}', self._juegos_con(VG.tieneGenero, generos)))
+        return pasos
+
+    def _paso_anios(self, filtros):
+        rango = filtros.get('year_range')
+        if not rango:
+            return []
+        desde, hasta = int(rango[0]), int(rango[1])
+        if hasta - desde < MAX_ANIOS_POR_BUSQUEDA:
+            anios = [Literal(a, datatype=XSD.integer) for a in range(desde, hasta + 1)]
+            juegos = self._juegos_con(VG.anioLanzamiento, anios)
+        else:
+            juegos = {g for g, a in self.graph.subject_objects(VG.anioLanzamiento)
+                      if str(a).isdigit() and desde <= int(a) <= hasta}
+        return [(f'anios:{desde}-{hasta}', juegos)]
+
+    def _paso_por_nombre(self, nombre, predicado, clase, valores):
+        """Paso 'alguno de': plataformas, modos y clasificaciones se comparan por nombre"""
+        if not valores:
+            return []
+        if not self._tiene_datos(predicado):
+            return [(nombre, None)]
+        claves = {_nombre_local(v) for v in valores}
+        objetos = self._recursos(clase, predicado, lambda n: n in claves) if clase is not None else \
+            {o for o in self.graph.objects(None, predicado) if _nombre_local(o) in claves}
+        return [(nombre, self._juegos_con(predicado, objetos))]
+
+    def _paso_plataformas(self, filtros):
+        return self._paso_por_nombre('plataformas', VG.tienePlataforma, VG.Plataforma, filtros.get('platforms'))
+
+    def _paso_modos(self, filtros):
+        return self._paso_por_nombre('modos', VG.tieneModoJuego, VG.ModoJuego, filtros.get('modes'))
+
+    def _paso_clasificaciones(self, filtros):
+        return self._paso_por_nombre('clasificaciones', VG.clasificacionEdad, None, filtros.get('age_ratings'))
+
+    def _paso_premios(self, filtros):
+        return self._paso_por_nombre('premios', VG.ganoPremio, None, filtros.get('awards'))
+
+    def _paso_flags(self, filtros):
+        # Un paso por flag: vg:<flag> true
+        pasos = []
+        for flag in filtros.get('bool_flags') or []:
+            predicado = VG[flag]
+            if not self._tiene_datos(predicado):
+                pasos.append((f'flag:{flag}', None))
+            else:
+                pasos.append((f'flag:{flag}', {g for g, v in self.graph.subject_objects(predicado)
+                                                if str(v).lower() in ('true', '1')}))
+        return pasos
+
+    # --- Proyección ---
+
+    def _filas(self, juegos, limite):
+        """Título, años, un desarrollador y géneros de cada juego (como las consultas SPARQL)"""
+        filas = []
+        for game in juegos:
+            titulo = next(self.graph.objects(game, VG.titulo), None)
+            if titulo is None:
+                continue
+            anios = sorted({str(a) for a in self.graph.objects(game, VG.anioLanzamiento)})
+            dev = next((l for d in self.graph.objects(game, VG.desarrolladoPor)
+                        for l in self.graph.objects(d, RDFS.label)), None)
+            generos = sorted({str(l) for g in self.graph.objects(game, VG.tieneGenero)
+                              for l in self.graph.objects(g, RDFS.label)})
+            filas.append(FilaJuego(game, titulo, ','.join(anios) or None, dev, ','.join(generos) or None))
+        filas.sort(key=lambda f: str(f.titulo))
+        return filas[:limite] if limite is not None else filas
+
+    def obtener_estadisticas(self):
+        with self._lock:
+            return {**self.estadisticas, 'plantillas': sorted(self._planes)}
@@ -0,0 +1,328 @@
+"""
+Módulo de ingesta masiva por etapas
+descarga → normalización → resolución/dedupe → escritura, conectadas por
+colas acotadas. La normalización (parseo del JSON, nombres desde URIs,
+claves de título, prefiltro de Bloom) corre en un pool de procesos y un
+único hilo escritor es dueño del grafo
+
+Uso:
+    python pipeline_ingesta.py --max-juegos 20000 --procesos 4
+"""
+
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dbpedia_client import consultar_sparql, ConsultaOmitidaError
+from dbpedia_queries import construir_consulta_juegos, parsear_juegos
+from graph_writer import EscritorGrafo
+from indice_existencia import FiltroBloom
+from resolucion_entidades import clave_titulo
+
+# Marca de fin de una cola
+FIN = None
+
+# Segundos de espera en las colas antes de revisar si el pipeline se detuvo
+ESPERA_COLA = 0.5
+
+# Filtro de juegos existentes recibido por cada proceso trabajador
+_filtro_trabajador = None
+
+
+def _inicializar_trabajador(filtro_bytes):
+    """Se ejecuta una vez en cada proceso del pool: recibe el filtro de existencia"""
+    global _filtro_trabajador
+    _filtro_trabajador = FiltroBloom.desde_bytes(filtro_bytes)
+
+
+def normalizar_pagina(bindings):
+    """
+    Etapa CPU (en un proceso del pool): convierte una página de bindings en
+    registros, calcula su clave de título y marca los que el filtro de Bloom
+    da por existentes (los negativos del filtro no necesitan confirmación)
+
+    Returns:
+        list: Registros de parsear_juegos con 'clave' y 'posible_existente'
+    """
+    juegos = parsear_juegos(bindings)
+    for juego in juegos:
+        juego['clave'] = clave_titulo(juego['titulo'])
+        juego['posible_existente'] = _filtro_trabajador is None or juego['game'] in _filtro_trabajador
+    return juegos
+
+
+class PipelineIngesta:
+    def __init__(self, buscador, procesos=None, tamano_pagina=500, capacidad_colas=4, tamano_lote=10000):
+        """
+        Inicializa el pipeline
+
+        Args:
+            buscador: BuscadorSemantico destino (grafo e índices)
+            procesos: Procesos de normalización (por defecto, uno por núcleo)
+            tamano_pagina: Juegos por consulta de descarga
+            capacidad_colas: Elementos (páginas) que admite cada cola antes de frenar a la etapa anterior
+            tamano_lote: Triples por inserción addN del escritor
+        """
+        self.buscador = buscador
+        self.procesos = procesos or os.cpu_count() or 1
+        self.tamano_pagina = tamano_pagina
+        self.capacidad_colas = capacidad_colas
+        self.tamano_lote = tamano_lote
+        self.estadisticas = {}
+        self._lock = threading.Lock()
+        # Se activa cuando una etapa falla: las demás dejan de producir y terminan
+        self._detener = threading.Event()
+        self._error = None
+
+    def _contar(self, clave, cantidad=1):
+        with self._lock:
+            self.estadisticas[clave] = self.estadisticas.get(clave, 0) + cantidad
+
+    def _medir(self, etapa, inicio):
+        self._contar(f'segundos_{etapa}', time.perf_counter() - inicio)
+
+    def _fallar(self, etapa, error):
+        """Registra el primer error y detiene todas las etapas"""
+        with self._lock:
+            if self._error is None:
+                self._error = error
+                print(f"   ✗ Falló la etapa de {etapa}, deteniendo el pipeline: {str(error)[:100]}")
+        self._detener.set()
+
+    def _poner(self, cola, elemento):
+        """
+        put en una cola acotada que no se bloquea para siempre si el
+        consumidor murió
+
+        Returns:
+            bool: False si el pipeline se detuvo antes de poder encolar
+        """
+        while True:
+            try:
+                cola.put(elemento, timeout=ESPERA_COLA)
+                return True
+            except queue.Full:
+                if self._detener.is_set():
+                    return False
+
+    def _tomar(self, cola):
+        """get que devuelve FIN si el pipeline se detuvo y la cola está vacía"""
+        while True:
+            try:
+                return cola.get(timeout=ESPERA_COLA)
+            except queue.Empty:
+                if self._detener.is_set():
+                    return FIN
+
+    def ejecutar(self, max_juegos=None, desde=None, guardar=True):
+        """
+        Descarga y carga juegos de DBpedia recorriendo las URIs en orden
+
+        Args:
+            max_juegos: Tope de juegos a descargar (None = todo el catálogo)
+            desde: URI a partir de la cual empezar (cursor por clave)
+            guardar: Si es True, serializa la ontología al terminar
+
+        Returns:
+            dict: Resumen con contadores, tiempo por etapa y juegos por segundo
+
+        Raises:
+            Exception: El error de la primera etapa que falló (lo ya escrito
+                       queda en el grafo y en el índice, pero no se guarda)
+        """
+        self.estadisticas = {'descargados': 0, 'nuevos': 0, 'existentes': 0, 'fusionados': 0}
+        self._detener.clear()
+        self._error = None
+        nuevos = []
+        crudos = queue.Queue(maxsize=self.capacidad_colas)
+        normalizados = queue.Queue(maxsize=self.capacidad_colas)
+        resueltos = queue.Queue(maxsize=self.capacidad_colas)
+
+        filtro = self.buscador.indice_juegos.exportar_filtro().a_bytes()
+        inicio = time.time()
+        print(f"\n→ Pipeline de ingesta: {self.procesos} proceso(s) de normalización")
+
+        with self.buscador.lock_ingesta:
+            with ProcessPoolExecutor(max_workers=self.procesos, initializer=_inicializar_trabajador,
+                                     initargs=(filtro,)) as pool:
+                hilos = [
+                    threading.Thread(target=self._etapa_descarga, args=(crudos, max_juegos, desde),
+                                     name="ingesta-descarga"),
+                    threading.Thread(target=self._etapa_normalizacion, args=(crudos, normalizados, pool),
+                                     name="ingesta-normalizacion"),
+                    threading.Thread(target=self._etapa_resolucion, args=(normalizados, resueltos),
+                                     name="ingesta-resolucion")
+                ]
+                for hilo in hilos:
+                    hilo.start()
+                try:
+                    # El hilo actual es el escritor: el único que toca el grafo
+                    self._etapa_escritura(resueltos, nuevos)
+                except BaseException as e:
+                    self._fallar('escritura', e)
+                    raise
+                finally:
+                    for hilo in hilos:
+                        hilo.join()
+                    # Páginas que quedaron en el pool tras una falla: no se procesan
+                    pool.shutdown(cancel_futures=True)
+                    self.buscador.indice_juegos.agregar_todos(nuevos)
+
+        if self._error is not None:
+            raise self._error
+        if guardar and nuevos:
+            print(f"   → Guardando ontología en {self.buscador.owl_file}...")
+            self.buscador.guardar_ontologia()
+
+        segundos = time.time() - inicio
+        resumen = dict(self.estadisticas)
+        resumen.update({
+            'procesos': self.procesos,
+            'segundos': round(segundos, 2),
+            'juegos_por_segundo': round(resumen['descargados'] / max(segundos, 1e-6), 1),
+            'nuevos_por_segundo': round(resumen['nuevos'] / max(segundos, 1e-6), 1)
+        })
+        for clave in [c for c in resumen if c.startswith('segundos_')]:
+            resumen[clave] = round(resumen[clave], 2)
+
+        print(f"✓ Ingesta: {resumen['descargados']:,} descargados, {resumen['nuevos']:,} nuevos, "
+              f"{resumen['existentes']:,} existentes, {resumen['fusionados']:,} fusionados "
+              f"en {resumen['segundos']}s ({resumen['juegos_por_segundo']:,} juegos/s)")
+        return resumen
+
+    def _etapa_descarga(self, salida, max_juegos, cursor):
+        """Etapa 1 (E/S): páginas de DBpedia por cursor de URI"""
+        try:
+            while ((max_juegos is None or self.estadisticas['descargados'] < max_juegos)
+                   and not self._detener.is_set()):
+                inicio = time.perf_counter()
+                limite = self.tamano_pagina
+                if max_juegos is not None:
+                    limite = min(limite, max_juegos - self.estadisticas['descargados'])
+                query = construir_consulta_juegos(orden='game', limite=limite, despues_de=cursor)
+                try:
+                    respuesta = consultar_sparql(query, timeout=60)
+                except ConsultaOmitidaError as e:
+                    print(f"   ⊙ Descarga detenida: {e}")
+                    break
+                except Exception as e:
+                    print(f"   ✗ Error en la descarga: {str(e)[:100]}")
+                    break
+
+                bindings = [b for b in respuesta.get("results", {}).get("bindings", []) if 'game' in b]
+                self._medir('descarga', inicio)
+                if not bindings:
+                    break
+
+                self._contar('descargados', len(bindings))
+                cursor = bindings[-1]['game']['value']
+                if not self._poner(salida, bindings):
+                    break
+        except Exception as e:
+            self._fallar('descarga', e)
+        finally:
+            self._poner(salida, FIN)
+
+    def _etapa_normalizacion(self, entrada, salida, pool):
+        """Etapa 2 (CPU): reparte las páginas en el pool manteniendo el orden"""
+        try:
+            while not self._detener.is_set():
+                bindings = self._tomar(entrada)
+                if bindings is FIN:
+                    break
+                # La cola acotada de futuros limita las páginas en vuelo
+                if not self._poner(salida, pool.submit(normalizar_pagina, bindings)):
+                    break
+        except Exception as e:
+            self._fallar('normalización', e)
+        finally:
+            self._poner(salida, FIN)
+
+    def _etapa_resolucion(self, entrada, salida):
+        """Etapa 3: confirma existentes, resuelve duplicados y arma los triples"""
+        vistos = set()
+        indice = self.buscador.indice_juegos
+        resolucion = self.buscador.resolucion
+        try:
+            while not self._detener.is_set():
+                futuro = self._tomar(entrada)
+                if futuro is FIN:
+                    break
+                try:
+                    juegos = futuro.result()
+                except Exception as e:
+                    print(f"   ✗ Error normalizando una página: {str(e)[:100]}")
+                    continue
+
+                inicio = time.perf_counter()
+                lote = []
+                for juego in juegos:
+                    uri = juego['game']
+                    if uri in vistos or (juego['posible_existente'] and uri in indice):
+                        self._contar('existentes')
+                        continue
+                    if resolucion.resolver_juego(juego['titulo'], juego['anios'], uri, clave=juego['clave']):
+                        self._contar('fusionados')
+                        continue
+                    triples = self.buscador._triples_juego(juego)
+                    vistos.add(uri)
+                    # Se registra al encolarlo: los juegos de las páginas siguientes ya lo ven
+                    self.buscador.registrar_entidades(juego, clave=juego['clave'])
+                    lote.append((uri, triples))
+                self._medir('resolucion', inicio)
+                if not self._poner(salida, lote):
+                    break
+        except Exception as e:
+            self._fallar('resolución', e)
+        finally:
+            self._poner(salida, FIN)
+
+    def _etapa_escritura(self, entrada, nuevos):
+        """
+        Etapa 4 (único escritor): inserta los triples con addN por lotes
+
+        Si otra etapa falla, igual escribe los lotes que ya estaban en la
+        cola (sus entidades ya se registraron en la resolución)
+
+        Args:
+            entrada: Cola de lotes resueltos
+            nuevos: Lista donde se agregan las URIs escritas
+        """
+        escritor = EscritorGrafo(self.buscador.graph, tamano_lote=self.tamano_lote, lock=self.buscador.lock_grafo)
+        while True:
+            lote = self._tomar(entrada)
+            if lote is FIN:
+                break
+            inicio = time.perf_counter()
+            for uri, triples in lote:
+                escritor.agregar_todos(triples)
+                nuevos.append(uri)
+            self._contar('nuevos', len(lote))
+            self._medir('escritura', inicio)
+
+        inicio = time.perf_counter()
+        escritor.confirmar()
+        self._medir('escritura', inicio)
+        self._contar('triples_agregados', escritor.triples_agregados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta masiva de videojuegos de DBpedia por etapas")
+    parser.add_argument('--owl', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'videojuegos.owl'),
+                        help="Ontología destino")
+    parser.add_argument('--max-juegos', type=int, default=None, help="Tope de juegos a descargar")
+    parser.add_argument('--desde', default=None, help="URI desde la que empezar el recorrido")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos de normalización")
+    parser.add_argument('--pagina', type=int, default=500, help="Juegos por consulta")
+    args = parser.parse_args()
+
+    from buscador_semantico import BuscadorSemantico
+    buscador = BuscadorSemantico(args.owl)
+    pipeline = PipelineIngesta(buscador, procesos=args.procesos, tamano_pagina=args.pagina)
+    pipeline.ejecutar(max_juegos=args.max_juegos, desde=args.desde)
+
+
+if __name__ == '__main__':
+    main()
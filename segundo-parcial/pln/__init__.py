@@ -1,3 +1,5 @@
-from .pipeline import run_nlp, SUPPORTED_INTENTS
+from .pipeline import run_nlp, run_nlp_batch, analyze, SUPPORTED_INTENTS
+from .memo import memo_pln
+from .tiempos import tiempos_pln
 
-__all__ = ["run_nlp", "SUPPORTED_INTENTS"]
\ No newline at end of file
+__all__ = ["run_nlp", "run_nlp_batch", "analyze", "SUPPORTED_INTENTS", "memo_pln", "tiempos_pln"]
\ No newline at end of file
@@ -0,0 +1,214 @@
+"""
+Reconocedor de entidades por diccionario (gazetteer)
+Reconoce en una consulta los nombres que hay en la ontología: títulos de
+videojuegos, desarrolladores y géneros. Todos los nombres forman un autómata
+de Aho-Corasick, así que encontrar todas las menciones cuesta O(largo de la
+consulta) sin importar el tamaño del catálogo. Los nombres nuevos forman
+autómatas chicos que se fusionan como un contador binario (niveles de
+tamaño creciente), así agregar un nombre cuesta O(log n) amortizado y una
+búsqueda recorre a lo sumo log n autómatas
+"""
+
+import re
+import threading
+import unicodedata
+
+# Largo mínimo (normalizado) de un nombre por tipo: evita reconocer títulos como "go"
+MIN_CARACTERES = {'Videojuego': 3}
+MIN_CARACTERES_DEFECTO = 2
+
+# Estudios que se reconocen aunque la ontología todavía no los tenga
+DESARROLLADORES_CONOCIDOS = [
+    'Nintendo', 'Sony', 'Microsoft', 'Valve', 'Rockstar', 'EA', 'Ubisoft', 'Activision',
+    'Capcom', 'Bethesda', 'FromSoftware', 'Naughty Dog', 'CD Projekt', 'Team Asobi'
+]
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    """
+    Minúsculas, sin acentos y con la puntuación como espacio, rodeado de
+    espacios: así cada nombre solo coincide con palabras completas
+    ('ea' no aparece en 'search')
+    """
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return ' ' + ' '.join(_NO_ALFANUMERICO.sub(' ', texto).split()) + ' '
+
+
+class _Automata:
+    """Aho-Corasick inmutable: se reemplaza entero, así que las búsquedas no necesitan lock"""
+
+    def __init__(self, patrones):
+        self.patrones = list(patrones)
+        # Transiciones en un solo dict con clave entera (estado << 21 | carácter)
+        self.goto = {}
+        self.salida = [None]
+        hijos = [[]]
+        for patron in self.patrones:
+            estado = 0
+            for c in patron:
+                clave = (estado << 21) | ord(c)
+                siguiente = self.goto.get(clave)
+                if siguiente is None:
+                    siguiente = len(self.salida)
+                    self.goto[clave] = siguiente
+                    self.salida.append(None)
+                    hijos.append([])
+                    hijos[estado].append((ord(c), siguiente))
+                estado = siguiente
+            self.salida[estado] = patron
+
+        # Enlaces de falla y de salida (próximo estado con patrón en la cadena de fallas)
+        self.falla = [0] * len(self.salida)
+        self.enlace = [0] * len(self.salida)
+        cola = [hijo for _, hijo in hijos[0]]
+        for estado in cola:
+            for codigo, hijo in hijos[estado]:
+                falla = self.falla[estado]
+                while falla and ((falla << 21) | codigo) not in self.goto:
+                    falla = self.falla[falla]
+                destino = self.goto.get((falla << 21) | codigo, 0)
+                self.falla[hijo] = destino if destino != hijo else 0
+                f = self.falla[hijo]
+                self.enlace[hijo] = f if self.salida[f] is not None else self.enlace[f]
+                cola.append(hijo)
+
+    def __len__(self):
+        return len(self.patrones)
+
+    def buscar(self, texto):
+        """
+        Yields:
+            tuple: (posición final, patrón) de cada aparición, solapadas incluidas
+        """
+        goto, falla, salida, enlace = self.goto, self.falla, self.salida, self.enlace
+        estado = 0
+        for i, c in enumerate(texto):
+            codigo = ord(c)
+            while estado and ((estado << 21) | codigo) not in goto:
+                estado = falla[estado]
+            estado = goto.get((estado << 21) | codigo, 0)
+            s = estado if salida[estado] is not None else enlace[estado]
+            while s:
+                yield i, salida[s]
+                s = enlace[s]
+
+
+class Gazetteer:
+    def __init__(self):
+        """Inicializa el reconocedor vacío"""
+        # patrón normalizado -> tipo -> {'etiqueta': nombre visible, 'uris': set}
+        self._entradas = {}
+        # Autómatas de tamaño decreciente; la lista se reemplaza, nunca se modifica
+        self._niveles = []
+        self._lock = threading.Lock()
+        # Cambia con cada nombre nuevo (invalida análisis memoizados)
+        self.version = 0
+
+    def _registrar(self, tipo, etiqueta, uri):
+        """Agrega la entrada; devuelve el patrón si es nuevo (hay que llevarlo a un autómata)"""
+        patron = normalizar(etiqueta)
+        if len(patron) - 2 < MIN_CARACTERES.get(tipo, MIN_CARACTERES_DEFECTO):
+            return None
+        por_tipo = self._entradas.get(patron)
+        nuevo = por_tipo is None
+        if nuevo:
+            por_tipo = self._entradas[patron] = {}
+        if tipo not in por_tipo:
+            por_tipo[tipo] = {'etiqueta': str(etiqueta).strip(), 'uris': set()}
+            self.version += 1
+        if uri is not None:
+            por_tipo[tipo]['uris'].add(str(uri))
+        return patron if nuevo else None
+
+    def agregar(self, tipo, etiqueta, uri=None):
+        """
+        Registra un nombre (p. ej. al ingerir un juego)
+
+        Args:
+            tipo: 'Videojuego', 'Desarrollador', 'Genero'...
+            etiqueta: Nombre visible
+            uri: Recurso de la ontología que lo lleva (opcional)
+        """
+        self.agregar_todos([(tipo, etiqueta, uri)])
+
+    def agregar_todos(self, entradas):
+        """Registra varios (tipo, etiqueta, uri); los nombres nuevos forman un nivel"""
+        with self._lock:
+            nuevos = [p for p in (self._registrar(*e) for e in entradas) if p is not None]
+            if not nuevos:
+                return
+            niveles = self._niveles + [_Automata(nuevos)]
+            # Un nivel se fusiona con el anterior mientras no sea menos de la mitad
+            while len(niveles) > 1 and len(niveles[-2]) <= 2 * len(niveles[-1]):
+                ultimo = niveles.pop()
+                niveles[-1] = _Automata(niveles[-1].patrones + ultimo.patrones)
+            self._niveles = niveles
+
+    def cargar_grafo(self, graph, vg):
+        """Registra los títulos de juegos y los nombres de desarrolladores y géneros del grafo"""
+        from rdflib import RDF, RDFS
+        entradas = [('Videojuego', titulo, juego)
+                    for juego in graph.subjects(RDF.type, vg.Videojuego)
+                    for titulo in graph.objects(juego, vg.titulo)]
+        for clase, tipo in ((vg.Desarrollador, 'Desarrollador'), (vg.Genero, 'Genero')):
+            entradas += [(tipo, nombre, recurso)
+                         for recurso in graph.subjects(RDF.type, clase)
+                         for nombre in graph.objects(recurso, RDFS.label)]
+        self.agregar_todos(entradas)
+
+    def reconocer(self, texto, tipos=None, solapadas=False):
+        """
+        Menciones de nombres conocidos en `texto`
+
+        Args:
+            texto: Consulta
+            tipos: Tipos a reconocer (None = todos)
+            solapadas: Si es False se eligen las más largas sin solaparse
+                       (de izquierda a derecha)
+
+        Returns:
+            list: Dicts con tipo, etiqueta, uris, inicio y fin (sobre el texto normalizado)
+        """
+        normalizado = normalizar(texto)
+        menciones = []
+        for automata in self._niveles:
+            for fin, patron in automata.buscar(normalizado):
+                # list(): otro hilo puede estar agregando tipos o URIs
+                for tipo, entrada in list(self._entradas[patron].items()):
+                    if tipos is not None and tipo not in tipos:
+                        continue
+                    menciones.append({
+                        'tipo': tipo,
+                        'etiqueta': entrada['etiqueta'],
+                        'uris': sorted(entrada['uris']),
+                        # Sin los espacios de borde del patrón; fin exclusivo
+                        'inicio': fin - len(patron) + 2,
+                        'fin': fin
+                    })
+        menciones.sort(key=lambda m: (m['inicio'], -m['fin'], m['tipo']))
+        if solapadas:
+            return menciones
+
+        elegidas = []
+        for mencion in menciones:
+            ultima = elegidas[-1] if elegidas else None
+            mismo_tramo = ultima is not None and (ultima['inicio'], ultima['fin']) == (mencion['inicio'], mencion['fin'])
+            if ultima is None or mismo_tramo or mencion['inicio'] >= ultima['fin']:
+                elegidas.append(mencion)
+        return elegidas
+
+    def obtener_estadisticas(self):
+        niveles = self._niveles
+        return {
+            'nombres': len(self._entradas),
+            'niveles': [len(n) for n in niveles],
+            'estados': sum(len(n.salida) for n in niveles),
+            'version': self.version
+        }
+
+
+gazetteer_global = Gazetteer()
+gazetteer_global.agregar_todos(('Desarrollador', nombre, None) for nombre in DESARROLLADORES_CONOCIDOS)
@@ -0,0 +1,115 @@
+"""
+Memo LRU de run_nlp
+Las consultas repetidas (la mayoría del tráfico) reutilizan la spec ya
+calculada y se saltan preprocesamiento, detección de idioma y extracción de
+slots. La clave es el texto con los espacios normalizados (el mismo `clean`
+del preprocesamiento, del que salen los slots de texto); las specs se guardan inmutables para que ningún llamador altere la compartida
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+# Specs distintas que se conservan (0 = sin memo)
+PLN_CACHE_MAX = int(os.environ.get('PLN_CACHE_MAX', 1024))
+
+
+class FrozenSpec(dict):
+    """dict de solo lectura (sigue siendo serializable con jsonify); dict(spec) da una copia editable"""
+
+    def _solo_lectura(self, *args, **kwargs):
+        raise TypeError("spec de solo lectura: usar dict(spec) para modificar una copia")
+
+    __setitem__ = __delitem__ = __ior__ = _solo_lectura
+    clear = pop = popitem = setdefault = update = _solo_lectura
+
+    def __reduce__(self):
+        return (FrozenSpec, (dict(self),))
+
+
+def congelar(valor):
+    """Copia inmutable de una spec: dicts -> FrozenSpec, listas y sets -> tuplas"""
+    if isinstance(valor, dict):
+        return FrozenSpec({k: congelar(v) for k, v in valor.items()})
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return tuple(congelar(v) for v in valor)
+    return valor
+
+
+def clave_memo(texto):
+    """
+    Texto con los espacios colapsados, igual que preprocess: se respetan
+    acentos y mayúsculas porque slots como developer o game_title copian
+    la escritura de la consulta
+    """
+    return " ".join((texto or "").split())
+
+
+class MemoPLN:
+    def __init__(self, max_entradas=PLN_CACHE_MAX):
+        """
+        Inicializa el memo
+
+        Args:
+            max_entradas: Specs que se conservan antes de desalojar la menos usada
+        """
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.estadisticas = {'aciertos': 0, 'fallos': 0, 'desalojos': 0}
+
+    def obtener(self, texto, calcular, version=None):
+        """
+        Devuelve la spec memoizada de `texto` o la calcula con `calcular(texto)`
+
+        Args:
+            texto: Consulta
+            calcular: Función que analiza la consulta
+            version: Versión de los datos del análisis (p. ej. del gazetteer);
+                     una spec calculada con otra versión se recalcula
+
+        Returns:
+            FrozenSpec: Spec inmutable con 'original' igual a `texto`
+        """
+        clave = clave_memo(texto)
+        with self._lock:
+            version_spec, spec = self._entradas.get(clave, (None, None))
+            if spec is not None and version_spec == version:
+                self._entradas.move_to_end(clave)
+                self.estadisticas['aciertos'] += 1
+            else:
+                spec = None
+                self.estadisticas['fallos'] += 1
+
+        if spec is None:
+            spec = congelar(calcular(texto))
+            if self.max_entradas > 0:
+                with self._lock:
+                    self._entradas[clave] = (version, spec)
+                    self._entradas.move_to_end(clave)
+                    while len(self._entradas) > self.max_entradas:
+                        self._entradas.popitem(last=False)
+                        self.estadisticas['desalojos'] += 1
+
+        if spec.get("original") != texto:
+            # Misma clave con otra escritura: se devuelve el texto recibido
+            spec = FrozenSpec({**spec, "original": texto})
+        return spec
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def obtener_estadisticas(self):
+        with self._lock:
+            consultas = self.estadisticas['aciertos'] + self.estadisticas['fallos']
+            return {
+                **self.estadisticas,
+                'consultas': consultas,
+                'tasa_aciertos': round(self.estadisticas['aciertos'] / consultas, 4) if consultas else 0.0,
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas
+            }
+
+
+memo_pln = MemoPLN()
@@ -1,6 +1,11 @@
 import re
+import time
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from multilingual import traductor_global
+from .memo import memo_pln, congelar
+from .gazetteer import gazetteer_global
+from .tiempos import tiempos_pln
 
 SUPPORTED_INTENTS = {
     # Intents solicitados
@@ -63,6 +68,14 @@ AGE_MAP = {
     "e": "E", "e10": "E10+", "e10+": "E10+", "t": "T", "m": "M", "ao": "AO"
 }
 
+# Lemas que aparecen en algún diccionario: los demás no aportan slots
+GAZETTEER_KEYS = frozenset(PLATFORM_MAP) | frozenset(GENRE_MAP) | frozenset(MODE_MAP) | \
+    frozenset(AWARD_MAP) | frozenset(AGE_MAP)
+
+TOKEN_RE = re.compile(r"[a-zA-Z0-9áéíóúüñÁÉÍÓÚÜÑ]+")
+# Tokens de varios textos unidos por "\n" (el salto marca el fin de cada texto)
+_TOKEN_OR_BREAK_RE = re.compile(r"[a-zA-Z0-9áéíóúüñÁÉÍÓÚÜÑ]+|\n")
+
 def _strip_accents(txt: str) -> str:
     return "".join(c for c in unicodedata.normalize("NFD", txt) if unicodedata.category(c) != "Mn")
 
@@ -71,7 +84,7 @@ def preprocess(text: str):
     clean = " ".join(original.strip().split())
     lowered = _strip_accents(clean.lower())
     idioma = traductor_global.detectar_idioma(original) if hasattr(traductor_global, "detectar_idioma") else "es"
-    tokens = re.findall(r"[a-zA-Z0-9áéíóúüñÁÉÍÓÚÜÑ]+", clean)
+    tokens = TOKEN_RE.findall(clean)
     lemmas = [_strip_accents(t.lower()) for t in tokens]
     return {
         "original": original,
@@ -82,39 +95,200 @@ def preprocess(text: str):
         "idioma": idioma
     }
 
+def preprocess_batch(texts):
+    """
+    preprocess de muchos textos a la vez: una sola tokenización y un solo
+    pasaje sin acentos para todo el lote, y los lemas de diccionario
+    resueltos con una intersección de conjuntos sobre el vocabulario del lote
+    """
+    originals = [t or "" for t in texts]
+    cleans = [" ".join(t.strip().split()) for t in originals]
+    # Los textos limpios no tienen saltos de línea: "\n" separa un texto del siguiente
+    lowered = _strip_accents("\n".join(cleans).lower()).split("\n")
+
+    tokens_por_texto = [[]]
+    for token in _TOKEN_OR_BREAK_RE.findall("\n".join(cleans)):
+        if token == "\n":
+            tokens_por_texto.append([])
+        else:
+            tokens_por_texto[-1].append(token)
+    lemmas_por_texto = [
+        linea.split(" ") if linea else []
+        for linea in _strip_accents("\n".join(" ".join(tokens) for tokens in tokens_por_texto).lower()).split("\n")
+    ]
+
+    vocabulario = set().union(*lemmas_por_texto)
+    en_diccionario = vocabulario & GAZETTEER_KEYS
+
+    detectar = getattr(traductor_global, "detectar_idioma", None)
+    return [{
+        "original": original,
+        "clean": clean,
+        "lower": lower,
+        "tokens": tokens,
+        "lemmas": lemmas,
+        "gazetteer": [l for l in lemmas if l in en_diccionario] if en_diccionario else [],
+        "idioma": detectar(original) if detectar else "es"
+    } for original, clean, lower, tokens, lemmas in zip(
+        originals, cleans, lowered, tokens_por_texto, lemmas_por_texto)]
+
+# Reglas de intención en orden de prioridad. Cada patrón es una lista de
+# literales alternativos sobre el texto en minúsculas y sin acentos (un
+# literal entre \b exige límite de palabra). Equivalen a las expresiones
+# "cross[- ]?play", "coop( local)?", "pegi ?(3|7)", "mods?|modding"...
+INTENT_RULES = [
+    ("find_games_with_crossplay", [["crossplay", "cross-play", "cross play"]]),
+    ("find_openworld_mission_based", [["mundo abierto"], ["misiones"]]),
+    ("find_local_coop_games", [["coop"], ["pantalla dividida"]]),
+    ("find_simulation_pc_online_coop", [["simul"], [r"\bpc\b"], ["online"], ["coop"]]),
+    ("find_by_genre", [["genero"], ["género"],
+                       ["accion", "acción", "action", "aventura", "rpg", "rol", "estrategia", "simul"]]),
+    ("find_multiplayer_games", [["multijugador", "multiplayer"]]),
+    ("find_by_developer", [["desarrollador", "studio", "estudio", "por "]]),
+    ("find_child_friendly", [["niñ", "infantil", "pegi3", "pegi 3", "pegi7", "pegi 7", "esrbe", "esrb e"]]),
+    ("find_goty_by_release_year", [["goty", "juego del anio", "juego del año", "game of the year"]]),
+    ("find_best_soundtrack_recent", [["banda sonora", "soundtrack"]]),
+    ("find_physical_and_digital_on_nextgen", [["digital"], ["fisic", "físic"], ["ps5", "xbox series", "switch"]]),
+    ("find_advanced_customization_non_linear", [["personalizacion", "personalización"],
+                                                ["no lineal", "hub", "sandbox"]]),
+    ("find_proprietary_engine_games", [["motor propio", "engine propietario", "propietario"]]),
+    ("find_vr_ar_core", [[r"\bvr\b", "realidad virtual", r"\bar\b", "realidad aumentada"]]),
+    ("find_international_awards_recent", [["premio", "award"],
+                                          ["narrativa", "direccion artistica", "dirección artística"]]),
+    ("find_adaptive_ai_difficulty", [["ia adaptativa", "ai adaptativa", "dificultad dinamica", "dinámica"]]),
+    ("find_educational_by_age", [["educativo"], ["edad"]]),
+    ("find_sports_with_rpg_career_mode", [["deporte", "futbol", "fútbol", "baloncesto", "basket"],
+                                          ["carrera"], ["rpg"]]),
+    ("find_monetization_models", [["microtrans", "dlc", "season pass", "pase de temporada"]]),
+    ("find_mod_support", [["mod"]]),
+    ("find_games_with_realistic_physics", [["fisica realista", "física realista", "physics"]]),
+    ("find_expansions_with_major_story_impact", [["expansion", "expansión", "dlc"], ["historia", "trama", "story"]]),
+]
+
+# Palabras clave (subcadenas de pre["lower"]) que activan cada flag de extract_slots
+FLAG_KEYWORDS = [
+    ("supportsCrossPlay", ["crossplay", "cross-play"]),
+    ("openWorld", ["mundo abierto", "open world"]),
+    ("missionBased", ["mision", "misión"]),
+    ("advancedCustomization", ["personalizacion", "personalización"]),
+    ("nonLinearProgression", ["no lineal", "non linear", "hub"]),
+    ("proprietaryEngine", ["motor propio", "engine propietario", "propietario"]),
+    ("vrCore", ["vr", "realidad virtual"]),
+    ("arCore", ["ar", "realidad aumentada"]),
+    ("adaptiveAI", ["ia adaptativa", "ai adaptativa", "dificultad dinamica", "dinámica"]),
+    ("modSupport", ["mods", "modding"]),
+    ("monetization", ["microtrans", "dlc", "season pass", "pase de temporada"]),
+]
+CHILD_FRIENDLY_KEYWORDS = ["niños", "ninos", "infantil", "pegi 3", "pegi 7", "e10", "e 10", "esrb e"]
+
+class KeywordAutomaton:
+    """
+    Autómata de Aho-Corasick sobre todas las palabras clave: una pasada por
+    el texto devuelve, como máscara de bits, qué literales aparecen en él
+    (con la semántica de `literal in texto`, o de re.search para los
+    literales entre \b)
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._out = [0]
+        # Literales con límite de palabra que terminan en cada estado: (largo, máscara)
+        self._borde = [()]
+        self._delta = None
+
+    def add(self, literal, bit):
+        borde = literal.startswith(r"\b")
+        texto = literal[2:-2] if borde else literal
+        estado = 0
+        for c in texto:
+            if c not in self._goto[estado]:
+                self._goto.append({})
+                self._out.append(0)
+                self._borde.append(())
+                self._goto[estado][c] = len(self._goto) - 1
+            estado = self._goto[estado][c]
+        if borde:
+            self._borde[estado] += ((len(texto), 1 << bit),)
+        else:
+            self._out[estado] |= 1 << bit
+
+    def compile(self):
+        # Por anchura: cada estado hereda las salidas y transiciones de su
+        # estado de falla, así la búsqueda es un único dict.get por carácter
+        self._delta = [None] * len(self._goto)
+        self._delta[0] = dict(self._goto[0])
+        cola = [(hijo, 0) for hijo in self._goto[0].values()]
+        for estado, falla in cola:
+            self._out[estado] |= self._out[falla]
+            self._borde[estado] += self._borde[falla]
+            self._delta[estado] = {**self._delta[falla], **self._goto[estado]}
+            for c, hijo in self._goto[estado].items():
+                cola.append((hijo, self._delta[falla].get(c, 0)))
+        return self
+
+    def search(self, txt):
+        hits = 0
+        estado = 0
+        delta, out, borde = self._delta, self._out, self._borde
+        for i, c in enumerate(txt):
+            estado = delta[estado].get(c, 0)
+            hits |= out[estado]
+            if borde[estado]:
+                for largo, mask in borde[estado]:
+                    inicio = i - largo + 1
+                    if not _es_palabra(txt, inicio - 1) and not _es_palabra(txt, i + 1):
+                        hits |= mask
+        return hits
+
+def _es_palabra(txt, i):
+    """Como \w de re: True si txt[i] existe y es alfanumérico o '_'"""
+    return 0 <= i < len(txt) and (txt[i].isalnum() or txt[i] == "_")
+
+def _compile_keywords():
+    automaton = KeywordAutomaton()
+    bit = 0
+    rule_masks = []
+    for intent, patterns in INTENT_RULES:
+        rule_mask = 0
+        for literals in patterns:
+            for literal in literals:
+                automaton.add(literal, bit)
+            rule_mask |= 1 << bit
+            bit += 1
+        rule_masks.append((intent, rule_mask))
+    # Cada patrón ocupa un bit en orden de prioridad: el bit más bajo
+    # encendido indica la primera regla con algún acierto
+    rule_of_bit = [i for i, (_, patterns) in enumerate(INTENT_RULES) for _ in patterns]
+
+    rules_mask = (1 << bit) - 1
+
+    flag_bits = []
+    for flag, literals in FLAG_KEYWORDS + [("child", CHILD_FRIENDLY_KEYWORDS)]:
+        for literal in literals:
+            automaton.add(literal, bit)
+        flag_bits.append((flag, 1 << bit))
+        bit += 1
+    return automaton.compile(), rule_masks, rule_of_bit, rules_mask, flag_bits[:-1], flag_bits[-1][1]
+
+_KEYWORDS, _RULE_MASKS, _RULE_OF_BIT, _RULES_MASK, _FLAG_BITS, _CHILD_BIT = _compile_keywords()
+
+def keyword_hits(pre):
+    """Aciertos de todas las palabras clave del texto (se calcula una vez)"""
+    if "hits" not in pre:
+        pre["hits"] = _KEYWORDS.search(pre["lower"])
+    return pre["hits"]
+
 def classify_intent(pre):
     txt = pre["lower"]
-    # Patrones específicos en orden de prioridad
-    rules = [
-        ("find_games_with_crossplay", [r"cross[- ]?play"]),
-        ("find_openworld_mission_based", [r"mundo abierto", r"misiones"]),
-        ("find_local_coop_games", [r"coop( local)?", r"pantalla dividida"]),
-        ("find_simulation_pc_online_coop", [r"simul", r"\bpc\b", r"online", r"coop"]),
-        ("find_by_genre", [r"genero", r"género", r"accion|acción|action|aventura|rpg|rol|estrategia|simul"]),
-        ("find_multiplayer_games", [r"multijugador|multiplayer"]),
-        ("find_by_developer", [r"desarrollador|studio|estudio|por "]),
-        ("find_child_friendly", [r"niñ|infantil|pegi ?(3|7)|esrb ?e"]),
-        ("find_goty_by_release_year", [r"goty|juego del anio|juego del año|game of the year"]),
-        ("find_best_soundtrack_recent", [r"banda sonora|soundtrack"]),
-        ("find_physical_and_digital_on_nextgen", [r"digital", r"fisic|físic", r"ps5|xbox series|switch"]),
-        ("find_advanced_customization_non_linear", [r"personalizacion|personalización", r"no lineal|hub|sandbox"]),
-        ("find_proprietary_engine_games", [r"motor propio|engine propietario|propietario"]),
-        ("find_vr_ar_core", [r"\bvr\b|realidad virtual|\bar\b|realidad aumentada"]),
-        ("find_international_awards_recent", [r"premio|award", r"narrativa|direccion artistica|dirección artística"]),
-        ("find_adaptive_ai_difficulty", [r"ia adaptativa|ai adaptativa|dificultad dinamica|dinámica"]),
-        ("find_educational_by_age", [r"educativo", r"edad"]),
-        ("find_sports_with_rpg_career_mode", [r"deporte|futbol|fútbol|baloncesto|basket", r"carrera", r"rpg"]),
-        ("find_monetization_models", [r"microtrans|dlc|season pass|pase de temporada"]),
-        ("find_mod_support", [r"mods?|modding"]),
-        ("find_games_with_realistic_physics", [r"fisica realista|física realista|physics"]),
-        ("find_expansions_with_major_story_impact", [r"expansion|expansión|dlc", r"historia|trama|story"]),
-    ]
-    for intent, patterns in rules:
-        if all(re.search(p, txt) for p in patterns):
+    hits = keyword_hits(pre)
+    rule_hits = hits & _RULES_MASK
+    if rule_hits:
+        # Primera regla (en orden de prioridad) con algún patrón presente
+        intent, mask = _RULE_MASKS[_RULE_OF_BIT[(rule_hits & -rule_hits).bit_length() - 1]]
+        if hits & mask == mask:
             return intent, 0.85
-        if any(re.search(p, txt) for p in patterns):
-            # If partial match, keep but lower score
-            return intent, 0.7
+        # If partial match, keep but lower score
+        return intent, 0.7
     # Fallbacks
     if "accion" in txt or "acción" in txt or "action" in txt:
         return "find_by_genre", 0.65
@@ -123,7 +297,10 @@ def classify_intent(pre):
     return "find_games", 0.4
 
 def extract_slots(pre):
-    lemmas = pre["lemmas"]
+    # Solo los lemas presentes en algún diccionario (preprocess_batch ya los trae)
+    lemmas = pre.get("gazetteer")
+    if lemmas is None:
+        lemmas = [l for l in pre["lemmas"] if l in GAZETTEER_KEYS]
     slots = {
         "platforms": [],
         "genres": [],
@@ -132,7 +309,9 @@ def extract_slots(pre):
         "age_ratings": [],
         "year_range": None,
         "developer": None,
+        "developer_uris": [],
         "game_title": None,
+        "game_uris": [],
         "bool_flags": set(),  # flags like openWorld, missionProgression, crossPlay, adaptiveAI
     }
 
@@ -159,62 +338,56 @@ def extract_slots(pre):
             slots["age_ratings"].append(AGE_MAP[l])
 
     # Years (range)
-    years = re.findall(r"\b(19|20)\d{2}\b", pre["lower"])
+    years = re.findall(r"\b(?:19|20)\d{2}\b", pre["lower"])
     if years:
         ys = [int(y) for y in years]
         slots["year_range"] = (min(ys), max(ys))
 
-    # Developer (heurística: “por X”)
-    m = re.search(r"por ([\w\s\.-]{2,50})", pre["clean"], flags=re.IGNORECASE)
-    if m:
-        slots["developer"] = m.group(1).strip()
+    # Desarrolladores y juegos de la ontología mencionados (el más largo de cada tipo)
+    mentions = gazetteer_global.reconocer(pre["clean"], tipos=("Desarrollador", "Videojuego"))
+    longest = {}
+    for mention in mentions:
+        actual = longest.get(mention["tipo"])
+        if actual is None or mention["fin"] - mention["inicio"] > actual["fin"] - actual["inicio"]:
+            longest[mention["tipo"]] = mention
+
+    # Developer: reconocido, o heurística “por X” para estudios desconocidos
+    if "Desarrollador" in longest:
+        slots["developer"] = longest["Desarrollador"]["etiqueta"]
+        slots["developer_uris"] = longest["Desarrollador"]["uris"]
+    else:
+        m = re.search(r"por ([\w\s\.-]{2,50})", pre["clean"], flags=re.IGNORECASE)
+        if m:
+            slots["developer"] = m.group(1).strip()
 
     # Flags by keywords
-    if "crossplay" in pre["lower"] or "cross-play" in pre["lower"]:
-        slots["bool_flags"].add("supportsCrossPlay")
-    if "mundo abierto" in pre["lower"] or "open world" in pre["lower"]:
-        slots["bool_flags"].add("openWorld")
-    if "mision" in pre["lower"] or "misión" in pre["lower"]:
-        slots["bool_flags"].add("missionBased")
-    if "personalizacion" in pre["lower"] or "personalización" in pre["lower"]:
-        slots["bool_flags"].add("advancedCustomization")
-    if "no lineal" in pre["lower"] or "non linear" in pre["lower"] or "hub" in pre["lower"]:
-        slots["bool_flags"].add("nonLinearProgression")
-    if "motor propio" in pre["lower"] or "engine propietario" in pre["lower"] or "propietario" in pre["lower"]:
-        slots["bool_flags"].add("proprietaryEngine")
-    if "vr" in pre["lower"] or "realidad virtual" in pre["lower"]:
-        slots["bool_flags"].add("vrCore")
-    if "ar" in pre["lower"] or "realidad aumentada" in pre["lower"]:
-        slots["bool_flags"].add("arCore")
-    if "ia adaptativa" in pre["lower"] or "ai adaptativa" in pre["lower"] or "dificultad dinamica" in pre["lower"] or "dinámica" in pre["lower"]:
-        slots["bool_flags"].add("adaptiveAI")
-    if "mods" in pre["lower"] or "modding" in pre["lower"]:
-        slots["bool_flags"].add("modSupport")
-    if "microtrans" in pre["lower"] or "dlc" in pre["lower"] or "season pass" in pre["lower"] or "pase de temporada" in pre["lower"]:
-        slots["bool_flags"].add("monetization")
-
-    # Game title heuristic: after "de " or quoted
+    hits = keyword_hits(pre)
+    for flag, bit in _FLAG_BITS:
+        if hits & bit:
+            slots["bool_flags"].add(flag)
+
+    # Game title: entre comillas, reconocido en la ontología o después de "de "
     mtitle = re.search(r"\"(.+?)\"", pre["clean"])
     if mtitle:
         slots["game_title"] = mtitle.group(1)
+    elif "Videojuego" in longest:
+        slots["game_title"] = longest["Videojuego"]["etiqueta"]
+        slots["game_uris"] = longest["Videojuego"]["uris"]
     elif "de " in pre["clean"].lower():
         cand = pre["clean"].split("de ", 1)[-1].strip()
         if len(cand.split()) <= 6:
             slots["game_title"] = cand
 
-    # Force Nintendo developer if mentioned
-    if "nintendo" in pre["lower"]:
-        slots["developer"] = "Nintendo"
-
     # Child friendly
-    if any(x in pre["lower"] for x in ["niños", "ninos", "infantil", "pegi 3", "pegi 7", "e10", "e 10", "esrb e"]):
+    if hits & _CHILD_BIT:
         slots["age_ratings"].extend([r for r in ["PEGI3", "PEGI7", "E", "E10+"] if r not in slots["age_ratings"]])
 
     return slots
 
 def build_query_spec(intent, slots):
     """
-    Retorna un dict con: intent, template, filters, idioma, needs_fallback(bool)
+    Retorna un dict con: intent, template, filters, implied_filters (los
+    valores de filters que agregó el intent), needs_fallback(bool)
     """
     template = SUPPORTED_INTENTS.get(intent, "sparql_generic")
     filters = {
@@ -225,31 +398,41 @@ def build_query_spec(intent, slots):
         "age_ratings": slots.get("age_ratings", []),
         "year_range": slots.get("year_range"),
         "developer": slots.get("developer"),
+        "developer_uris": slots.get("developer_uris", []),
         "game_title": slots.get("game_title"),
+        "game_uris": slots.get("game_uris", []),
         "bool_flags": list(slots.get("bool_flags", []))
     }
 
+    # Valores que agregan las reglas del intent (no salen de la consulta)
+    implied = {"platforms": [], "genres": [], "modes": []}
+
+    def imply(key, value):
+        filters[key].append(value)
+        implied[key].append(value)
+
     # Intent-specific guardrails: ensure required filters
     if intent == "find_simulation_pc_online_coop":
         # enforce PC + genre Simulation + CoopOnline
         if "vg:PC" not in filters["platforms"]:
-            filters["platforms"].append("vg:PC")
+            imply("platforms", "vg:PC")
         if "vg:Simulacion" not in filters["genres"]:
-            filters["genres"].append("vg:Simulacion")
+            imply("genres", "vg:Simulacion")
         if "vg:CoopOnline" not in filters["modes"]:
-            filters["modes"].append("vg:CoopOnline")
+            imply("modes", "vg:CoopOnline")
 
     if intent == "find_local_coop_games":
         if "vg:CoopLocal" not in filters["modes"]:
-            filters["modes"].append("vg:CoopLocal")
+            imply("modes", "vg:CoopLocal")
 
     if intent == "find_multiplayer_games":
         if not filters["modes"]:
-            filters["modes"] = ["vg:Multiplayer", "vg:CoopOnline", "vg:CoopLocal"]
+            for mode in ["vg:Multiplayer", "vg:CoopOnline", "vg:CoopLocal"]:
+                imply("modes", mode)
 
     if intent == "find_by_genre" and not filters["genres"]:
         # default to Action if user asked generic “acción”
-        filters["genres"].append("vg:Accion")
+        imply("genres", "vg:Accion")
 
     # Mark fallback when critical slots missing for templates that need them
     needs_fallback = False
@@ -270,22 +453,104 @@ def build_query_spec(intent, slots):
         "intent": intent,
         "template": template,
         "filters": filters,
+        "implied_filters": {k: v for k, v in implied.items() if v},
         "needs_fallback": needs_fallback
     }
 
 def run_nlp(text: str):
     """
-    Pipeline completo:
+    Pipeline completo, memoizado por texto normalizado (ver pln.memo).
+    Devuelve una spec inmutable: dict(spec) da una copia editable
+    """
+    if not tiempos_pln.activo:
+        return memo_pln.obtener(text, analyze, version=gazetteer_global.version)
+    inicio = time.perf_counter()
+    spec = memo_pln.obtener(text, analyze, version=gazetteer_global.version)
+    # Incluye los aciertos del memo (las etapas solo se miden al calcular)
+    tiempos_pln.registrar("run_nlp", time.perf_counter() - inicio)
+    return spec
+
+def analyze(text: str, tiempos=None):
+    """
+    Pipeline completo sin memo:
       1) preprocesa
       2) detecta intención
       3) extrae slots
       4) arma query spec
+
+    Args:
+        text: Consulta
+        tiempos: Dict opcional donde dejar los segundos de cada etapa
+                 (también se registran si pln.tiempos está activo)
     """
-    pre = preprocess(text)
-    intent, score = classify_intent(pre)
-    slots = extract_slots(pre)
-    spec = build_query_spec(intent, slots)
+    if tiempos is None and not tiempos_pln.activo:
+        pre = preprocess(text)
+        intent, score = classify_intent(pre)
+        slots = extract_slots(pre)
+        spec = build_query_spec(intent, slots)
+    else:
+        medidos = {}
+        t0 = time.perf_counter()
+        pre = preprocess(text)
+        t1 = time.perf_counter()
+        intent, score = classify_intent(pre)
+        t2 = time.perf_counter()
+        slots = extract_slots(pre)
+        t3 = time.perf_counter()
+        spec = build_query_spec(intent, slots)
+        t4 = time.perf_counter()
+        medidos.update(preprocess=t1 - t0, classify_intent=t2 - t1, extract_slots=t3 - t2,
+                       build_query_spec=t4 - t3, analyze=t4 - t0)
+        if tiempos_pln.activo:
+            tiempos_pln.registrar_todos(medidos)
+        if tiempos is not None:
+            tiempos.update(medidos)
     spec["confidence"] = score
     spec["lang"] = pre["idioma"]
     spec["original"] = pre["original"]
-    return spec
\ No newline at end of file
+    return spec
+
+def _analyze_batch(texts):
+    """analyze de un lote ya deduplicado (también es la tarea de cada proceso)"""
+    specs = []
+    for pre in preprocess_batch(texts):
+        intent, score = classify_intent(pre)
+        spec = build_query_spec(intent, extract_slots(pre))
+        spec["confidence"] = score
+        spec["lang"] = pre["idioma"]
+        spec["original"] = pre["original"]
+        specs.append(congelar(spec))
+    return specs
+
+def run_nlp_batch(texts, processes=1, chunk_size=2000):
+    """
+    Analiza muchas consultas (p. ej. un log) de una vez. Las repetidas se
+    analizan una sola vez; el lote no pasa por el memo de run_nlp para no
+    desalojar las consultas en caliente, y da lo mismo que analyze()
+
+    Args:
+        texts: Consultas
+        processes: Procesos entre los que repartir el lote (1 = en este proceso)
+        chunk_size: Consultas distintas por tarea del pool
+
+    Returns:
+        list: Una spec inmutable por consulta, en el mismo orden
+    """
+    indices = {}
+    unicos = []
+    posiciones = []
+    for text in texts:
+        text = text or ""
+        if text not in indices:
+            indices[text] = len(unicos)
+            unicos.append(text)
+        posiciones.append(indices[text])
+
+    if processes > 1 and len(unicos) > chunk_size:
+        partes = [unicos[i:i + chunk_size] for i in range(0, len(unicos), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            specs = [spec for parte in pool.map(_analyze_batch, partes) for spec in parte]
+    else:
+        specs = _analyze_batch(unicos)
+
+    return [specs[posicion] for posicion in posiciones]
@@ -0,0 +1,106 @@
+"""
+Tiempos por etapa del pipeline PLN (opcional)
+Con PLN_TIEMPOS=1 cada análisis registra cuánto tardó cada etapa
+(preprocess, classify_intent, extract_slots, build_query_spec), el
+análisis completo (analyze) y cada llamada a run_nlp, aciertos del memo
+incluidos, en un histograma de cubetas logarítmicas. Desactivado solo
+cuesta una comprobación por análisis
+"""
+
+import math
+import os
+import threading
+
+# Registrar los tiempos de cada análisis en los histogramas
+PLN_TIEMPOS = os.environ.get('PLN_TIEMPOS', '0') == '1'
+
+# Límites superiores de las cubetas en microsegundos: 1, 2, 4, ... ~1 s
+LIMITES_US = tuple(2 ** i for i in range(21))
+
+
+class HistogramaTiempos:
+    def __init__(self):
+        """Inicializa el histograma vacío (una cubeta extra para lo que supera el último límite)"""
+        self.cubetas = [0] * (len(LIMITES_US) + 1)
+        self.cantidad = 0
+        self.total = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, segundos):
+        us = segundos * 1e6
+        # Índice de la primera cubeta cuyo límite (potencia de 2) es >= us
+        indice = min(max(math.ceil(us) - 1, 0).bit_length(), len(LIMITES_US))
+        self.cubetas[indice] += 1
+        self.cantidad += 1
+        self.total += segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def percentil(self, p):
+        """Cota superior (ms) del percentil `p` según las cubetas"""
+        if not self.cantidad:
+            return 0.0
+        objetivo = p / 100 * self.cantidad
+        acumulado = 0
+        for indice, cuenta in enumerate(self.cubetas):
+            acumulado += cuenta
+            if acumulado >= objetivo and cuenta:
+                if indice == len(LIMITES_US):
+                    return round(self.maximo * 1000, 3)
+                return min(LIMITES_US[indice] / 1000, round(self.maximo * 1000, 3))
+        return round(self.maximo * 1000, 3)
+
+    def obtener_estadisticas(self):
+        return {
+            'cantidad': self.cantidad,
+            'media_ms': round(self.total / self.cantidad * 1000, 3) if self.cantidad else 0.0,
+            'p50_ms': self.percentil(50),
+            'p95_ms': self.percentil(95),
+            'p99_ms': self.percentil(99),
+            'max_ms': round(self.maximo * 1000, 3),
+            # Límite superior de la cubeta (µs) -> análisis; '>...' = más que el último límite
+            'cubetas_us': {
+                (str(LIMITES_US[i]) if i < len(LIMITES_US) else f'>{LIMITES_US[-1]}'): cuenta
+                for i, cuenta in enumerate(self.cubetas) if cuenta
+            }
+        }
+
+
+class TiemposPLN:
+    def __init__(self, activo=PLN_TIEMPOS):
+        """
+        Inicializa el registro
+
+        Args:
+            activo: Si es False, el pipeline no mide nada
+        """
+        self.activo = activo
+        self._histogramas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, etapa, segundos):
+        """Suma una medición de `etapa` a su histograma"""
+        self.registrar_todos({etapa: segundos})
+
+    def registrar_todos(self, tiempos):
+        """Registra un dict etapa -> segundos (un análisis completo) con un solo lock"""
+        with self._lock:
+            for etapa, segundos in tiempos.items():
+                histograma = self._histogramas.get(etapa)
+                if histograma is None:
+                    histograma = self._histogramas[etapa] = HistogramaTiempos()
+                histograma.registrar(segundos)
+
+    def limpiar(self):
+        with self._lock:
+            self._histogramas.clear()
+
+    def obtener_estadisticas(self):
+        with self._lock:
+            return {
+                'activo': self.activo,
+                'etapas': {etapa: h.obtener_estadisticas() for etapa, h in self._histogramas.items()}
+            }
+
+
+tiempos_pln = TiemposPLN()
@@ -0,0 +1,162 @@
+"""
+Módulo de caché para consultas remotas (DBpedia)
+Guarda resultados positivos, resultados vacíos (caché negativo) y
+ventanas de espera tras timeouts para no repetir consultas costosas
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.error import URLError
+
+
+def es_timeout(error):
+    """
+    Indica si una excepción corresponde a un timeout de red
+
+    Args:
+        error: Excepción capturada al consultar el endpoint remoto
+
+    Returns:
+        bool: True si el error fue por tiempo agotado
+    """
+    if isinstance(error, (socket.timeout, TimeoutError)):
+        return True
+
+    razon = getattr(error, 'reason', None)
+    if isinstance(razon, (socket.timeout, TimeoutError)):
+        return True
+
+    mensaje = str(error).lower()
+    return 'timed out' in mensaje or 'timeout' in mensaje
+
+
+def es_error_de_red(error):
+    """Indica si una excepción es un timeout o un fallo de conexión (no de la query)"""
+    return es_timeout(error) or isinstance(error, (ConnectionError, URLError))
+
+
+class RemoteLookupCache:
+    def __init__(self, ttl_positivo=300, ttl_negativo=60, backoff_timeout=30, max_entradas=2000):
+        """
+        Inicializa el caché de consultas remotas
+
+        Args:
+            ttl_positivo: Segundos que se conserva un resultado con datos
+            ttl_negativo: Segundos que se conserva un resultado vacío
+            backoff_timeout: Segundos sin reintentar una consulta tras un timeout
+            max_entradas: Tamaño máximo antes de purgar entradas expiradas
+                          (y después las menos usadas)
+        """
+        self.TTL_POSITIVO = ttl_positivo
+        self.TTL_NEGATIVO = ttl_negativo
+        self.BACKOFF_TIMEOUT = backoff_timeout
+        self.MAX_ENTRADAS = max_entradas
+
+        self._entradas = OrderedDict()
+        self._backoff = {}
+        self._lock = threading.Lock()
+
+        self.estadisticas = {
+            'aciertos': 0,
+            'aciertos_negativos': 0,
+            'omitidas_por_backoff': 0,
+            'fallos': 0
+        }
+
+    def obtener(self, clave):
+        """
+        Busca una consulta en el caché
+
+        Returns:
+            tuple: (encontrado, valor). Si la consulta está en backoff se
+                   devuelve (True, []) para que el llamador no vaya a la red
+        """
+        ahora = time.time()
+        with self._lock:
+            expira_backoff = self._backoff.get(clave)
+            if expira_backoff is not None:
+                if ahora < expira_backoff:
+                    self.estadisticas['omitidas_por_backoff'] += 1
+                    return True, []
+                del self._backoff[clave]
+
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                valor, expira = entrada
+                if ahora < expira:
+                    self._entradas.move_to_end(clave)
+                    if valor:
+                        self.estadisticas['aciertos'] += 1
+                    else:
+                        self.estadisticas['aciertos_negativos'] += 1
+                    return True, valor
+                del self._entradas[clave]
+
+            self.estadisticas['fallos'] += 1
+            return False, None
+
+    def guardar(self, clave, valor):
+        """Guarda un resultado; los vacíos usan el TTL negativo"""
+        ttl = self.TTL_POSITIVO if valor else self.TTL_NEGATIVO
+        with self._lock:
+            if len(self._entradas) >= self.MAX_ENTRADAS:
+                self._purgar_expirados()
+            self._entradas[clave] = (valor, time.time() + ttl)
+            self._entradas.move_to_end(clave)
+            self._backoff.pop(clave, None)
+
+    def registrar_timeout(self, clave):
+        """Abre una ventana de espera para la consulta que agotó el tiempo"""
+        with self._lock:
+            self._backoff[clave] = time.time() + self.BACKOFF_TIMEOUT
+
+    def registrar_error(self, clave, error):
+        """Registra un error remoto; timeouts y fallos de red abren ventana de espera"""
+        if es_error_de_red(error):
+            self.registrar_timeout(clave)
+            return True
+        return False
+
+    def limpiar(self):
+        """Vacía el caché y las ventanas de espera"""
+        with self._lock:
+            self._entradas.clear()
+            self._backoff.clear()
+
+    def obtener_estadisticas(self):
+        """Retorna estadísticas de uso del caché"""
+        with self._lock:
+            return {
+                **self.estadisticas,
+                'entradas': len(self._entradas),
+                'en_backoff': len(self._backoff),
+                'ttl_positivo': self.TTL_POSITIVO,
+                'ttl_negativo': self.TTL_NEGATIVO,
+                'backoff_timeout': self.BACKOFF_TIMEOUT
+            }
+
+    def _purgar_expirados(self):
+        """Elimina entradas vencidas (se llama con el lock tomado)"""
+        ahora = time.time()
+        for clave in [c for c, (_, expira) in self._entradas.items() if expira <= ahora]:
+            del self._entradas[clave]
+        for clave in [c for c, expira in self._backoff.items() if expira <= ahora]:
+            del self._backoff[clave]
+
+        # Si sigue lleno, descartar las usadas hace más tiempo
+        if len(self._entradas) >= self.MAX_ENTRADAS:
+            sobrantes = len(self._entradas) - self.MAX_ENTRADAS + 1
+            for clave in list(self._entradas)[:sobrantes]:
+                del self._entradas[clave]
+
+
+# Instancia global compartida por todos los módulos que consultan DBpedia
+# (los TTL se pueden ajustar por variables de entorno)
+cache_remoto_global = RemoteLookupCache(
+    ttl_positivo=int(os.environ.get('DBPEDIA_CACHE_TTL', 300)),
+    ttl_negativo=int(os.environ.get('DBPEDIA_CACHE_TTL_NEGATIVO', 60)),
+    backoff_timeout=int(os.environ.get('DBPEDIA_BACKOFF_TIMEOUT', 30))
+)
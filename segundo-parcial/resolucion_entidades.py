@@ -0,0 +1,219 @@
+"""
+Módulo de resolución de entidades
+Detecta que un juego, desarrollador o género ya está en la ontología con
+otra URI antes de escribirlo. Los juegos se agrupan en bloques por la
+primera palabra del título normalizado y el año de lanzamiento, y solo se
+comparan (similitud de texto) con los candidatos de su bloque
+"""
+
+import re
+import threading
+import unicodedata
+from contextlib import contextmanager
+from difflib import SequenceMatcher
+from rdflib import RDF, RDFS
+
+# Similitud mínima entre títulos normalizados para considerarlos el mismo juego
+UMBRAL_SIMILITUD = 0.92
+
+ARTICULOS = {'the', 'a', 'an', 'el', 'la', 'los', 'las', 'le', 'les', 'der', 'die', 'das'}
+# Sufijos societarios que no distinguen a un estudio ("Valve Corporation" = "Valve")
+SUFIJOS_EMPRESA = {'inc', 'ltd', 'llc', 'corp', 'corporation', 'co', 'company', 'gmbh', 'sa', 'srl', 'kk'}
+ROMANOS = {r: str(n) for n, r in enumerate(
+    ['i', 'ii', 'iii', 'iv', 'v', 'vi', 'vii', 'viii', 'ix', 'x', 'xi', 'xii', 'xiii', 'xiv', 'xv', 'xvi'], 1
+)}
+
+_PARENTESIS = re.compile(r'\([^)]*\)')
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin acentos, sin aclaraciones entre paréntesis ni puntuación"""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = _PARENTESIS.sub(' ', texto).replace('&', ' and ')
+    return _NO_ALFANUMERICO.sub(' ', texto).split()
+
+
+def clave_titulo(titulo):
+    """
+    Título normalizado sin artículo inicial y con la numeración en cifras:
+    'The Witcher 3: Wild Hunt' -> 'witcher 3 wild hunt', 'Blasphemous II' -> 'blasphemous 2'
+    """
+    palabras = normalizar_texto(titulo)
+    if len(palabras) > 1 and palabras[0] in ARTICULOS:
+        palabras = palabras[1:]
+    # La primera palabra no se convierte ('I Am Setsuna')
+    palabras = palabras[:1] + [ROMANOS.get(p, p) for p in palabras[1:]]
+    return ' '.join(palabras)
+
+
+def clave_nombre(nombre):
+    """Nombre normalizado de un desarrollador o género, sin sufijos societarios"""
+    palabras = normalizar_texto(nombre)
+    while len(palabras) > 1 and palabras[-1] in SUFIJOS_EMPRESA:
+        palabras = palabras[:-1]
+    return ' '.join(palabras)
+
+
+def _numeracion(clave):
+    """Números del título: distinguen secuelas ('7' != '8')"""
+    return {p for p in clave.split() if p.isdigit()}
+
+
+def similitud(a, b, umbral=UMBRAL_SIMILITUD):
+    """Similitud entre dos claves (0..1); 0 si las cotas rápidas ya quedan bajo `umbral`"""
+    comparador = SequenceMatcher(None, a, b)
+    if comparador.real_quick_ratio() < umbral or comparador.quick_ratio() < umbral:
+        return 0.0
+    return comparador.ratio()
+
+
+class IndiceEntidades:
+    def __init__(self, umbral=UMBRAL_SIMILITUD, gazetteer=None):
+        """
+        Inicializa el índice vacío
+
+        Args:
+            umbral: Similitud mínima para fusionar dos títulos
+            gazetteer: Reconocedor (pln.gazetteer) al que se pasan los nombres registrados
+        """
+        self.umbral = umbral
+        self.gazetteer = gazetteer
+        # primera palabra -> año (o None) -> [(clave, uri)]
+        self._bloques = {}
+        # clase -> clave de nombre -> URI canónica
+        self._recursos = {}
+        self._lock = threading.Lock()
+        self.estadisticas = {'juegos_fusionados': 0, 'recursos_fusionados': 0}
+
+    @contextmanager
+    def sin_gazetteer(self):
+        """
+        Deja de pasar nombres al reconocedor durante una carga masiva (el
+        llamador los agrega de una vez al final)
+
+        Yields:
+            Gazetteer | None: El reconocedor desconectado
+        """
+        gazetteer, self.gazetteer = self.gazetteer, None
+        try:
+            yield gazetteer
+        finally:
+            self.gazetteer = gazetteer
+
+    def cargar_grafo(self, graph, vg):
+        """Registra los juegos, desarrolladores y géneros que ya tiene la ontología"""
+        # El reconocedor se carga de una vez al final, no nombre a nombre
+        with self.sin_gazetteer() as gazetteer:
+            for game in graph.subjects(RDF.type, vg.Videojuego):
+                anios = [int(a) for a in graph.objects(game, vg.anioLanzamiento)]
+                for titulo in graph.objects(game, vg.titulo):
+                    self.registrar_juego(game, titulo, anios)
+
+            for clase in (vg.Desarrollador, vg.Genero):
+                for recurso in graph.subjects(RDF.type, clase):
+                    for nombre in graph.objects(recurso, RDFS.label):
+                        self.registrar_recurso(clase, nombre, recurso)
+        if gazetteer is not None:
+            gazetteer.cargar_grafo(graph, vg)
+
+    def registrar_juego(self, uri, titulo, anios=(), clave=None):
+        """Agrega un juego a los bloques de su título y años (`clave` si ya se calculó)"""
+        clave = clave if clave is not None else clave_titulo(titulo)
+        if not clave:
+            return
+        with self._lock:
+            por_anio = self._bloques.setdefault(clave.split()[0], {})
+            for anio in (list(anios) or [None]):
+                por_anio.setdefault(anio, []).append((clave, str(uri)))
+        if self.gazetteer is not None:
+            self.gazetteer.agregar('Videojuego', titulo, uri)
+
+    def resolver_juego(self, titulo, anios=(), uri=None, clave=None):
+        """
+        Busca un juego ya registrado que sea el mismo que (titulo, anios)
+
+        Args:
+            titulo: Título del juego entrante
+            anios: Años de lanzamiento conocidos
+            uri: URI del juego entrante (no cuenta como duplicado de sí mismo)
+            clave: clave_titulo(titulo) si ya se calculó (p. ej. en otro proceso)
+
+        Returns:
+            str | None: URI del juego existente equivalente, o None si es nuevo
+        """
+        clave = clave if clave is not None else clave_titulo(titulo)
+        if not clave:
+            return None
+        numeracion = _numeracion(clave)
+
+        with self._lock:
+            por_anio = self._bloques.get(clave.split()[0], {})
+            if anios:
+                # Las fechas de lanzamiento varían un año entre regiones
+                candidatos = [c for a in anios for d in (-1, 0, 1) for c in por_anio.get(int(a) + d, [])]
+                candidatos += por_anio.get(None, [])
+                exacto = False
+            else:
+                # Sin año no hay bloque fiable: solo se fusiona un título idéntico
+                candidatos = [c for lista in por_anio.values() for c in lista]
+                exacto = True
+
+            for clave_candidata, uri_candidata in candidatos:
+                if uri is not None and uri_candidata == str(uri):
+                    return None
+            for clave_candidata, uri_candidata in candidatos:
+                if clave_candidata == clave or (
+                    not exacto
+                    and _numeracion(clave_candidata) == numeracion
+                    and similitud(clave, clave_candidata, self.umbral) >= self.umbral
+                ):
+                    self.estadisticas['juegos_fusionados'] += 1
+                    return uri_candidata
+        return None
+
+    def resolver_recurso(self, clase, nombre, uri):
+        """
+        URI canónica de un desarrollador o género: la primera registrada con
+        el mismo nombre normalizado, o `uri` si no hay ninguna. Solo
+        consulta: el recurso se registra con registrar_recurso una vez escrito
+
+        Returns:
+            str: URI a usar en la ontología
+        """
+        clave = clave_nombre(nombre)
+        if not clave:
+            return str(uri)
+        with self._lock:
+            return self._recursos.get(clase, {}).get(clave, str(uri))
+
+    def registrar_recurso(self, clase, nombre, uri):
+        """
+        Registra un desarrollador o género ya escrito en la ontología. Si su
+        nombre no estaba, `uri` pasa a ser la canónica; si estaba con otra
+        URI, cuenta como fusionado
+
+        Returns:
+            str: URI canónica
+        """
+        clave = clave_nombre(nombre)
+        if not clave:
+            return str(uri)
+        with self._lock:
+            por_clave = self._recursos.setdefault(clase, {})
+            nueva = clave not in por_clave
+            canonica = por_clave.setdefault(clave, str(uri))
+            if canonica != str(uri):
+                self.estadisticas['recursos_fusionados'] += 1
+        if nueva and self.gazetteer is not None:
+            # 'http://...#Desarrollador' -> 'Desarrollador'
+            self.gazetteer.agregar(str(clase).rsplit('#', 1)[-1], nombre, canonica)
+        return canonica
+
+    def obtener_estadisticas(self):
+        return {
+            'bloques': sum(len(por_anio) for por_anio in self._bloques.values()),
+            'recursos': sum(len(por_clave) for por_clave in self._recursos.values()),
+            **self.estadisticas
+        }
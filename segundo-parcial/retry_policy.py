@@ -0,0 +1,155 @@
+"""
+Módulo de política de reintentos para consultas remotas
+Backoff exponencial con jitter completo, presupuesto de reintentos por
+proceso y clasificación de errores reintentables
+"""
+
+import os
+import random
+import threading
+import time
+from urllib.error import HTTPError
+from SPARQLWrapper.SPARQLExceptions import EndPointInternalError
+from remote_cache import es_error_de_red
+
+# Códigos HTTP que indican sobrecarga o fallo transitorio del servidor
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+def es_reintentable(error):
+    """
+    Indica si vale la pena reintentar una consulta que falló con `error`.
+    Las queries mal formadas, 404 o 401 fallarían igual en el siguiente intento.
+
+    Returns:
+        bool: True para timeouts, fallos de conexión y errores 5xx/429
+    """
+    if isinstance(error, EndPointInternalError):
+        return True
+    if isinstance(error, HTTPError):
+        return error.code in CODIGOS_REINTENTABLES
+    return es_error_de_red(error)
+
+
+class RetryBudget:
+    def __init__(self, ratio=0.1, minimo=10, maximo=100):
+        """
+        Presupuesto de reintentos compartido por el proceso (token bucket)
+
+        Args:
+            ratio: Fichas que aporta cada petición original (0.1 = 10% de reintentos)
+            minimo: Fichas iniciales, para permitir reintentos con poco tráfico
+            maximo: Tope de fichas acumuladas
+        """
+        self.ratio = ratio
+        self.maximo = maximo
+        self._fichas = float(minimo)
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.reintentos = 0
+        self.reintentos_denegados = 0
+
+    def registrar_peticion(self):
+        """Cada petición original suma `ratio` fichas"""
+        with self._lock:
+            self.peticiones += 1
+            self._fichas = min(self.maximo, self._fichas + self.ratio)
+
+    def intentar_reintento(self):
+        """
+        Consume una ficha para reintentar
+
+        Returns:
+            bool: False si el presupuesto está agotado (no se debe reintentar)
+        """
+        with self._lock:
+            if self._fichas >= 1:
+                self._fichas -= 1
+                self.reintentos += 1
+                return True
+            self.reintentos_denegados += 1
+            return False
+
+    def obtener_estadisticas(self):
+        """Retorna el uso del presupuesto"""
+        with self._lock:
+            return {
+                'peticiones': self.peticiones,
+                'reintentos': self.reintentos,
+                'reintentos_denegados': self.reintentos_denegados,
+                'fichas_disponibles': round(self._fichas, 2),
+                'ratio': self.ratio
+            }
+
+
+class RetryPolicy:
+    def __init__(self, max_intentos=3, espera_base=0.5, espera_maxima=8.0, presupuesto=None):
+        """
+        Inicializa la política
+
+        Args:
+            max_intentos: Intentos totales por consulta (incluido el primero)
+            espera_base: Espera base en segundos del backoff exponencial
+            espera_maxima: Tope de la espera entre intentos
+            presupuesto: RetryBudget compartido (uno nuevo si no se indica)
+        """
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.presupuesto = presupuesto or RetryBudget()
+
+    def calcular_espera(self, intento):
+        """Jitter completo: espera aleatoria entre 0 y base * 2^(intento-1), con tope"""
+        techo = min(self.espera_maxima, self.espera_base * (2 ** (intento - 1)))
+        return random.uniform(0, techo)
+
+    def ejecutar(self, funcion, max_intentos=None, deadline=None, descripcion="consulta",
+                 reintentable=es_reintentable):
+        """
+        Ejecuta `funcion` reintentando los errores transitorios
+
+        Args:
+            funcion: Callable sin argumentos que hace la petición remota
+            max_intentos: Sobrescribe el número de intentos de la política
+            deadline: Deadline de la petición; no se duerme más allá de él
+            descripcion: Texto para los logs
+            reintentable: Función que clasifica si un error se puede reintentar
+
+        Returns:
+            El valor devuelto por `funcion`
+
+        Raises:
+            La última excepción si no es reintentable o se agotan los intentos
+        """
+        intentos = max_intentos or self.max_intentos
+        self.presupuesto.registrar_peticion()
+
+        intento = 1
+        while True:
+            try:
+                return funcion()
+            except Exception as e:
+                if intento >= intentos or not reintentable(e):
+                    raise
+
+                espera = self.calcular_espera(intento)
+                if deadline is not None and not deadline.permite_espera(espera):
+                    deadline.marcar_agotado()
+                    raise
+
+                if not self.presupuesto.intentar_reintento():
+                    print(f"      ⊙ Presupuesto de reintentos agotado, {descripcion} sin reintentar")
+                    raise
+
+                print(f"      ↻ Reintentando {descripcion} en {espera:.2f}s ({intento + 1}/{intentos})")
+                time.sleep(espera)
+                intento += 1
+
+
+# Política compartida por todas las consultas SPARQL del proceso
+politica_reintentos_global = RetryPolicy(
+    max_intentos=int(os.environ.get('DBPEDIA_MAX_INTENTOS', 3)),
+    espera_base=float(os.environ.get('DBPEDIA_ESPERA_BASE', 0.5)),
+    espera_maxima=float(os.environ.get('DBPEDIA_ESPERA_MAXIMA', 8)),
+    presupuesto=RetryBudget(ratio=float(os.environ.get('DBPEDIA_RATIO_REINTENTOS', 0.1)))
+)
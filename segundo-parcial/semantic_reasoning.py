@@ -3,23 +3,36 @@ Módulo para razonamiento semántico
 Expande consultas usando contexto, sinónimos, siglas y relaciones semánticas
 """
 
-from SPARQLWrapper import SPARQLWrapper, JSON
+import os
 import re
 from difflib import SequenceMatcher
 from multilingual import traductor_global
+from remote_cache import RemoteLookupCache, cache_remoto_global
+from dbpedia_client import consultar_sparql, ConsultaOmitidaError
+from dbpedia_queries import construir_consulta_juegos, construir_consulta_labels, parsear_juegos
 
 class SemanticReasoner:
     def __init__(self, sparql_endpoint="http://dbpedia.org/sparql"):
-        self.sparql = SPARQLWrapper(sparql_endpoint)
-        self.sparql.setReturnFormat(JSON)
-        self.sparql.setTimeout(10)  # REDUCIDO de 30 a 10 segundos
-        self.sparql.addCustomHttpHeader("User-Agent", "Mozilla/5.0")
+        self.endpoint = sparql_endpoint
+        self.timeout = 10  # REDUCIDO de 30 a 10 segundos
         
         # NUEVO: Caché para resultados de DBpedia
         self.cache_dbpedia = {}
         self.cache_expiracion = {}
         self.CACHE_TTL = 300  # 5 minutos
         
+        # Caché compartido de consultas remotas (incluye resultados vacíos y timeouts)
+        self.cache_remoto = cache_remoto_global
+        
+        # Caché LRU de labels por (uri, idioma); None = sin label en ese
+        # idioma, con un TTL más corto por si DBpedia lo agrega después
+        self.cache_labels = RemoteLookupCache(
+            ttl_positivo=int(os.environ.get('DBPEDIA_LABELS_TTL', 3600)),
+            ttl_negativo=int(os.environ.get('DBPEDIA_LABELS_TTL_NEGATIVO', 300)),
+            max_entradas=int(os.environ.get('DBPEDIA_LABELS_MAX', 5000))
+        )
+        self.TAMANO_LOTE_LABELS = 50
+        
         # Diccionario de siglas y abreviaturas comunes en videojuegos
         self.siglas_conocidas = {
             'gta': ['Grand Theft Auto', 'GTA'],
@@ -106,45 +119,37 @@ class SemanticReasoner:
         
         return terminos_unicos
     
-    def _buscar_nombres_alternativos_dbpedia(self, termino):
+    def _buscar_nombres_alternativos_dbpedia(self, termino, deadline=None):
         """OPTIMIZADO - caché + query más simple"""
-        # Verificar caché primero
-        if termino.lower() in self.cache_dbpedia:
-            return self.cache_dbpedia[termino.lower()]
+        # Verificar caché primero (positivo, negativo o en espera tras timeout)
+        clave_cache = f"alternativos::{termino.lower()}"
+        encontrado, cacheado = self.cache_remoto.obtener(clave_cache)
+        if encontrado:
+            return list(cacheado)
         
         alternativas = []
         
         try:
             # Query SIMPLIFICADA - solo buscar por label
-            query = f"""
-            PREFIX dbo: <http://dbpedia.org/ontology/>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+            query = construir_consulta_juegos(contiene=[termino], limite=3)
             
-            SELECT DISTINCT ?name
-            WHERE {{
-                ?game a dbo:VideoGame .
-                ?game rdfs:label ?name .
-                FILTER (lang(?name) = 'en')
-                FILTER (CONTAINS(LCASE(?name), LCASE("{termino}")))
-            }}
-            LIMIT 3
-            """
+            results = consultar_sparql(
+                query, self.endpoint, timeout=5, deadline=deadline, max_intentos=1
+            )  # Timeout corto, sin reintentos
             
-            self.sparql.setQuery(query)
-            self.sparql.setTimeout(5)  # Timeout corto
-            results = self.sparql.query().convert()
-            
-            if "results" in results and "bindings" in results["results"]:
-                for row in results["results"]["bindings"][:3]:  # MAX 3
-                    if 'name' in row:
-                        alternativas.append(row['name']['value'])
+            for juego in parsear_juegos(results)[:3]:  # MAX 3
+                alternativas.append(juego['titulo'])
             
             # Guardar en caché
             import time
             self.cache_dbpedia[termino.lower()] = alternativas
             self.cache_expiracion[termino.lower()] = time.time()
+            self.cache_remoto.guardar(clave_cache, alternativas)
             
+        except ConsultaOmitidaError as e:
+            print(f"   ⊙ {e}")
         except Exception as e:
+            self.cache_remoto.registrar_error(clave_cache, e)
             print(f"   ⚠ Timeout DBpedia (normal en búsqueda rápida)")
         
         return alternativas[:3]
@@ -237,15 +242,22 @@ class SemanticReasoner:
         
         return sigla.upper() == iniciales.upper()
     
-    def buscar_semanticamente_dbpedia(self, termino, limite=20):
-        """Búsqueda multilingüe MEJORADA con fallback a inglés"""
+    def buscar_semanticamente_dbpedia(self, termino, limite=20, deadline=None):
+        """
+        Búsqueda multilingüe MEJORADA con fallback a inglés
+        
+        Args:
+            termino: Término de búsqueda
+            limite: Máximo de resultados por consulta
+            deadline: Deadline de la petición (opcional)
+        """
         # Detectar idioma original
         idioma_original = self.traductor.detectar_idioma(termino)
         print(f"   ✓ Idioma detectado: {idioma_original}")
         
         # PASO 1: Intentar buscar en el idioma original
         termino_busqueda = termino
-        resultados = self._buscar_en_idioma(termino_busqueda, idioma_original, limite)
+        resultados = self._buscar_en_idioma(termino_busqueda, idioma_original, limite, deadline)
         
         # PASO 2: Si no hay resultados Y no es inglés, traducir y buscar en inglés
         if len(resultados) == 0 and idioma_original != 'en':
@@ -254,7 +266,7 @@ class SemanticReasoner:
             
             if termino_en != termino:
                 print(f"   → Traducción: '{termino}' → '{termino_en}'")
-                resultados = self._buscar_en_idioma(termino_en, 'en', limite)
+                resultados = self._buscar_en_idioma(termino_en, 'en', limite, deadline)
                 
                 # Marcar que estos resultados necesitan traducción de vuelta
                 for resultado in resultados:
@@ -270,43 +282,38 @@ class SemanticReasoner:
         
         return resultados
     
-    def _buscar_en_idioma(self, termino, idioma, limite):
+    def _buscar_en_idioma(self, termino, idioma, limite, deadline=None):
         """Busca en DBpedia en un idioma específico"""
         terminos_expandidos = self._expandir_simple(termino)
         resultados = []
         
         for termino_exp in terminos_expandidos[:2]:
-            query = f"""
-            PREFIX dbo: <http://dbpedia.org/ontology/>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+            query = construir_consulta_juegos(
+                idioma=idioma, contiene=[termino_exp], limite=limite
+            )
             
-            SELECT DISTINCT ?game ?label ?releaseDate ?developer ?genre
-            WHERE {{
-                ?game a dbo:VideoGame .
-                ?game rdfs:label ?label .
-                FILTER (lang(?label) = '{idioma}')
-                FILTER (CONTAINS(LCASE(?label), LCASE("{termino_exp}")))
-                OPTIONAL {{ ?game dbo:releaseDate ?releaseDate }}
-                OPTIONAL {{ ?game dbo:developer ?developer }}
-                OPTIONAL {{ ?game dbo:genre ?genre }}
-            }}
-            LIMIT {limite}
-            """
+            clave_cache = f"semantic::{' '.join(query.split())}"
+            encontrado, juegos = self.cache_remoto.obtener(clave_cache)
             
             try:
-                self.sparql.setQuery(query)
-                self.sparql.setTimeout(8)
-                results = self.sparql.query().convert()
+                if not encontrado:
+                    results = consultar_sparql(query, self.endpoint, timeout=8, deadline=deadline)
+                    juegos = parsear_juegos(results)
+                    self.cache_remoto.guardar(clave_cache, juegos)
+                
+                for juego in juegos:
+                    # Copia para no alterar los registros guardados en caché
+                    juego = dict(juego)
+                    juego['semantic_score'] = self.calcular_similitud_semantica(termino, juego['titulo'])
+                    resultados.append(juego)
                 
-                if "results" in results and "bindings" in results["results"]:
-                    for row in results["results"]["bindings"]:
-                        score = self.calcular_similitud_semantica(termino, row['label']['value'])
-                        row['semantic_score'] = score
-                        resultados.append(row)
-                    
-                    if len(resultados) > 0:
-                        break
+                if len(resultados) > 0:
+                    break
+            except ConsultaOmitidaError as e:
+                print(f"      ⊙ {e}")
+                break
             except Exception as e:
+                self.cache_remoto.registrar_error(clave_cache, e)
                 print(f"      ✗ Error: {str(e)[:100]}")
         
         return resultados
@@ -326,43 +333,75 @@ class SemanticReasoner:
         
         return list(dict.fromkeys(terminos))[:3]
     
-    def _agregar_labels_multilingues(self, resultados, idioma_destino):
-        """Agrega labels en el idioma solicitado a los resultados"""
+    def _agregar_labels_multilingues(self, resultados, idioma_destino, deadline=None):
+        """Agrega labels en el idioma solicitado a los resultados (una consulta por lote)"""
+        uris = [resultado['game'] for resultado in resultados]
+        labels = self.obtener_labels_lote(uris, [idioma_destino], deadline=deadline)
+        
         for resultado in resultados:
-            game_uri = resultado['game']['value']
-            
-            # Query para obtener label en el idioma destino
-            query = f"""
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?label
-            WHERE {{
-                <{game_uri}> rdfs:label ?label .
-                FILTER (lang(?label) = '{idioma_destino}')
-            }}
-            LIMIT 1
-            """
+            label = labels.get((resultado['game'], idioma_destino))
+            # Si no hay traducción, usar el título original
+            resultado['label_traducido'] = label if label is not None else {'value': resultado['titulo']}
+        
+        return resultados
+    
+    def obtener_labels_lote(self, uris, idiomas, deadline=None):
+        """
+        Obtiene los labels de varios recursos en varios idiomas con consultas
+        VALUES por bloques, usando el caché local de labels (uri, idioma)
+        
+        Args:
+            uris: URIs de DBpedia de los recursos
+            idiomas: Códigos de idioma a obtener ('es', 'en', ...)
+            deadline: Deadline de la petición (opcional)
             
+        Returns:
+            dict: {(uri, idioma): binding del label}; sin entrada si no hay label
+        """
+        labels = {}
+        pendientes = []
+        for uri in dict.fromkeys(uris):
+            falta = False
+            for idioma in idiomas:
+                encontrado, label = self.cache_labels.obtener((uri, idioma))
+                if not encontrado:
+                    falta = True
+                elif label:
+                    labels[(uri, idioma)] = label
+            if falta:
+                pendientes.append(uri)
+        
+        for inicio in range(0, len(pendientes), self.TAMANO_LOTE_LABELS):
+            bloque = pendientes[inicio:inicio + self.TAMANO_LOTE_LABELS]
             try:
-                self.sparql.setQuery(query)
-                self.sparql.setTimeout(3)
-                results = self.sparql.query().convert()
-                
-                if "results" in results and "bindings" in results["results"]:
-                    bindings = results["results"]["bindings"]
-                    if len(bindings) > 0:
-                        # Agregar label traducido
-                        resultado['label_traducido'] = bindings[0]['label']
-                        print(f"      ✓ Label {idioma_destino}: {bindings[0]['label']['value']}")
-                    else:
-                        # Si no hay traducción, usar el inglés
-                        resultado['label_traducido'] = resultado['label']
-                        print(f"      ⊙ Sin traducción a {idioma_destino}, usando inglés")
-                else:
-                    resultado['label_traducido'] = resultado['label']
+                labels.update(self._consultar_labels_bloque(bloque, idiomas, deadline))
+            except ConsultaOmitidaError as e:
+                print(f"      ⊙ {e}")
+                break
             except Exception as e:
-                # En caso de error, usar el inglés
-                resultado['label_traducido'] = resultado['label']
-                print(f"      ✗ Error obteniendo label {idioma_destino}: {str(e)[:50]}")
+                print(f"      ✗ Error obteniendo labels {', '.join(idiomas)}: {str(e)[:50]}")
         
-        return resultados
+        return labels
+    
+    def _consultar_labels_bloque(self, uris, idiomas, deadline=None):
+        """
+        Una consulta VALUES para un bloque de URIs; guarda el resultado en el caché de labels
+        
+        Returns:
+            dict: {(uri, idioma): binding del label} de los pares con label
+        """
+        query = construir_consulta_labels(uris, idiomas)
+        
+        results = consultar_sparql(
+            query, self.endpoint, timeout=5, deadline=deadline, max_intentos=1
+        )
+        bindings = results.get("results", {}).get("bindings", [])
+        
+        encontrados = {(row['game']['value'], row['lang']['value']): row['label'] for row in bindings}
+        # Caché negativo: los pares consultados sin label quedan en None
+        for uri in uris:
+            for idioma in idiomas:
+                self.cache_labels.guardar((uri, idioma), encontrados.get((uri, idioma)))
+        
+        print(f"      ✓ Labels {', '.join(idiomas)}: {len(bindings)} de {len(uris)} recursos")
+        return encontrados
@@ -92,7 +92,7 @@ function mostrarAlerta(mensaje, tipo = 'info') {
     document.getElementById('resultados').innerHTML = alert + document.getElementById('resultados').innerHTML;
 }
 
-// Poblar ontología
+// Poblar ontología (trabajo en segundo plano con consulta periódica del progreso)
 async function poblarOntologia() {
     const limite = document.getElementById('limite').value || 10;
     toggleLoading(true);
@@ -108,12 +108,21 @@ async function poblarOntologia() {
         
         const data = await response.json();
         
-        if (data.success) {
-            mostrarAlerta(data.message, 'success');
+        if (!data.success) {
+            mostrarAlerta('Error: ' + data.error, 'danger');
+            return;
+        }
+        
+        const job = await esperarTrabajo(data.job_id);
+        
+        if (job.estado === 'completado') {
+            const reporte = job.resultado;
+            mostrarAlerta(`${reporte.mensaje}. Total en ontología: ${reporte.total}`,
+                          reporte.exito ? 'success' : 'warning');
             // Actualizar contador
             verificarConexion();
         } else {
-            mostrarAlerta('Error: ' + data.error, 'danger');
+            mostrarAlerta('Error: ' + job.error, 'danger');
         }
     } catch (error) {
         mostrarAlerta('Error de conexión: ' + error, 'danger');
@@ -122,6 +131,33 @@ async function poblarOntologia() {
     }
 }
 
+// Consulta el estado de un trabajo hasta que termina, mostrando su progreso
+async function esperarTrabajo(jobId, intervalo = 1000) {
+    const connectionInfo = document.getElementById('connection-info');
+    
+    while (true) {
+        const response = await fetch(`${API_BASE}/api/jobs/${jobId}`);
+        const data = await response.json();
+        
+        if (!data.success) {
+            throw new Error(data.error);
+        }
+        
+        const job = data.job;
+        if (job.estado === 'completado' || job.estado === 'error') {
+            return job;
+        }
+        
+        const p = job.progreso;
+        if (connectionInfo && p.etapa) {
+            connectionInfo.textContent = `Poblando (${p.etapa}): ${p.obtenidos || 0} obtenidos, ` +
+                `${p.agregados || 0} agregados, ${p.duplicados || 0} duplicados`;
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, intervalo));
+    }
+}
+
 let currentSearchController = null;
 
 async function buscarGeneral() {
@@ -643,7 +679,10 @@ async function agregarTodosDesdeDBpedia(juegos) {
         titulo: juego.titulo || 'Sin título',
         anios: Array.isArray(juego.anios) ? juego.anios : [],
         desarrollador: juego.desarrollador || null,
-        generos: Array.isArray(juego.generos) ? juego.generos : []
+        desarrolladores: Array.isArray(juego.desarrolladores) ? juego.desarrolladores : [],
+        desarrolladores_uri: Array.isArray(juego.desarrolladores_uri) ? juego.desarrolladores_uri : [],
+        generos: Array.isArray(juego.generos) ? juego.generos : [],
+        generos_uri: Array.isArray(juego.generos_uri) ? juego.generos_uri : []
     })).filter(j => j.game); // Filtrar solo los que tienen URI
     
     if (juegosSanitizados.length === 0) {
@@ -705,7 +744,10 @@ async function agregarJuegoIndividual(juego) {
         titulo: juego.titulo || 'Sin título',
         anios: Array.isArray(juego.anios) ? juego.anios : [],
         desarrollador: juego.desarrollador || null,
-        generos: Array.isArray(juego.generos) ? juego.generos : []
+        desarrolladores: Array.isArray(juego.desarrolladores) ? juego.desarrolladores : [],
+        desarrolladores_uri: Array.isArray(juego.desarrolladores_uri) ? juego.desarrolladores_uri : [],
+        generos: Array.isArray(juego.generos) ? juego.generos : [],
+        generos_uri: Array.isArray(juego.generos_uri) ? juego.generos_uri : []
     };
     
     if (!juegoSanitizado.game) {
@@ -0,0 +1,227 @@
+"""
+Módulo de sincronización incremental programada con DBpedia
+Cada intervalo consulta solo los juegos creados o editados desde la última
+pasada (marcas de agua por estrategia) y aplica los cambios como diferencias
+sobre la ontología, con un presupuesto de consultas por intervalo. Las
+ediciones se buscan solo entre los juegos locales (por bloques con VALUES y
+la última revisión vista de cada uno), así que su costo depende del catálogo
+local y no del volumen de ediciones de todo DBpedia
+"""
+
+import os
+import threading
+import time
+from dbpedia_client import consultar_sparql, ConsultaOmitidaError
+from dbpedia_queries import construir_consulta_juegos, parsear_juegos
+from rdflib import RDF
+
+# Segundos entre pasadas (0 = sincronización programada desactivada)
+SYNC_INTERVALO = int(os.environ.get('SYNC_INTERVALO', 0))
+# Consultas a DBpedia permitidas en cada pasada
+SYNC_PRESUPUESTO = int(os.environ.get('SYNC_PRESUPUESTO', 10))
+# Juegos por consulta
+SYNC_LOTE = int(os.environ.get('SYNC_LOTE', 100))
+
+# Estrategia -> (marca de agua en dbpedia_queries.MARCAS, aplica a juegos locales)
+# 'altas' agrega los juegos cuya página es nueva; 'cambios' refresca los
+# juegos locales cuya página se editó (su marca es la base de los juegos sin
+# revisión propia guardada)
+ESTRATEGIAS_DELTA = {
+    'altas': ('pagina', False),
+    'cambios': ('revision', True)
+}
+
+
+class SyncScheduler:
+    def __init__(self, buscador, intervalo=SYNC_INTERVALO, presupuesto=SYNC_PRESUPUESTO, lote=SYNC_LOTE):
+        """
+        Inicializa el sincronizador
+
+        Args:
+            buscador: BuscadorSemantico con el grafo y el DBpediaSync (guarda las marcas)
+            intervalo: Segundos entre pasadas
+            presupuesto: Consultas a DBpedia por pasada
+            lote: Juegos por consulta
+        """
+        self.buscador = buscador
+        self.sync = buscador.dbpedia_sync
+        self.intervalo = intervalo
+        self.presupuesto = presupuesto
+        self.lote = lote
+        self.ultimo_ciclo = None
+        self._detener = threading.Event()
+        self._lock_ciclo = threading.Lock()
+        self._hilo = None
+
+    def iniciar(self):
+        """Lanza el hilo de fondo que ejecuta una pasada cada `intervalo` segundos"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="sync-dbpedia", daemon=True)
+        self._hilo.start()
+        print(f"✓ Sincronización con DBpedia cada {self.intervalo}s "
+              f"(máx. {self.presupuesto} consultas por pasada)")
+
+    def detener(self):
+        """Detiene el hilo de fondo al terminar la pasada en curso"""
+        self._detener.set()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                self.ejecutar_ciclo()
+            except Exception as e:
+                print(f"✗ Error en sincronización programada: {str(e)[:100]}")
+            self._detener.wait(self.intervalo)
+
+    def ejecutar_ciclo(self):
+        """
+        Ejecuta una pasada: cada estrategia avanza desde su marca de agua
+        mientras quede presupuesto de consultas
+
+        Returns:
+            dict: Resumen de la pasada
+        """
+        # lock_ingesta: la pasada no se intercala con poblar ni importaciones
+        with self._lock_ciclo, self.buscador.lock_ingesta:
+            inicio = time.time()
+            resumen = {
+                'consultas': 0,
+                'nuevos': 0,
+                'actualizados': 0,
+                'sin_cambios': 0,
+                'fusionados': 0,
+                'triples_quitados': 0,
+                'triples_agregados': 0
+            }
+
+            print("\n→ Sincronización incremental con DBpedia...")
+            for nombre, (marca, aplica_a_locales) in ESTRATEGIAS_DELTA.items():
+                if resumen['consultas'] >= self.presupuesto:
+                    print(f"   ⊙ Presupuesto de consultas agotado, '{nombre}' queda para la próxima pasada")
+                    continue
+                self._sincronizar_estrategia(nombre, marca, aplica_a_locales, resumen)
+
+            if resumen['nuevos'] or resumen['actualizados']:
+                try:
+                    self.buscador.guardar_ontologia()
+                except Exception as e:
+                    print(f"   ✗ Error al guardar: {e}")
+
+            resumen['segundos'] = round(time.time() - inicio, 2)
+            resumen['fecha'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            self.ultimo_ciclo = resumen
+            print(f"   ✓ {resumen['nuevos']} nuevos, {resumen['actualizados']} actualizados, "
+                  f"{resumen['consultas']} consultas ({resumen['segundos']}s)")
+            return resumen
+
+    def _sincronizar_estrategia(self, nombre, marca, aplica_a_locales, resumen):
+        """Avanza una estrategia página a página desde su marca de agua"""
+        marca_actual = self.sync.obtener_estado('marcas', {}).get(nombre)
+
+        if marca_actual is None:
+            # Primera pasada: solo se fija la marca; lo anterior lo cubre /api/poblar
+            juegos = self._consultar(construir_consulta_juegos(marca=marca, orden='marca_desc', limite=1), resumen)
+            if juegos:
+                self._guardar_marca(nombre, juegos[0]['marca'])
+                print(f"   ✓ Marca inicial de '{nombre}': {juegos[0]['marca']}")
+            return
+
+        if aplica_a_locales:
+            self._sincronizar_locales(nombre, marca, marca_actual, resumen)
+            return
+
+        while resumen['consultas'] < self.presupuesto:
+            query = construir_consulta_juegos(
+                marca=marca, marca_min=marca_actual, orden='marca', limite=self.lote
+            )
+            juegos = self._consultar(query, resumen)
+            if not juegos:
+                break
+
+            for juego in juegos:
+                # Los juegos locales los refresca la estrategia de cambios
+                if juego['game'] not in self.buscador.indice_juegos:
+                    self._aplicar(juego, resumen)
+
+            # La marca avanza tras aplicar la página: si algo falla, se reintenta desde aquí
+            marca_actual = juegos[-1]['marca']
+            self._guardar_marca(nombre, marca_actual)
+
+            if len(juegos) < self.lote:
+                break
+
+    def _sincronizar_locales(self, nombre, marca, marca_base, resumen):
+        """
+        Recorre los juegos locales por bloques de `lote` y pide a DBpedia solo
+        los que tienen una revisión posterior a la última vista de cada uno
+        (o a `marca_base` si nunca cambiaron). El recorrido sigue en la
+        pasada siguiente si se agota el presupuesto
+        """
+        from buscador_semantico import VG
+
+        revisiones = self.sync.obtener_estado('revisiones', {})
+        cursor = self.sync.obtener_estado(f'cursor_{nombre}')
+        with self.buscador.lock_grafo:
+            locales = sorted(str(s) for s in self.buscador.graph.subjects(RDF.type, VG.Videojuego))
+        pendientes = [uri for uri in locales if cursor is None or uri > cursor]
+
+        while pendientes and resumen['consultas'] < self.presupuesto:
+            bloque, pendientes = pendientes[:self.lote], pendientes[self.lote:]
+            query = construir_consulta_juegos(
+                marca=marca, orden='marca', limite=len(bloque),
+                marcas_por_juego={uri: revisiones.get(uri, marca_base) for uri in bloque}
+            )
+            juegos = self._consultar(query, resumen)
+            if juegos is None:
+                # Falló: el bloque se reintenta en la próxima pasada
+                return
+
+            for juego in juegos:
+                self._aplicar(juego, resumen)
+                revisiones[juego['game']] = juego['marca']
+
+            # El cursor avanza tras aplicar el bloque; None = recorrido completo
+            self.sync.guardar_estado(revisiones=revisiones, **{f'cursor_{nombre}': bloque[-1] if pendientes else None})
+
+        if not pendientes:
+            print(f"   ✓ '{nombre}': recorrido de {len(locales)} juegos locales completo")
+
+    def _aplicar(self, juego, resumen):
+        """
+        Upsert por hash de contenido: un juego sin cambios no toca el grafo y
+        uno que ya está con otra URI se fusiona
+        """
+        estado, quitados, agregados = self.buscador.upsert_juego(juego)
+        resumen['triples_quitados'] += quitados
+        resumen['triples_agregados'] += agregados
+        resumen[{'nuevo': 'nuevos', 'actualizado': 'actualizados',
+                 'fusionado': 'fusionados'}.get(estado, estado)] += 1
+
+    def _consultar(self, query, resumen):
+        """Ejecuta una consulta descontándola del presupuesto (None si falló)"""
+        resumen['consultas'] += 1
+        try:
+            return parsear_juegos(consultar_sparql(query, self.sync.endpoint, self.sync.timeout))
+        except ConsultaOmitidaError as e:
+            print(f"   ⊙ {e}")
+        except Exception as e:
+            print(f"   ✗ Error: {str(e)[:100]}")
+        return None
+
+    def _guardar_marca(self, nombre, valor):
+        marcas = self.sync.obtener_estado('marcas', {})
+        marcas[nombre] = valor
+        self.sync.guardar_estado(marcas=marcas)
+
+    def obtener_estado(self):
+        """Estado del sincronizador para la API"""
+        return {
+            'activo': self._hilo is not None and self._hilo.is_alive(),
+            'intervalo_segundos': self.intervalo,
+            'presupuesto_consultas': self.presupuesto,
+            'lote': self.lote,
+            'marcas': self.sync.obtener_estado('marcas', {}),
+            'ultimo_ciclo': self.ultimo_ciclo
+        }